@@ -47,18 +47,41 @@ export async function POST(request: Request, { params }: { params: Promise<{ id:
     // 2️⃣ Appeler FastAPI pour générer la réponse IA si c’est un message user
     let aiResponse = null
     if (role === "user") {
+      let fastapiRes: Response
       try {
-        const fastapiRes = await fetch(`http://localhost:8000/ask?prompt=${encodeURIComponent(content)}`)
-        const data = await fastapiRes.json()
-        aiResponse = data.response || "Aucune réponse disponible."
+        fastapiRes = await fetch("http://localhost:8000/v2/ask", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ prompt: content, user_id: userId }),
+        })
+      } catch (error) {
+        console.error("Erreur FastAPI:", error)
+        return NextResponse.json(
+          { message_id: result.insertId, error: "Service de génération injoignable" },
+          { status: 502 }
+        )
+      }
+
+      // Refus ou échec (429 quota, 413 trop long, 5xx) : statut et Retry-After transmis au client,
+      // aucune fausse réponse enregistrée dans la conversation
+      if (!fastapiRes.ok) {
+        const data = await fastapiRes.json().catch(() => null)
+        const retryAfter = fastapiRes.headers.get("Retry-After")
+        return NextResponse.json(
+          { message_id: result.insertId, error: data?.detail || "Erreur lors de la génération de la réponse" },
+          { status: fastapiRes.status, headers: retryAfter ? { "Retry-After": retryAfter } : undefined }
+        )
+      }
+
+      const data = await fastapiRes.json()
+      aiResponse = data.response || null
 
-        // 3️⃣ Enregistrer la réponse IA
+      // 3️⃣ Enregistrer la réponse IA
+      if (aiResponse) {
         await query(
           "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)",
           [id, "assistant", aiResponse]
         )
-      } catch (error) {
-        console.error("Erreur FastAPI:", error)
       }
     }
 
@@ -25,12 +25,25 @@ export async function POST(request: Request) {
       )
     }
 
-    // Ici, vous devriez sauvegarder le fichier sur le serveur ou dans un service de stockage
-    // Pour l'instant, on retourne juste les informations du fichier
+    // Le fichier est transmis tel quel au backend, qui l'indexe dans la bibliographie de l'utilisateur
+    const params = new URLSearchParams({ user_id: userId, filename: file.name })
+    const indexRes = await fetch(`http://localhost:8000/documents?${params}`, {
+      method: "POST",
+      headers: { "Content-Type": file.type },
+      body: file,
+    })
+    const indexed = await indexRes.json()
+    if (!indexRes.ok) {
+      return NextResponse.json({ error: indexed.detail || "Indexation impossible" }, { status: indexRes.status })
+    }
+
     const fileInfo = {
       name: file.name,
       type: file.type,
       size: file.size,
+      documentId: indexed.id,
+      pages: indexed.pages,
+      chunks: indexed.chunks,
     }
 
     return NextResponse.json({ file: fileInfo })
@@ -0,0 +1,248 @@
+import os
+from dotenv import load_dotenv
+
+# -----------------------------------------------------
+#            CHARGEMENT VARIABLES .ENV
+# -----------------------------------------------------
+load_dotenv()
+
+# -----------------------------------------------------
+#               MODELES ET BACKENDS
+# -----------------------------------------------------
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# URL de l'API Groq (vide = URL officielle) ; utile pour un proxy ou un serveur de test local
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+MODEL_NAME_ONLINE = "llama-3.1-8b-instant"
+
+# MODELE OFFLINE
+MODEL_NAME_OFFLINE = "llama3.2:3b-instruct-q4_K_M"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+# Durée de maintien du modèle en mémoire par Ollama après une requête ("30m", "-1" = toujours ; vide = défaut d'Ollama)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "")
+# Au démarrage, chargement du modèle Ollama avant de se déclarer prêt (GET /ready)
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+
+# -----------------------------------------------------
+#     CLIENTS HTTP (POOL, CONCURRENCE, TIMEOUTS)
+# -----------------------------------------------------
+# Générations simultanées autorisées par backend ; au-delà on attend un créneau
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+# Attente maximale d'un créneau avant d'abandonner (secondes)
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", "30"))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "120"))
+# Timeout d'une génération (lecture) et de l'ouverture de connexion
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "90"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# Connexions keep-alive conservées dans le pool de chaque backend
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+# -----------------------------------------------------
+#        SANTÉ DES BACKENDS (GROQ / OLLAMA)
+# -----------------------------------------------------
+# Intervalle entre deux sondes en arrière-plan (secondes)
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "15"))
+# Au-delà de cet âge, l'état mis en cache est considéré comme périmé
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "30"))
+# Nombre d'échecs consécutifs avant d'ouvrir le circuit
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+# Délai avant de retenter un backend dont le circuit est ouvert (half-open)
+HEALTH_RECOVERY_TIMEOUT = float(os.getenv("HEALTH_RECOVERY_TIMEOUT", "30"))
+# Timeout d'une sonde individuelle
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+# -----------------------------------------------------
+#        CACHE DES RÉPONSES GÉNÉRÉES
+# -----------------------------------------------------
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+# Fichier SQLite du niveau disque (vide = cache en mémoire uniquement)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+# Plafond du niveau disque (les réponses les plus anciennes partent au-delà), nettoyé au plus une fois par intervalle
+RESPONSE_CACHE_DISK_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+RESPONSE_CACHE_PRUNE_INTERVAL = float(os.getenv("RESPONSE_CACHE_PRUNE_INTERVAL", "300"))
+
+# -----------------------------------------------------
+#   CACHE SÉMANTIQUE DU CHAT (MESSAGES COURTS ET AUTONOMES)
+# -----------------------------------------------------
+# Désactivé par défaut : même restreint à chaque utilisateur, un message proche n'appelle pas toujours la même réponse
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "0") == "1"
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+# Similarité cosinus minimale entre deux formules de politesse pour réutiliser la réponse
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(6 * 3600)))
+# Au-delà de cette longueur (caractères normalisés), le message n'est pas mis en cache
+SEMANTIC_CACHE_MAX_CHARS = int(os.getenv("SEMANTIC_CACHE_MAX_CHARS", "60"))
+
+# -----------------------------------------------------
+#   THÈME D'UN MESSAGE (RATTACHEMENT AUX THÈMES CONNUS)
+# -----------------------------------------------------
+# 1 = un message est ramené au thème déjà utilisé par l'utilisateur le plus proche (mots du sujet)
+THEME_RESOLVER_ENABLED = os.getenv("THEME_RESOLVER_ENABLED", "1") == "1"
+# Similarité minimale (0 à 1) entre les mots du sujet pour réutiliser un thème existant
+THEME_MATCH_THRESHOLD = float(os.getenv("THEME_MATCH_THRESHOLD", "0.75"))
+# Thèmes retenus par utilisateur, et utilisateurs retenus (LRU)
+THEME_INDEX_MAX_PER_USER = int(os.getenv("THEME_INDEX_MAX_PER_USER", "20"))
+THEME_INDEX_MAX_USERS = int(os.getenv("THEME_INDEX_MAX_USERS", "10000"))
+
+# -----------------------------------------------------
+#   SECTION SUIVANTE ANTICIPÉE (GÉNÉRATION SPÉCULATIVE)
+# -----------------------------------------------------
+# 1 = après chaque section, la suivante est rédigée en arrière-plan si les backends sont libres
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+# Délai avant de décider (secondes) : les requêtes qui arrivent entre-temps passent devant
+PREFETCH_DELAY = float(os.getenv("PREFETCH_DELAY", "1"))
+# Lancement seulement si moins de N générations sont en cours ou en attente (tous backends) et la file de jobs vide
+PREFETCH_MAX_BUSY = int(os.getenv("PREFETCH_MAX_BUSY", "1"))
+# Sections anticipées gardées (une par utilisateur) et durée de validité
+PREFETCH_MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", "200"))
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", str(30 * 60)))
+
+# -----------------------------------------------------
+#     HISTORIQUE DES SECTIONS DANS LE PROMPT (TOKENS)
+# -----------------------------------------------------
+# Budget de tokens alloué aux sections déjà rédigées (0 = pas de limite)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Taille maximale du résumé conservé pour chaque section
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "150"))
+# "approx" (hors ligne, sans dépendance) ou "tiktoken" si le paquet est installé
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "approx")
+# Historique d'un thème relu depuis le stockage après N secondes : d'autres workers (ou d'autres
+# utilisateurs du même thème) peuvent y avoir ajouté des sections (0 = jamais, un seul processus)
+CONTEXT_L1_TTL = float(os.getenv("CONTEXT_L1_TTL", "5"))
+
+# -----------------------------------------------------
+#   CONTRÔLE D'ADMISSION (SEAUX DE JETONS, 429)
+# -----------------------------------------------------
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" ou "sqlite" (seaux partagés entre workers) ; vide = même choix que STORAGE_BACKEND
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "")
+# Fichier SQLite des seaux (vide = STORAGE_PATH)
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", "")
+# Rafale (taille du seau) et débit soutenu par minute ; 0 désactive le seau concerné
+RATE_USER_REQUESTS_BURST = float(os.getenv("RATE_USER_REQUESTS_BURST", "5"))
+RATE_USER_REQUESTS_PER_MINUTE = float(os.getenv("RATE_USER_REQUESTS_PER_MINUTE", "6"))
+# Tokens estimés : prompt + contexte + réponse maximale (max_tokens / num_predict)
+RATE_USER_TOKENS_BURST = float(os.getenv("RATE_USER_TOKENS_BURST", "16000"))
+RATE_USER_TOKENS_PER_MINUTE = float(os.getenv("RATE_USER_TOKENS_PER_MINUTE", "12000"))
+RATE_GLOBAL_REQUESTS_BURST = float(os.getenv("RATE_GLOBAL_REQUESTS_BURST", "30"))
+RATE_GLOBAL_REQUESTS_PER_MINUTE = float(os.getenv("RATE_GLOBAL_REQUESTS_PER_MINUTE", "60"))
+RATE_GLOBAL_TOKENS_BURST = float(os.getenv("RATE_GLOBAL_TOKENS_BURST", "120000"))
+RATE_GLOBAL_TOKENS_PER_MINUTE = float(os.getenv("RATE_GLOBAL_TOKENS_PER_MINUTE", "120000"))
+
+# -----------------------------------------------------
+#   POST /v2/ask (CORPS JSON / MSGPACK, COMPRESSION)
+# -----------------------------------------------------
+# Taille maximale du corps de requête (prompt + contexte)
+ASK_MAX_BODY_BYTES = int(os.getenv("ASK_MAX_BODY_BYTES", str(256 * 1024)))
+# En dessous de cette taille, la réponse n'est pas compressée
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli (si le paquet est installé) : 0 à 11, 5 = bon compromis débit / taille pour du texte généré
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# -----------------------------------------------------
+#   BIBLIOGRAPHIE DE L'UTILISATEUR (PDF/DOCX, RECHERCHE)
+# -----------------------------------------------------
+RAG_ENABLED = os.getenv("RAG_ENABLED", "1") == "1"
+# Un sous-répertoire par utilisateur (index BM25, passages, vecteurs)
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+RAG_MAX_UPLOAD_BYTES = int(os.getenv("RAG_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Taille des passages indexés (mots) et recouvrement entre deux passages consécutifs
+RAG_CHUNK_WORDS = int(os.getenv("RAG_CHUNK_WORDS", "180"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "30"))
+# Passages ajoutés au prompt d'une section, et budget de tokens qu'ils peuvent occuper
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+RAG_MAX_TOKENS = int(os.getenv("RAG_MAX_TOKENS", "1200"))
+# Poids de la similarité vectorielle dans le score (0 = BM25 seul ; ignoré sans NumPy)
+RAG_DENSE_WEIGHT = float(os.getenv("RAG_DENSE_WEIGHT", "0.3"))
+# Index d'utilisateurs gardés ouverts en mémoire (LRU)
+RAG_MAX_LOADED_INDEXES = int(os.getenv("RAG_MAX_LOADED_INDEXES", "64"))
+
+# -----------------------------------------------------
+#     STOCKAGE (SECTIONS, PROGRESSION, HISTORIQUE CHAT)
+# -----------------------------------------------------
+# "memory" (un seul processus, perdu au redémarrage) ou "sqlite" (persistant, partagé entre workers)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+STORAGE_PATH = os.getenv("STORAGE_PATH", "memory_ai.db")
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "4"))
+# Les écritures sont groupées et vidées en arrière-plan toutes les N secondes (ou par lots)
+STORAGE_FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "0.5"))
+STORAGE_BATCH_SIZE = int(os.getenv("STORAGE_BATCH_SIZE", "100"))
+# Nombre de messages de conversation repris dans le prompt
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "20"))
+# Capacité de l'historique d'un utilisateur, en tokens (les messages les plus anciens sortent)
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "2000"))
+# Plafond global en mémoire : au-delà, les utilisateurs inactifs sont évincés (LRU)
+CHAT_MEMORY_MAX_TOKENS = int(os.getenv("CHAT_MEMORY_MAX_TOKENS", "2000000"))
+CHAT_MAX_USERS = int(os.getenv("CHAT_MAX_USERS", "10000"))
+# Plusieurs workers sans routage par utilisateur : un historique en mémoire plus vieux que N secondes
+# est relu depuis le stockage partagé (0 = jamais, un seul processus ou routage par utilisateur)
+CHAT_L1_TTL = float(os.getenv("CHAT_L1_TTL", "0"))
+
+# -----------------------------------------------------
+#   RÉVISION D'UNE SECTION (PATCH JSON, HISTORIQUE DES VERSIONS)
+# -----------------------------------------------------
+# Tokens maximum du patch renvoyé par le modèle (paragraphes modifiés uniquement)
+SECTION_EDIT_MAX_TOKENS = int(os.getenv("SECTION_EDIT_MAX_TOKENS", "1500"))
+SECTION_VERSIONS_MAX = int(os.getenv("SECTION_VERSIONS_MAX", "20"))
+
+# -----------------------------------------------------
+#   GÉNÉRATION D'UN DOCUMENT COMPLET (/generate-document)
+# -----------------------------------------------------
+# Nombre de sections rédigées en même temps (tous backends confondus)
+DOCUMENT_CONCURRENCY = int(os.getenv("DOCUMENT_CONCURRENCY", "4"))
+# Jobs terminés conservés pour consultation
+DOCUMENT_MAX_JOBS = int(os.getenv("DOCUMENT_MAX_JOBS", "100"))
+
+# -----------------------------------------------------
+#        FILE DE JOBS DE GÉNÉRATION (POST /jobs)
+# -----------------------------------------------------
+# Générations exécutées en même temps par le pool de workers
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Au-delà, POST /jobs répond 429 avec Retry-After
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "200"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "5"))
+# Jobs terminés conservés pour consultation
+JOB_MAX_KEPT = int(os.getenv("JOB_MAX_KEPT", "1000"))
+
+# -----------------------------------------------------
+#   ROUTAGE ADAPTATIF GROQ / OLLAMA (TEMPS DE RÉPONSE ESTIMÉ)
+# -----------------------------------------------------
+# Poids des nouvelles mesures dans les moyennes glissantes (latence, tokens/s, erreurs)
+ROUTER_EWMA_ALPHA = float(os.getenv("ROUTER_EWMA_ALPHA", "0.2"))
+# Longueur de réponse attendue (tokens) pour estimer la durée d'une section / d'un message
+ROUTER_SECTION_TOKENS = int(os.getenv("ROUTER_SECTION_TOKENS", "2500"))
+ROUTER_CHAT_TOKENS = int(os.getenv("ROUTER_CHAT_TOKENS", "300"))
+# Marge gardée sur les quotas Groq : en dessous, on déborde sur Ollama avant le 429
+ROUTER_RESERVE_REQUESTS = int(os.getenv("ROUTER_RESERVE_REQUESTS", "2"))
+ROUTER_RESERVE_TOKENS = int(os.getenv("ROUTER_RESERVE_TOKENS", "1000"))
+# Après un échec, le backend passe derrière les autres pendant N secondes (ou jusqu'à sa prochaine réussite)
+ROUTER_FAILURE_COOLDOWN = float(os.getenv("ROUTER_FAILURE_COOLDOWN", "30"))
+# Requêtes couvertes (chat) : second backend lancé si le premier n'a pas répondu après N secondes
+ROUTER_HEDGE_CHAT = os.getenv("ROUTER_HEDGE_CHAT", "0") == "1"
+ROUTER_HEDGE_DELAY = float(os.getenv("ROUTER_HEDGE_DELAY", "2"))
+
+# -----------------------------------------------------
+#     MÉTRIQUES (/metrics, EN-TÊTE SERVER-TIMING)
+# -----------------------------------------------------
+# 0 = aucune mesure (le détail Server-Timing reste disponible avec l'en-tête X-Server-Timing)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# 0 = l'en-tête X-Server-Timing est ignoré (durées internes jamais exposées aux clients)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+
+# -----------------------------------------------------
+#        SERVEUR (LANCEUR, WORKERS, ROUTAGE)
+# -----------------------------------------------------
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Nombre de processus workers (0 = un par cœur)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+# Plusieurs workers : un routeur devant eux envoie chaque utilisateur (et chaque job) toujours au même worker
+SERVER_STICKY = os.getenv("SERVER_STICKY", "1") == "1"
+# Ports internes des workers derrière le routeur (SERVER_WORKER_BASE_PORT + n)
+SERVER_WORKER_BASE_PORT = int(os.getenv("SERVER_WORKER_BASE_PORT", "8100"))
+# Identifiant du worker (fixé par le lanceur), préfixe des identifiants de jobs
+WORKER_ID = os.getenv("WORKER_ID", "")
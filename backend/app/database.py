@@ -0,0 +1,371 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app import config
+
+
+# -----------------------------------------------------
+#     INTERFACE DU STOCKAGE (SECTIONS, PROGRESSION, CHAT)
+# -----------------------------------------------------
+class StateRepository:
+    # blocking : lectures et écritures immédiates qui peuvent attendre un verrou (SQLite partagé entre workers),
+    # appelées alors hors de la boucle d'événements
+    blocking = False
+
+    # Sections rédigées : {theme: {section: texte}}
+    def get_sections(self, theme: str) -> dict:
+        raise NotImplementedError
+
+    def save_section(self, theme: str, section: str, text: str):
+        raise NotImplementedError
+
+    # Versions successives d'une section (les SECTION_VERSIONS_MAX plus récentes sont gardées)
+    def add_section_version(self, theme: str, section: str, text: str, note: str) -> int:
+        raise NotImplementedError
+
+    # [{"version", "note", "created_at", "size"}] de la plus ancienne à la plus récente
+    def get_section_versions(self, theme: str, section: str) -> list:
+        raise NotImplementedError
+
+    def get_section_version(self, theme: str, section: str, version: int):
+        raise NotImplementedError
+
+    # Progression : {"theme": ..., "current_section": ...}
+    def get_progress(self, user_id: str):
+        raise NotImplementedError
+
+    def save_progress(self, user_id: str, progress: dict):
+        raise NotImplementedError
+
+    # Historique de conversation : [(role, message)] du plus ancien au plus récent
+    def get_chat(self, user_id: str, limit: int) -> list:
+        raise NotImplementedError
+
+    def append_chat(self, user_id: str, role: str, message: str):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# -----------------------------------------------------
+#     IMPLÉMENTATION EN MÉMOIRE (UN SEUL PROCESSUS)
+# -----------------------------------------------------
+class InMemoryRepository(StateRepository):
+    def __init__(self):
+        self.memory_storage = {}   # {theme: {"section": "texte"}}
+        self.user_progress = {}    # {user_id: {"theme": ..., "current_section": ...}}
+        self.section_versions = {} # {(theme, section): [(version, texte, note, horodatage)]}
+
+    def get_sections(self, theme: str) -> dict:
+        return dict(self.memory_storage.get(theme, {}))
+
+    def save_section(self, theme: str, section: str, text: str):
+        self.memory_storage.setdefault(theme, {})[section] = text
+
+    def add_section_version(self, theme: str, section: str, text: str, note: str) -> int:
+        versions = self.section_versions.setdefault((theme, section), [])
+        version = versions[-1][0] + 1 if versions else 1
+        versions.append((version, text, note, time.time()))
+        del versions[:-config.SECTION_VERSIONS_MAX]
+        return version
+
+    def get_section_versions(self, theme: str, section: str) -> list:
+        return [{"version": version, "note": note, "created_at": created_at, "size": len(text)}
+                for version, text, note, created_at in self.section_versions.get((theme, section), [])]
+
+    def get_section_version(self, theme: str, section: str, version: int):
+        for number, text, _, _ in self.section_versions.get((theme, section), []):
+            if number == version:
+                return text
+        return None
+
+    def get_progress(self, user_id: str):
+        progress = self.user_progress.get(user_id)
+        return dict(progress) if progress is not None else None
+
+    def save_progress(self, user_id: str, progress: dict):
+        self.user_progress[user_id] = dict(progress)
+
+    # Pas de copie de l'historique ici : en mémoire, ChatHistoryStore (borné, LRU) est le seul stockage
+    def get_chat(self, user_id: str, limit: int) -> list:
+        return []
+
+    def append_chat(self, user_id: str, role: str, message: str):
+        pass
+
+
+# -----------------------------------------------------
+#               POOL DE CONNEXIONS SQLITE
+# -----------------------------------------------------
+class ConnectionPool:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            # WAL : lectures concurrentes pendant les écritures (plusieurs workers)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS memoir_sections (
+        theme TEXT NOT NULL,
+        section TEXT NOT NULL,
+        content TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (theme, section)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_memoir_sections_theme ON memoir_sections (theme, position)",
+    """CREATE TABLE IF NOT EXISTS section_versions (
+        theme TEXT NOT NULL,
+        section TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        note TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (theme, section, version)
+    )""",
+    """CREATE TABLE IF NOT EXISTS user_progress (
+        user_id TEXT PRIMARY KEY,
+        progress TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_user_id ON chat_messages (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages (created_at)",
+)
+
+
+# -----------------------------------------------------
+#   IMPLÉMENTATION SQL (ÉCRITURES GROUPÉES EN TÂCHE DE FOND)
+# -----------------------------------------------------
+class SqlRepository(StateRepository):
+    blocking = True
+
+    def __init__(self, path: str, pool_size: int = None, flush_interval: float = None, batch_size: int = None):
+        self.pool = ConnectionPool(path, pool_size or config.STORAGE_POOL_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else config.STORAGE_FLUSH_INTERVAL
+        self.batch_size = batch_size or config.STORAGE_BATCH_SIZE
+        with self.pool.connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+
+        # Écritures en attente : lues en priorité pour que chaque requête voie ses propres écritures
+        self._lock = threading.Lock()
+        # Un seul vidage à la fois ; _flush_lock n'est pris que le temps du COMMIT (jamais pendant l'attente
+        # du verrou d'écriture SQLite) : base et tampons sont lus dans un état cohérent sans bloquer les lectures
+        self._writer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending_sections = {}   # {(theme, section): (texte, horodatage)}
+        self._pending_progress = {}   # {user_id: (progression, horodatage)}
+        self._pending_chat = []       # [(user_id, role, message, horodatage)]
+        # Lot en cours d'écriture : retiré de la file, encore lu tant que le COMMIT n'est pas fait
+        self._writing_sections = {}
+        self._writing_progress = {}
+        self._writing_chat = []
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run_flusher, name="sql-flusher", daemon=True)
+        self._flusher.start()
+
+    # ---------- lectures ----------
+    def get_sections(self, theme: str) -> dict:
+        # Verrou de vidage : la base et la file d'attente sont lues dans un état cohérent
+        with self._flush_lock, self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT section, content FROM memoir_sections WHERE theme = ? ORDER BY position", (theme,)
+            ).fetchall()
+            sections = dict(rows)
+            with self._lock:
+                for pending in (self._writing_sections, self._pending_sections):
+                    for (pending_theme, section), (text, _) in pending.items():
+                        if pending_theme == theme:
+                            sections[section] = text
+        return sections
+
+    def get_section_versions(self, theme: str, section: str) -> list:
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT version, note, created_at, LENGTH(content) FROM section_versions "
+                "WHERE theme = ? AND section = ? ORDER BY version", (theme, section),
+            ).fetchall()
+        return [{"version": version, "note": note, "created_at": created_at, "size": size}
+                for version, note, created_at, size in rows]
+
+    def get_section_version(self, theme: str, section: str, version: int):
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT content FROM section_versions WHERE theme = ? AND section = ? AND version = ?",
+                (theme, section, version),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_progress(self, user_id: str):
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending_progress.get(user_id) or self._writing_progress.get(user_id)
+            if pending is not None:
+                return dict(pending[0])
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT progress FROM user_progress WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_chat(self, user_id: str, limit: int) -> list:
+        with self._flush_lock, self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT role, content FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+            history = [tuple(row) for row in reversed(rows)]
+            with self._lock:
+                history += [(role, message) for uid, role, message, _ in self._writing_chat + self._pending_chat
+                            if uid == user_id]
+        return history[-limit:]
+
+    # ---------- écritures (mises en file, vidées par le thread de fond) ----------
+    def save_section(self, theme: str, section: str, text: str):
+        with self._lock:
+            self._pending_sections[(theme, section)] = (text, time.time())
+            self._maybe_wake()
+
+    def add_section_version(self, theme: str, section: str, text: str, note: str) -> int:
+        # Écrite tout de suite (le numéro de version doit être unique entre workers) : BEGIN IMMEDIATE
+        # prend le verrou d'écriture avant de lire le dernier numéro
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) + 1 FROM section_versions WHERE theme = ? AND section = ?",
+                    (theme, section),
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO section_versions (theme, section, version, content, note, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (theme, section, version, text, note, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM section_versions WHERE theme = ? AND section = ? AND version <= ?",
+                    (theme, section, version - config.SECTION_VERSIONS_MAX),
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        return version
+
+    def save_progress(self, user_id: str, progress: dict):
+        with self._lock:
+            self._pending_progress[user_id] = (dict(progress), time.time())
+            self._maybe_wake()
+
+    def append_chat(self, user_id: str, role: str, message: str):
+        with self._lock:
+            self._pending_chat.append((user_id, role, message, time.time()))
+            self._maybe_wake()
+
+    def _maybe_wake(self):
+        pending = len(self._pending_sections) + len(self._pending_progress) + len(self._pending_chat)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[STORAGE ERROR] Écriture différée impossible : {e}")
+
+    def flush(self):
+        with self._writer_lock:
+            with self._lock:
+                self._writing_sections, self._pending_sections = self._pending_sections, {}
+                self._writing_progress, self._pending_progress = self._pending_progress, {}
+                self._writing_chat, self._pending_chat = self._pending_chat, []
+                sections, progress, chat = self._writing_sections, self._writing_progress, self._writing_chat
+            if not (sections or progress or chat):
+                return
+            try:
+                with self.pool.connection() as conn:
+                    # Verrou d'écriture pris ici (attente possible jusqu'au délai SQLite) sans bloquer les lectures
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for (theme, section), (text, updated_at) in sections.items():
+                            # La position d'une section existante est conservée (ordre d'écriture d'origine)
+                            conn.execute(
+                                "INSERT INTO memoir_sections (theme, section, content, position, updated_at) "
+                                "VALUES (?, ?, ?, (SELECT COUNT(*) FROM memoir_sections WHERE theme = ?), ?) "
+                                "ON CONFLICT (theme, section) DO UPDATE SET content = excluded.content, "
+                                "updated_at = excluded.updated_at",
+                                (theme, section, text, theme, updated_at),
+                            )
+                        conn.executemany(
+                            "INSERT INTO user_progress (user_id, progress, updated_at) VALUES (?, ?, ?) "
+                            "ON CONFLICT (user_id) DO UPDATE SET progress = excluded.progress, "
+                            "updated_at = excluded.updated_at",
+                            [(uid, json.dumps(p, ensure_ascii=False), ts) for uid, (p, ts) in progress.items()],
+                        )
+                        conn.executemany(
+                            "INSERT INTO chat_messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                            chat,
+                        )
+                        # COMMIT et retrait du lot en une étape pour les lecteurs : jamais lu deux fois ni manqué
+                        with self._flush_lock:
+                            conn.commit()
+                            with self._lock:
+                                self._writing_sections, self._writing_progress, self._writing_chat = {}, {}, []
+                    except BaseException:
+                        conn.rollback()
+                        raise
+            except BaseException:
+                # Échec : le lot repasse devant les écritures arrivées entre-temps
+                with self._lock:
+                    self._pending_sections = {**sections, **self._pending_sections}
+                    self._pending_progress = {**progress, **self._pending_progress}
+                    self._pending_chat = chat + self._pending_chat
+                    self._writing_sections, self._writing_progress, self._writing_chat = {}, {}, []
+                raise
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        self.pool.close()
+
+
+def create_repository(backend: str = None) -> StateRepository:
+    backend = backend or config.STORAGE_BACKEND
+    if backend == "sqlite":
+        return SqlRepository(config.STORAGE_PATH)
+    return InMemoryRepository()
@@ -1,5 +1,6 @@
+# Point d'entrée : uvicorn app.main:app, ou python -m app.main (lanceur, voir app/server.py)
+from app.models.fastAPI import app
 
-from fastapi import FastAPI
-
-import ollama
-
+if __name__ == "__main__":
+    from app.server import run
+    run(app)
@@ -1,31 +1,116 @@
+import asyncio
+import json
 import os
-import re
-import requests
-from fastapi import FastAPI, Query
+import tempfile
+import time
+from contextlib import aclosing, asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from groq import Groq
-from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from app import config
+from app.database import create_repository
+from app.services.chat_history import ChatHistoryStore
+from app.services.context_window import ContextWindow, get_tokenizer
+from app.services.document_jobs import DocumentGenerator, is_error_output
+from app.services.groq_service import GroqService
+from app.services.health import HealthMonitor
+from app.services.ingestion import IngestionError, detect_kind
+from app.services.intent_engine import detect_intention, intent_engine
+from app.services.job_queue import FINISHED, PRIORITY_CHAT, PRIORITY_SECTION, JobManager, QueueFullError
+from app.services.llm_client import BackendBusyError, BackendError
+from app.services.metrics import MetricsMiddleware, record_generation, registry as metrics_registry, set_labels, span
+from app.services.ollama_service import OllamaService
+from app.services.prefetch import Prefetcher, is_acceptance
+from app.services.prompt_templates import OUTLINE_HEADER, PromptBuilder
+from app.services.rate_limit import AdmissionController, RateLimitError
+from app.services.response_cache import ResponseCache, make_key
+from app.services.retrieval import RetrievalStore, format_passages
+from app.services.semantic_cache import SemanticCache
+from app.services.router import AdaptiveRouter
+from app.services.section_detector import detect_section, section_detector
+from app.services.section_edits import (PatchError, apply_patch, changed_paragraphs, is_edit_request, number_paragraphs,
+                                        parse_patch, split_paragraphs)
+from app.services.single_flight import SingleFlight
+from app.services.startup import StartupPipeline
+from app.services.theme_resolver import ThemeResolver, extract_theme, theme_extractor
+from app.services.wire import BodyError, decode_body, encode_response, read_body
 
 # -----------------------------------------------------
-#            CHARGEMENT VARIABLES .ENV
+#       CLIENTS ASYNCHRONES (GROQ ONLINE / OLLAMA OFFLINE)
 # -----------------------------------------------------
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+MODEL_NAME_ONLINE = config.MODEL_NAME_ONLINE
+MODEL_NAME_OFFLINE = config.MODEL_NAME_OFFLINE
+OLLAMA_URL = config.OLLAMA_URL
 
-client = Groq(api_key=GROQ_API_KEY)
-MODEL_NAME_ONLINE = "llama-3.1-8b-instant"
+groq_service = GroqService()
+ollama_service = OllamaService()
 
-# MODELE OFFLINE
-MODEL_NAME_OFFLINE = "llama3.2:3b-instruct-q4_K_M"
-OLLAMA_URL = "http://localhost:11434/api/generate"
+# Options de génération des sections (font partie de la clé de cache)
+ONLINE_OPTIONS = {"temperature": 0.1, "max_tokens": 4000}
+OFFLINE_OPTIONS = {"temperature": 0.1, "num_predict": 3000}
+# Révision d'une section : seul le patch des paragraphes modifiés est généré
+EDIT_ONLINE_OPTIONS = {"temperature": 0.1, "max_tokens": config.SECTION_EDIT_MAX_TOKENS}
+EDIT_OFFLINE_OPTIONS = {"temperature": 0.1, "num_predict": config.SECTION_EDIT_MAX_TOKENS}
+
+# -----------------------------------------------------
+#     CACHE DES RÉPONSES (PROMPT + MODELE + OPTIONS)
+# -----------------------------------------------------
+response_cache = ResponseCache(
+    max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+    ttl=config.RESPONSE_CACHE_TTL,
+    disk_path=config.RESPONSE_CACHE_PATH or None,
+    disk_max_bytes=config.RESPONSE_CACHE_DISK_MAX_BYTES,
+    prune_interval=config.RESPONSE_CACHE_PRUNE_INTERVAL,
+) if config.RESPONSE_CACHE_ENABLED else None
+
+async def cache_get(prompt: str, model: str, options: dict):
+    # La clé sert aussi au single-flight, elle est calculée même sans cache
+    set_labels(backend=model)
+    with span("cache"):
+        key = make_key(prompt, model, options)
+        if response_cache is None:
+            return key, None
+        return key, await response_cache.get(key)
+
+async def cache_set(key: str, output: str):
+    if response_cache is not None and key is not None and output:
+        await response_cache.set(key, output)
+
+# Appels identiques simultanés (double clic, relance du frontend) : une seule génération,
+# les doublons se rattachent à celle en cours et reçoivent le même texte
+single_flight = SingleFlight()
+
+# Messages de chat courts et autonomes : réponse réutilisée pour le même utilisateur si le même message
+# (ou, pour « bonjour », « merci »..., un message assez proche) a déjà reçu une réponse
+semantic_cache = SemanticCache(
+    max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+    threshold=config.SEMANTIC_CACHE_THRESHOLD,
+    ttl=config.SEMANTIC_CACHE_TTL,
+    max_chars=config.SEMANTIC_CACHE_MAX_CHARS,
+) if config.SEMANTIC_CACHE_ENABLED else None
+
+def semantic_get(user_id: str, prompt: str):
+    if semantic_cache is None:
+        return None
+    with span("semantic_cache"):
+        return semantic_cache.get(user_id, prompt)
+
+def semantic_set(user_id: str, prompt: str, answer: str):
+    if semantic_cache is not None and not is_error_output(answer):
+        semantic_cache.set(user_id, prompt, answer)
 
 # -----------------------------------------------------
 #   STOCKAGE DES HISTORIQUES (chat et mémoire)
 # -----------------------------------------------------
-user_memory = {}         # {user_id: [("role", "message")]}
-memory_storage = {}      # {theme: {"section": "texte"}}
-user_progress = {}       # {user_id: {"theme": ..., "current_section": ...}}
+# Sections {theme: {section: texte}}, progression {user_id: {...}} et historique de chat
+# derrière un dépôt : en mémoire par défaut, SQLite partagé entre workers (STORAGE_BACKEND)
+repository = create_repository()
+
+# Historique de chat par utilisateur : tampon borné en tokens, transcript tenu à jour à l'ajout,
+# plafond mémoire global avec éviction des utilisateurs inactifs (rechargés depuis le dépôt)
+chat_history = ChatHistoryStore(repository)
 
 # Ordre des sections pour le workflow avec la nouvelle structure détaillée
 sections_order = [
@@ -50,19 +135,65 @@ section_mapping = {
 }
 
 # -----------------------------------------------------
-#     VERIFIE SI GROQ EST ACCESSIBLE (INTERNET OK)
+#     SANTÉ DES BACKENDS (SONDES EN ARRIÈRE-PLAN)
 # -----------------------------------------------------
-def groq_is_available():
-    try:
-        client.models.list()
-        return True
-    except Exception:
-        return False
+health = HealthMonitor()
+health.register("groq", groq_service.ping)
+health.register("ollama", ollama_service.ping)
+
+# -----------------------------------------------------
+#   ROUTAGE GROQ / OLLAMA (TEMPS DE RÉPONSE ESTIMÉ, QUOTAS)
+# -----------------------------------------------------
+# Chaque requête part sur le backend sain au temps de réponse estimé le plus court
+# (latence et débit mesurés, file d'attente, taux d'erreur, quotas Groq restants) ;
+# Ollama reste le repli quand aucun backend n'est disponible.
+router = AdaptiveRouter({"groq": groq_service, "ollama": ollama_service}, health, get_tokenizer(), fallback="ollama")
+MODEL_NAMES = {"groq": MODEL_NAME_ONLINE, "ollama": MODEL_NAME_OFFLINE}
+
+def plan_backends(prompt: str, output_tokens: int) -> list:
+    # Backends dans l'ordre estimé : les suivants servent de repli si le premier échoue
+    with span("routing"):
+        order = router.plan(prompt, output_tokens)
+    set_labels(backend=MODEL_NAMES[order[0]])
+    return order
+
+def record_success(backend: str, start: float, prompt: str, output: str, ttft: float = None):
+    latency = time.monotonic() - start
+    health.record_success(backend, latency)
+    router.record_success(backend, latency, output, ttft)
+    record_generation(MODEL_NAMES[backend], prompt, output)
+
+def record_failure(backend: str, error):
+    health.record_failure(backend, error)
+    router.record_failure(backend)
 
 # -----------------------------------------------------
 #               FASTAPI CONFIG
 # -----------------------------------------------------
-app = FastAPI(title="Memory Assistant — Hybrid AI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup.start()
+    health.start()
+    job_manager.start()
+    yield
+    await startup.stop()
+    if prefetcher is not None:
+        await prefetcher.aclose()
+    await job_manager.stop()
+    await document_generator.aclose()
+    await health.stop()
+    await groq_service.aclose()
+    await ollama_service.aclose()
+    repository.close()
+    if retrieval is not None:
+        retrieval.close()
+    if admission is not None:
+        admission.close()
+
+app = FastAPI(title="Memory Assistant — Hybrid AI", lifespan=lifespan)
+
+# Durées par route et par étape (/metrics) ; détail Server-Timing avec l'en-tête X-Server-Timing: 1
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -79,593 +210,354 @@ class ResponseModel(BaseModel):
     section: str
     response: str
 
-# -----------------------------------------------------
-#      DETECTION AUTOMATIQUE DE L'INTENTION
-# -----------------------------------------------------
-def detect_intention(message: str) -> str:
-    message_lower = message.lower().strip()
-    greetings = ["bonjour", "salut", "hello", "hi", "coucou", "hey", "bonsoir"]
-
-    for greeting in greetings:
-        if message_lower == greeting or message_lower.startswith(f"{greeting} "):
-            if len(message_lower.split()) <= 3:
-                return "chat"
-
-    memoire_keywords = [
-        "rédiger", "rédige", "rédaction", "mémoire", "memoire", "thèse", "these",
-        "rapport", "projet", "dissertation", "introduction", "chapitre", "conclusion",
-        "section", "problématique", "méthodologie", "bibliographie", "littérature",
-        "revue", "état de l'art", "méthodes", "résultats", "discussion", "analyse",
-        "partie", "paragraphe", "sujet", "thème", "titre", "universitaire", "académique",
-        "cadre théorique", "matériels et méthodes", "contexte d'étude", "problématique"
-    ]
-
-    memoire_phrases = [
-        "aide moi à rédiger", "aide-moi à rédiger", "aide pour rédiger",
-        "je dois rédiger", "je veux rédiger", "j'ai besoin de rédiger",
-        "comment rédiger", "comment faire un", "structure d'un mémoire",
-        "plan de mémoire", "aide pour mon mémoire", "aide pour ma thèse",
-        "rédiger l'introduction", "rédiger le chapitre", "rédiger la conclusion"
-    ]
-
-    for phrase in memoire_phrases:
-        if phrase in message_lower:
-            return "memoire"
-
-    keyword_count = sum(1 for keyword in memoire_keywords if keyword in message_lower)
-    if keyword_count >= 2:
-        return "memoire"
-
-    if len(message_lower.split()) > 20:
-        return "memoire"
-
-    return "chat"
-
-# -----------------------------------------------------
-#      DETECTION AMÉLIORÉE DE SECTION (pour mémoire)
-# -----------------------------------------------------
-def detect_section(message: str) -> str:
-    message_lower = message.lower()
-
-    # Patterns détaillés selon la nouvelle méthodologie
-    patterns = {
-        "introduction": [
-            r"(?:^|\s)introduction\s+générale?\b",
-            r"commence(?:r|z)?\s+(?:par\s+)?l['']?introduction",
-            r"rédige(?:r|z)?\s+(?:l['']?)?introduction",
-            r"contexte\s+d['']?étude",
-            r"problématique\s+(?:et|ou)\s+objectifs",
-            r"début(?:er)?\s+(?:le\s+)?mémoire",
-            r"1\s*\.?\s*contexte",
-            r"plan\s+du\s+document"
-        ],
-        "chapitre 1 - cadre théorique": [
-            r"chapitre\s*1\s*[\.\-]?\s*(?:cadre\s+théorique|concepts\s+clés)",
-            r"cadre\s+théorique",
-            r"concepts\s+clés",
-            r"définitions\s+opérationnelles",
-            r"1\.1\s*concepts",
-            r"présentation\s+des\s+concepts"
-        ],
-        "chapitre 1 - synthèse travaux": [
-            r"chapitre\s*1\s*[\.\-]?\s*(?:synthèse|travaux|état\s+de\s+l['']?art)",
-            r"synthèse\s+des\s+travaux",
-            r"travaux\s+antérieurs",
-            r"travaux\s+récents",
-            r"état\s+de\s+l['']?art",
-            r"revue\s+de\s+la\s+littérature",
-            r"1\.2\s*synthèse",
-            r"cartographie\s+de\s+la\s+recherche"
-        ],
-        "chapitre 1 - analyse critique": [
-            r"chapitre\s*1\s*[\.\-]?\s*(?:analyse\s+critique|gap)",
-            r"analyse\s+critique",
-            r"discussion\s+critique",
-            r"identification\s+du\s+gap",
-            r"lacune\s+de\s+recherche",
-            r"1\.3\s*analyse",
-            r"critique\s+des\s+travaux"
-        ],
-        "chapitre 2 - matériels et terrain": [
-            r"chapitre\s*2\s*[\.\-]?\s*(?:matériels|terrain|outils)",
-            r"matériels\s+(?:et|ou)\s+outils",
-            r"description\s+du\s+terrain",
-            r"population\s+(?:d['']?|de\s+)étude",
-            r"corpus\s+d['']?étude",
-            r"2\.1\s*matériels",
-            r"outils\s+de\s+collecte",
-            r"échantillon\s+(?:de\s+)?recherche"
-        ],
-        "chapitre 2 - méthodologie": [
-            r"chapitre\s*2\s*[\.\-]?\s*(?:méthodologie|méthodes)",
-            r"méthodologie\s+de\s+recherche",
-            r"design\s+de\s+recherche",
-            r"procédure\s+de\s+collecte",
-            r"méthodes\s+d['']?analyse",
-            r"2\.2\s*méthodes",
-            r"protocole\s+de\s+recherche"
-        ],
-        "chapitre 3 - résultats": [
-            r"chapitre\s*3\s*[\.\-]?\s*(?:résultats|présentation)",
-            r"présentation\s+des\s+résultats",
-            r"résultats\s+obtenus",
-            r"données\s+collectées",
-            r"3\.1\s*résultats",
-            r"faits\s+et\s+chiffres",
-            r"tableaux\s+(?:de\s+)?résultats"
-        ],
-        "chapitre 3 - discussion": [
-            r"chapitre\s*3\s*[\.\-]?\s*(?:discussion|analyse)",
-            r"discussion\s+des\s+résultats",
-            r"analyse\s+(?:et\s+|des\s+)résultats",
-            r"interprétation\s+des\s+résultats",
-            r"3\.2\s*discussion",
-            r"confrontation\s+avec\s+la\s+littérature"
-        ],
-        "conclusion": [
-            r"(?:^|\s)conclusion\s+(?:et\s+perspectives)?\b",
-            r"termine(?:r|z)?\s+(?:par\s+)?la\s+conclusion",
-            r"rédige(?:r|z)?\s+(?:la\s+)?conclusion",
-            r"synthèse\s+finale",
-            r"bilan\s+(?:final|général)",
-            r"perspectives\s+(?:de\s+recherche|d['']?avenir)",
-            r"limites\s+de\s+l['']?étude"
-        ]
-    }
-
-    # D'abord chercher les patterns détaillés
-    for section, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            if re.search(pattern, message_lower, flags=re.IGNORECASE):
-                return section
-
-    # Fallback vers les sections génériques
-    if any(word in message_lower for word in ["début", "commencer", "première", "premier", "contexte", "problématique"]):
-        return "introduction"
-    elif any(word in message_lower for word in ["chapitre 1", "revue littérature", "état art", "littérature"]):
-        return "chapitre 1 - cadre théorique"
-    elif any(word in message_lower for word in ["chapitre 2", "méthodologie", "méthodes", "matériel"]):
-        return "chapitre 2 - matériels et terrain"
-    elif any(word in message_lower for word in ["chapitre 3", "résultats", "discussion", "analyse résultats"]):
-        return "chapitre 3 - résultats"
-    elif any(word in message_lower for word in ["fin", "terminer", "dernier", "bilan", "perspectives"]):
-        return "conclusion"
-
-    # Par défaut
-    return "introduction"
+class AskRequest(BaseModel):
+    prompt: str
+    context: str = ""
+    user_id: str = "default"
 
 # -----------------------------------------------------
 #               EXTRACTION DU THÈME
 # -----------------------------------------------------
-def extract_theme(message: str) -> str:
-    message_lower = message.lower()
-    theme_patterns = [
-        r"(?:thème|sujet|titre|sur)\s*(?:est|:|-)\s*\"?([^\"]+?)\"?\s*(?:\.|$|pour)",
-        r"rédiger\s+(?:un|une|le|la)?\s*(?:mémoire|rapport|thèse)\s+(?:sur|au sujet de|titré)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
-        r"mémoire\s+(?:sur|intitulé)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
-        r"(?:je\s+veux|je\s+dois|j['']aimerais)\s+rédiger\s+(?:un|une)\s*(?:mémoire|rapport)\s+(?:sur|au sujet de)\s*\"?([^\"]+?)\"?\s*(?:\.|$)"
-    ]
-
-    for pattern in theme_patterns:
-        match = re.search(pattern, message_lower, flags=re.IGNORECASE)
-        if match:
-            theme = match.group(1).strip()
-            theme = re.sub(r"^['\"]|['\"]$", "", theme)
-            if len(theme.split()) <= 15:
-                return theme.capitalize()
-
-    words = message.split()
-    stop_words = ["je","tu","il","elle","nous","vous","ils","elles","le","la","les",
-                  "un","une","des","de","du","à","au","pour","sur","avec","sans","dans",
-                  "par","est","sont","ai","as","a","avons","avez","ont","veux","dois","peux"]
-    important_words = [word for word in words if word.lower() not in stop_words]
-    if len(important_words) >= 2:
-        return " ".join(important_words[:5])
-    return "Thème non spécifié"
+# Patterns compilés au démarrage ; le thème extrait est ramené au thème le plus proche déjà utilisé
+# par l'utilisateur (« Rédige la conclusion » ne repart pas de zéro sous un nouveau thème)
+theme_resolver = ThemeResolver(theme_extractor, sections=sections_order)
+
+def resolve_theme(user_id: str, prompt: str, current: str = None) -> str:
+    if not config.THEME_RESOLVER_ENABLED:
+        return extract_theme(prompt)
+    return theme_resolver.resolve(user_id, prompt, current)
 
 # -----------------------------------------------------
 #        AJOUT / RECUPERATION DE LA MÉMOIRE UTILISATEUR
 # -----------------------------------------------------
-def get_user_context(user_id: str) -> str:
-    if user_id in user_memory:
-        return "\n".join([f"{role}: {msg}" for role, msg in user_memory[user_id]])
-    return ""
+async def storage_call(func, *args):
+    # Dépôt SQLite : une lecture peut attendre le COMMIT d'un vidage ou d'un autre worker, hors de la boucle d'événements
+    if repository.blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+async def get_user_context(user_id: str) -> str:
+    return await storage_call(chat_history.get_context, user_id)
 
-def update_user_context(user_id: str, role: str, message: str):
-    if user_id not in user_memory:
-        user_memory[user_id] = []
-    user_memory[user_id].append((role, message))
-    # Limiter à 20 messages max pour éviter surcharge
-    if len(user_memory[user_id]) > 20:
-        user_memory[user_id] = user_memory[user_id][-20:]
+async def update_user_context(user_id: str, role: str, message: str):
+    await storage_call(chat_history.append, user_id, role, message)
 
 # -----------------------------------------------------
 #               PROMPT BUILDER (pour mémoire)
 # -----------------------------------------------------
-def build_prompt(theme: str, section: str, context: str = "") -> str:
-    prev_context = memory_storage.get(theme, {})
-    previous_text = "\n".join([f"[{sec}] {txt}" for sec, txt in prev_context.items()])
-
-    # NOUVELLE MÉTHODOLOGIE DÉTAILLÉE
-    methodology = """
-MÉTHODOLOGIE ACADÉMIQUE DÉTAILLÉE POUR LA RÉDACTION DE MÉMOIRE
-
-========================================
-INTRODUCTION GÉNÉRALE
-========================================
-Fonction : Poser les fondations du mémoire, justifier son existence et en présenter la structure logique.
-
-1. CONTEXTE D'ÉTUDE
-   • Cadre général : Présentation du domaine scientifique, professionnel ou sociétal dans lequel s'inscrit le sujet.
-   • Cadre spécifique : Délimitation précise du terrain, de l'entreprise, de la communauté ou du corpus d'étude.
-   • Justification et intérêt : Pourquoi ce sujet est-il important maintenant ? (Enjeux actuels, lacunes observées, demandes institutionnelles).
-   • Historique succinct : Évolution de la situation ayant conduit au besoin d'étude.
-
-2. PROBLÉMATIQUE ET OBJECTIFS
-   • Question de départ : La question large qui a initié la réflexion.
-   • Problématique formulée : La question centrale, précise, argumentée et construite qui guide toute la recherche. Elle montre la "tension" ou le "problème" à résoudre.
-   • Objectif général : La finalité ultime du mémoire (ex : Concevoir, Évaluer, Comprendre, Proposer un modèle).
-   • Objectifs spécifiques (SMART) : La décomposition concrète et hiérarchisée des étapes à franchir pour atteindre l'objectif général.
-
-3. PLAN DU DOCUMENT
-   • Logique de la structure : Justification du choix des chapitres (approche dialectique, analytique, comparative, etc.).
-   • Annonce synthétique : Présentation claire et succincte du contenu de chaque partie principale.
-
-========================================
-CHAPITRE 1 : REVUE DE LA LITTÉRATURE / ÉTAT DE L'ART
-========================================
-Fonction : Démontrer la maîtrise du sujet, identifier les connaissances établies et les lacunes pour justifier sa propre recherche.
-
-1.1 PRÉSENTATION DES CONCEPTS CLÉS ET CADRE THÉORIQUE
-   • Définitions opérationnelles : Définition précise des termes centraux du sujet, en citant les auteurs de référence.
-   • Cadre théorique : Présentation et explication des théories, modèles ou paradigmes qui serviront de grille d'analyse.
-   • Historique et évolution des idées : Comment les concepts et théories ont-ils évolué jusqu'à aujourd'hui ?
-
-1.2 SYNTHÈSE DES TRAVAUX ANTÉRIEURS ET RÉCENTS
-   • Méthodologie de la revue : Critères de sélection des sources (mots-clés, bases de données, périodes, langues).
-   • Cartographie de la recherche : Classement des travaux par écoles de pensée, méthodologies, ou résultats convergents/divergents.
-   • Études fondatrices et pionnières : Les recherches qui ont marqué le domaine.
-   • Études les plus récentes : L'état actuel de la recherche, identifiant les fronts de science.
-
-1.3 ANALYSE CRITIQUE ET IDENTIFICATION DU GAP
-   • Discussion critique : Confrontation des points de vue, forces et faiblesses des méthodologies employées, limites des résultats.
-   • Synthèse des apports : Ce qui est acquis, consensuel.
-   • Identification de la niche (le "gap") : Mise en évidence claire de la lacune, de la question non résolue que votre mémoire vient combler.
-
-========================================
-CHAPITRE 2 : MATÉRIELS ET MÉTHODES
-========================================
-Fonction : Décrire avec une précision reproductible le "comment" de la recherche. C'est le protocole scientifique.
-
-2.1 MATÉRIELS, OUTILS ET TERRAIN
-   • Description du terrain / population / corpus :
-        - Sélection et critères d'inclusion/exclusion.
-        - Taille, caractéristiques principales (descriptif statistique ou qualitatif).
-        - Accès au terrain et considérations éthiques (accord, consentement, anonymat).
-   • Matériels (Hardware/Software) :
-        - Liste et spécifications techniques des équipements.
-        - Logiciels utilisés (pour l'analyse, la modélisation, les statistiques) avec version.
-   • Outils de collecte :
-        - Questionnaire (en annexe), guide d'entretien, grille d'observation.
-        - Justification de leur élaboration (adaptation d'outils validés, création originale).
-
-2.2 MÉTHODOLOGIE DE LA RECHERCHE
-   • Choix du design de recherche : Qualitative, Quantitative ou Mixte. Justification.
-   • Procédure de collecte des données : Déroulement chronologique précis (étape par étape), période, durée, conditions.
-   • Méthodes d'analyse des données :
-        - Pour données quantitatives : Tests statistiques utilisés (avec justification), logiciel.
-        - Pour données qualitatives : Méthode d'analyse (analyse de contenu, thématique, discours), processus de codage.
-   • Limites méthodologiques et biais potentiels : Anticipation et reconnaissance des limites inhérentes aux choix méthodologiques.
-
-========================================
-CHAPITRE 3 : RÉSULTATS, ANALYSE ET DISCUSSION
-========================================
-Fonction : Présenter, interpréter et confronter les résultats à la lumière du cadre théorique.
-
-STRUCTURE OPTION A : RÉSULTATS ET DISCUSSION INTÉGRÉS (par thème/objectif)
-   • Présentation des résultats : Faits bruts organisés (tableaux, graphiques, citations significatives).
-   • Analyse et Interprétation : Que signifient ces faits ? Explication immédiate.
-   • Discussion : Confrontation de ce résultat avec les travaux cités au Chapitre 1 (confirmation, infirmation, nuance).
-
-STRUCTURE OPTION B : RÉSULTATS ET DISCUSSION SÉPARÉS
-   3.1 PRÉSENTATION DES RÉSULTATS
-        - Organisation stricte selon les objectifs spécifiques ou les thèmes de recherche.
-        - Présentation neutre et factuelle des données, sans interprétation.
-        - Utilisation efficace des visuels (graphiques, tableaux clairement titrés et commentés).
-   
-   3.2 ANALYSE ET DISCUSSION GÉNÉRALE
-        - Interprétation globale : Donner du sens à l'ensemble des résultats.
-        - Discussion argumentée : Confrontation systématique avec l'état de l'art, explication des convergences/divergences.
-        - Réponse à la problématique : Montrer en quoi les résultats apportent des éléments de réponse.
-
-========================================
-CONCLUSION ET PERSPECTIVES
-========================================
-Fonction : Boucler la boucle logique du mémoire, résoudre la problématique et ouvrir sur l'avenir.
-
-1. BILAN SYNTHÉTIQUE ET RÉPONSES APPORTÉES
-   • Récapitulation synthétique : Rappel très concis des objectifs et de la démarche.
-   • Réponse à la problématique : Formulation claire et affirmative de la réponse principale.
-   • Synthèse des apports principaux : Les 3-4 contributions majeures (théoriques, méthodologiques, pratiques).
-   • Limites de l'étude : Reconnaissance honnête et argumentée des limites.
-
-2. PERSPECTIVES
-   • Perspectives de recherche : Propositions concrètes pour des recherches futures.
-   • Perspectives pratiques / Recommandations : Propositions d'actions concrètes.
-   • Ouverture : Élargissement du sujet vers un débat plus vaste.
-"""
-
-    # Instructions spécifiques par section
-    section_instructions = {
-        "introduction": """
-Pour l'INTRODUCTION GÉNÉRALE, développez chaque point suivant :
-1. Contexte d'étude (environ 25 lignes)
-   - Cadre général et spécifique
-   - Justification de l'intérêt actuel du sujet
-   - Historique succinct si pertinent
-
-2. Problématique et objectifs (environ 25 lignes)
-   - Formulation précise de la problématique avec justification
-   - Objectif général bien défini
-   - 3-5 objectifs spécifiques formulés de manière SMART
-
-3. Plan du document (environ 10 lignes)
-   - Logique de la structure choisie
-   - Annonce synthétique des chapitres
-""",
-        "chapitre 1 - cadre théorique": """
-Pour le CADRE THÉORIQUE (Chapitre 1.1), développez :
-1. Définitions opérationnelles (environ 20 lignes)
-   - Définitions précises des concepts clés avec auteurs
-   - Clarification des termes techniques
-
-2. Cadre théorique (environ 25 lignes)
-   - Présentation des théories principales
-   - Explication de leur pertinence pour votre étude
-   - Articulation entre les différentes théories
-
-3. Historique et évolution des idées (environ 15 lignes)
-   - Évolution chronologique des concepts
-   - Tournants théoriques importants
-""",
-        "chapitre 1 - synthèse travaux": """
-Pour la SYNTHÈSE DES TRAVAUX (Chapitre 1.2), développez :
-1. Méthodologie de la revue (environ 15 lignes)
-   - Critères de sélection des sources
-   - Bases de données consultées
-   - Période couverte
-
-2. Cartographie de la recherche (environ 20 lignes)
-   - Classification des travaux par approches
-   - Tableau synthétique des principales études
-   - Tendances dominantes dans la littérature
-
-3. Études clés (environ 25 lignes)
-   - Présentation des études fondatrices
-   - Analyse des travaux récents les plus pertinents
-   - Synthèse des principaux résultats existants
-""",
-        "chapitre 1 - analyse critique": """
-Pour l'ANALYSE CRITIQUE (Chapitre 1.3), développez :
-1. Discussion critique (environ 25 lignes)
-   - Forces et faiblesses des méthodologies rencontrées
-   - Limites des résultats des études existantes
-   - Controverses ou débats dans la littérature
-
-2. Synthèse des apports (environ 15 lignes)
-   - Consensus établis dans le domaine
-   - Connaissances acquises et validées
-
-3. Identification du gap (environ 20 lignes)
-   - Lacunes de recherche clairement identifiées
-   - Questions non résolues
-   - Justification de l'originalité de votre approche
-""",
-        "chapitre 2 - matériels et terrain": """
-Pour les MATÉRIELS ET TERRAIN (Chapitre 2.1), développez :
-1. Description du terrain/corpus (environ 25 lignes)
-   - Critères de sélection détaillés
-   - Caractéristiques principales (tableau descriptif si pertinent)
-   - Procédures d'accès et considérations éthiques
-
-2. Matériels et outils (environ 20 lignes)
-   - Liste complète avec spécifications techniques
-   - Justification des choix techniques
-   - Conditions d'utilisation et calibration
-
-3. Outils de collecte (environ 15 lignes)
-   - Présentation des instruments utilisés
-   - Procédure de validation/adaptation
-   - Fiabilité et validité des outils
-""",
-        "chapitre 2 - méthodologie": """
-Pour la MÉTHODOLOGIE (Chapitre 2.2), développez :
-1. Design de recherche (environ 20 lignes)
-   - Justification du choix qualitatif/quantitatif/mixte
-   - Schéma de la recherche
-   - Variables étudiées (si applicable)
-
-2. Procédure de collecte (environ 25 lignes)
-   - Déroulement chronologique étape par étape
-   - Conditions expérimentales ou d'observation
-   - Durée et planning de la collecte
-
-3. Méthodes d'analyse (environ 20 lignes)
-   - Techniques statistiques ou d'analyse qualitative
-   - Justification des choix méthodologiques
-   - Procédures de traitement des données
-
-4. Limites méthodologiques (environ 15 lignes)
-   - Biais potentiels identifiés
-   - Contraintes pratiques rencontrées
-   - Stratégies de contrôle mises en place
-""",
-        "chapitre 3 - résultats": """
-Pour les RÉSULTATS (Chapitre 3.1), développez :
-1. Organisation des résultats (environ 15 lignes)
-   - Structure selon les objectifs spécifiques
-   - Logique de présentation
-
-2. Présentation factuelle (environ 30 lignes)
-   - Données brutes organisées clairement
-   - Tableaux et graphiques pertinents avec légendes explicatives
-   - Citations significatives (pour études qualitatives)
-
-3. Neutralité scientifique (environ 10 lignes)
-   - Présentation sans interprétation
-   - Objectivité des données présentées
-""",
-        "chapitre 3 - discussion": """
-Pour la DISCUSSION (Chapitre 3.2), développez :
-1. Interprétation des résultats (environ 25 lignes)
-   - Signification des principaux résultats
-   - Explications possibles des observations
-
-2. Confrontation avec la littérature (environ 30 lignes)
-   - Comparaison avec les études du chapitre 1
-   - Explication des convergences et divergences
-   - Positionnement par rapport au cadre théorique
-
-3. Réponse à la problématique (environ 15 lignes)
-   - Articulation entre résultats et question de recherche
-   - Éléments de réponse apportés
-   - Nouvelles questions soulevées
-""",
-        "conclusion": """
-Pour la CONCLUSION, développez :
-1. Bilan synthétique (environ 20 lignes)
-   - Récapitulation concise de la démarche
-   - Synthèse des principaux résultats
-
-2. Réponse globale (environ 15 lignes)
-   - Formulation claire de la réponse à la problématique
-   - Apports principaux de la recherche
-
-3. Limites de l'étude (environ 15 lignes)
-   - Reconnaissance honnête des limites
-   - Impact potentiel sur les résultats
-
-4. Perspectives (environ 20 lignes)
-   - Pistes de recherche futures concrètes
-   - Recommandations pratiques si applicables
-   - Ouverture sur des questions plus larges
-"""
-    }
-
-    brainstorming = """
-BRAINSTORMING ACADÉMIQUE REQUIS :
-Avant de rédiger, effectuez un brainstorming interne pour organiser TOUTES les informations pertinentes.
-Pensez à :
-1. Les concepts clés et leurs interrelations
-2. Les auteurs majeurs et leurs contributions
-3. Les méthodologies alternatives possibles
-4. Les résultats attendus et inattendus
-5. Les implications théoriques et pratiques
-
-EXIGENCES DE RÉDACTION :
-• Chaque sous-point doit faire au minimum 15-20 lignes
-• Style académique rigoureux avec citations appropriées
-• Structure hiérarchique claire (1., 1.1, 1.1.1, etc.)
-• Explications didactiques accessibles à un débutant
-• Éviter les répétitions et les généralités
-• Proposer des exemples concrets et des tableaux synthétiques
-• Inclure une synthèse à la fin de chaque section
-"""
-
-    instruction = section_instructions.get(section, f"Développez la section '{section}' de manière structurée et détaillée.")
-
-    return f"""
-THÈME DU MÉMOIRE : **{theme}**
-SECTION À RÉDIGER : **{section}**
-CONTEXTE FOURNI : {context if context else "Aucun contexte spécifique fourni."}
-
-HISTORIQUE DES SECTIONS DÉJÀ RÉDIGÉES :
-{previous_text if previous_text else "C'est la première section du mémoire."}
-
-{methodology}
+prompt_builder = PromptBuilder()
+# Historique des sections tenu dans un budget de tokens (résumés calculés au stockage)
+context_window = ContextWindow()
+
+async def hydrate_theme(theme: str):
+    # Historique du thème relu depuis le dépôt (jamais vu par ce processus, ou plus vieux que CONTEXT_L1_TTL)
+    if not context_window.has(theme):
+        context_window.load(theme, await storage_call(repository.get_sections, theme))
+
+async def store_section(theme: str, section: str, text: str, note: str = "génération") -> int:
+    await hydrate_theme(theme)
+    repository.save_section(theme, section, text)
+    context_window.update(theme, section, text)
+    if prefetcher is not None:
+        # L'historique du thème a changé : les sections anticipées n'ont plus le bon prompt
+        prefetcher.discard_theme(theme)
+    # Chaque écriture est une nouvelle version (révisions et restaurations comprises) : écrite tout de suite
+    # sous verrou SQLite (jusqu'à 30 s d'attente entre workers), donc hors de la boucle d'événements
+    return await asyncio.to_thread(repository.add_section_version, theme, section, text, note)
+
+# Bibliographie déposée par l'utilisateur : passages pertinents (BM25) ajoutés au contexte de la section
+retrieval = RetrievalStore() if config.RAG_ENABLED else None
+
+async def with_bibliography(user_id, theme: str, section: str, context: str) -> str:
+    if retrieval is None or not user_id:
+        return context
+    with span("retrieval"):
+        # Lecture de l'index (et attente d'un dépôt en cours d'indexation) hors de la boucle d'événements
+        passages = await asyncio.to_thread(retrieval.search, user_id, f"{theme} {section} {context}", config.RAG_TOP_K)
+        excerpts = format_passages(passages, config.RAG_MAX_TOKENS, context_window.tokenizer)
+    if not excerpts:
+        return context
+    header = "EXTRAITS DE LA BIBLIOGRAPHIE DE L'ÉTUDIANT (à citer avec leur référence) :"
+    return f"{context}\n\n{header}\n{excerpts}".strip()
 
-INSTRUCTIONS SPÉCIFIQUES POUR CETTE SECTION :
-{instruction}
-
-{brainstorming}
-
-CONSIGNES FINALES :
-1. Rédigez UNIQUEMENT la section demandée : {section}
-2. Suivez scrupuleusement la méthodologie académique présentée
-3. Structurez avec des titres et sous-titres hiérarchiques
-4. Chaque paragraphe doit être développé et argumenté
-5. Inclure des exemples concrets liés au thème "{theme}"
-6. Terminer par une synthèse des points abordés
-7. Proposer naturellement la section suivante dans le flux logique
+def build_prompt(theme: str, section: str, context: str = "") -> str:
+    if not context_window.has(theme):
+        context_window.load(theme, repository.get_sections(theme))
+    return prompt_builder.build(theme, section, context, context_window.get(theme))
 
-COMMENCEZ LA RÉDACTION MAINTENANT :
-"""
+async def section_prompt(theme: str, section: str, context: str = "", user_id: str = None) -> str:
+    await hydrate_theme(theme)
+    context = await with_bibliography(user_id, theme, section, context)
+    return build_prompt(theme, section, context)
 
 # -----------------------------------------------------
 #       APPEL MODELE ONLINE (GROQ)
 # -----------------------------------------------------
-def call_online_model(prompt):
+async def call_online_model(prompt, options=ONLINE_OPTIONS):
+    key, cached = await cache_get(prompt, MODEL_NAME_ONLINE, options)
+    if cached is not None:
+        return cached
+    with span("model"):
+        return await single_flight.run(key, lambda: generate_online(prompt, key, options))
+
+async def generate_online(prompt, key, options=ONLINE_OPTIONS):
+    start = time.monotonic()
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME_ONLINE,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=4000
-        )
-        return response.choices[0].message.content
+        output = await groq_service.complete(prompt, **options)
+        record_success("groq", start, prompt, output)
+        await cache_set(key, output)
+        return output
     except Exception as e:
+        record_failure("groq", e)
         return f"[ONLINE ERROR] Impossible d'utiliser Groq : {str(e)}"
 
 # -----------------------------------------------------
 #       APPEL MODELE OFFLINE (OLLAMA)
 # -----------------------------------------------------
-def call_offline_model(prompt):
-    payload = {
-        "model": MODEL_NAME_OFFLINE,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 3000
-        }
-    }
+async def call_offline_model(prompt, options=OFFLINE_OPTIONS):
+    key, cached = await cache_get(prompt, MODEL_NAME_OFFLINE, options)
+    if cached is not None:
+        return cached
+    with span("model"):
+        return await single_flight.run(key, lambda: generate_offline(prompt, key, options))
+
+async def generate_offline(prompt, key, options=OFFLINE_OPTIONS):
+    start = time.monotonic()
     try:
-        response = requests.post(OLLAMA_URL, json=payload, timeout=90)
-        data = response.json()
-        if "response" in data:
-            return data["response"]
-        if "error" in data and "CUDA error" in data["error"]:
-            os.environ["OLLAMA_NUM_GPU"] = "0"
-            response = requests.post(OLLAMA_URL, json=payload, timeout=90)
-            data_cpu = response.json()
-            if "response" in data_cpu:
-                return data_cpu["response"]
-            return f"[OFFLINE ERROR CPU] {data_cpu}"
-        if "error" in data:
-            return f"[OFFLINE ERROR] {data['error']}"
-        return "[OFFLINE ERROR] Réponse inconnue du modèle."
+        output = await ollama_service.generate(prompt, **options)
+        record_success("ollama", start, prompt, output)
+        await cache_set(key, output)
+        return output
+    except BackendBusyError as e:
+        return f"[OFFLINE ERROR] {str(e)}"
+    except BackendError as e:
+        # Ollama a répondu : le serveur est joignable même si la génération a échoué
+        health.record_success("ollama", time.monotonic() - start)
+        router.record_failure("ollama")
+        if "CUDA error" in str(e):
+            # Repli CPU demandé au démon Ollama lui-même (option num_gpu=0 sur chaque requête)
+            ollama_service.force_cpu()
+            start = time.monotonic()
+            try:
+                output = await ollama_service.generate(prompt, **options)
+                record_success("ollama", start, prompt, output)
+                await cache_set(key, output)
+                return output
+            except Exception as e_cpu:
+                return f"[OFFLINE ERROR CPU] {str(e_cpu)}"
+        return f"[OFFLINE ERROR] {str(e)}"
     except Exception as e:
+        record_failure("ollama", e)
         return f"[OFFLINE FATAL ERROR] {str(e)}"
 
+# -----------------------------------------------------
+#       APPELS MODELES EN STREAMING (TOKEN PAR TOKEN)
+# -----------------------------------------------------
+async def stream_online_model(prompt, temperature=0.1, max_tokens=4000, use_cache=True):
+    if not use_cache:
+        tokens = generate_online_stream(prompt, temperature, max_tokens, None)
+    else:
+        # Mêmes options que call_online_model : un /ask et un /ask/stream identiques partagent la génération
+        key, cached = await cache_get(prompt, MODEL_NAME_ONLINE, {"temperature": temperature, "max_tokens": max_tokens})
+        if cached is not None:
+            yield cached
+            return
+        tokens = single_flight.stream(key, lambda: generate_online_stream(prompt, temperature, max_tokens, key))
+    with span("model"):
+        # Fermé avec ce flux (client parti, repli sur un autre backend) : sans lecteur, la génération s'arrête
+        async with aclosing(tokens):
+            async for token in tokens:
+                yield token
+
+async def generate_online_stream(prompt, temperature, max_tokens, key):
+    start = time.monotonic()
+    ttft = None
+    try:
+        parts = []
+        async for token in groq_service.stream(prompt, temperature=temperature, max_tokens=max_tokens):
+            if ttft is None:
+                ttft = time.monotonic() - start
+            parts.append(token)
+            yield token
+        output = "".join(parts)
+        record_success("groq", start, prompt, output, ttft)
+        await cache_set(key, output)
+    except Exception as e:
+        record_failure("groq", e)
+        yield f"[ONLINE ERROR] Impossible d'utiliser Groq : {str(e)}"
+
+async def stream_offline_model(prompt, temperature=0.1, use_cache=True):
+    if not use_cache:
+        tokens = generate_offline_stream(prompt, temperature, None)
+    else:
+        key, cached = await cache_get(prompt, MODEL_NAME_OFFLINE, {"temperature": temperature, "num_predict": 3000})
+        if cached is not None:
+            yield cached
+            return
+        tokens = single_flight.stream(key, lambda: generate_offline_stream(prompt, temperature, key))
+    with span("model"):
+        # Fermé avec ce flux (client parti, repli sur un autre backend) : sans lecteur, la génération s'arrête
+        async with aclosing(tokens):
+            async for token in tokens:
+                yield token
+
+async def generate_offline_stream(prompt, temperature, key):
+    start = time.monotonic()
+    ttft = None
+    try:
+        parts = []
+        async for token in ollama_service.stream(prompt, temperature=temperature, num_predict=3000):
+            if ttft is None:
+                ttft = time.monotonic() - start
+            parts.append(token)
+            yield token
+        output = "".join(parts)
+        record_success("ollama", start, prompt, output, ttft)
+        await cache_set(key, output)
+    except BackendError as e:
+        router.record_failure("ollama")
+        yield f"[OFFLINE ERROR] {str(e)}"
+    except Exception as e:
+        record_failure("ollama", e)
+        yield f"[OFFLINE FATAL ERROR] {str(e)}"
+
+# -----------------------------------------------------
+#       REPLI SUR UN AUTRE BACKEND EN CAS D'ÉCHEC
+# -----------------------------------------------------
+async def call_with_failover(prompt: str, output_tokens: int, calls: dict) -> str:
+    # calls : {backend: fabrique de coroutine}. Essais dans l'ordre du routeur (clé absente, Groq injoignable,
+    # Ollama saturé...) ; le texte d'erreur du dernier essai est renvoyé si tous échouent
+    output = None
+    for position, backend in enumerate(plan_backends(prompt, output_tokens)):
+        if position:
+            # Relais : le disjoncteur n'est consulté (essai half-open réservé) qu'au moment de l'appel
+            if not router.acquire(backend):
+                continue
+            router.record_failover(backend)
+        set_labels(backend=MODEL_NAMES[backend])
+        output = await calls[backend]()
+        if not is_error_output(output):
+            return output
+    return output
+
+async def stream_with_failover(prompt: str, output_tokens: int, streams: dict):
+    error = None
+    for position, backend in enumerate(plan_backends(prompt, output_tokens)):
+        if position:
+            if not router.acquire(backend):
+                continue
+            router.record_failover(backend)
+        set_labels(backend=MODEL_NAMES[backend])
+        tokens = streams[backend]()
+        first = await anext(tokens, "")
+        if is_error_output(first):
+            # Échec avant le premier token : rien n'est encore parti, le backend suivant prend le relais
+            await tokens.aclose()
+            error = first
+            continue
+        yield first
+        async for token in tokens:
+            yield token
+        return
+    # Tous les essais ont échoué : le texte d'erreur du dernier est renvoyé
+    yield error
+
+# -----------------------------------------------------
+#       APPEL MODELE POUR UNE SECTION (BACKEND CHOISI PAR LE ROUTEUR)
+# -----------------------------------------------------
+async def call_section_model(prompt):
+    # File d'attente comprise dans l'estimation : quand Groq est saturé (rédaction parallèle)
+    # ou proche de son quota, la section part sur Ollama plutôt que d'attendre
+    calls = {"groq": lambda: call_online_model(prompt), "ollama": lambda: call_offline_model(prompt)}
+    return await call_with_failover(prompt, config.ROUTER_SECTION_TOKENS, calls)
+
+def stream_section_model(prompt):
+    streams = {"groq": lambda: stream_online_model(prompt), "ollama": lambda: stream_offline_model(prompt)}
+    return stream_with_failover(prompt, config.ROUTER_SECTION_TOKENS, streams)
+
+# -----------------------------------------------------
+#   RÉVISION D'UNE SECTION (PATCH DES SEULS PARAGRAPHES MODIFIÉS)
+# -----------------------------------------------------
+async def call_edit_model(prompt):
+    calls = {"groq": lambda: call_online_model(prompt, EDIT_ONLINE_OPTIONS),
+             "ollama": lambda: call_offline_model(prompt, EDIT_OFFLINE_OPTIONS)}
+    return await call_with_failover(prompt, config.SECTION_EDIT_MAX_TOKENS // 2, calls)
+
+async def edit_section(theme: str, section: str, instruction: str) -> dict:
+    current = (await storage_call(repository.get_sections, theme)).get(section)
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"Section '{section}' introuvable pour le thème '{theme}'")
+    paragraphs = split_paragraphs(current)
+    set_labels(section=section)
+    with span("build_prompt"):
+        prompt = prompt_builder.build_edit(theme, section, number_paragraphs(paragraphs), instruction)
+
+    output = await call_edit_model(prompt)
+    if is_error_output(output):
+        raise HTTPException(status_code=502, detail=output)
+    try:
+        operations = parse_patch(output)
+        revised = apply_patch(paragraphs, operations)
+    except PatchError as e:
+        raise HTTPException(status_code=502, detail=f"[EDIT ERROR] Patch du modèle inutilisable : {e}")
+
+    text = "\n\n".join(revised)
+    version = await store_section(theme, section, text, note=instruction) if operations else None
+    return {
+        "theme": theme,
+        "section": section,
+        "version": version,
+        "operations": operations,
+        "paragraphes_modifies": changed_paragraphs(operations),
+        "paragraphes": {"avant": len(paragraphs), "apres": len(revised)},
+        "tokens_generes": context_window.tokenizer.count(output),
+        "response": text,
+    }
+
+async def edit_target(prompt: str, user_id: str):
+    # « Corrige l'introduction : ... » sur le thème en cours, si la section existe déjà
+    if not is_edit_request(prompt):
+        return None
+    progress = await storage_call(repository.get_progress, user_id)
+    if progress is None:
+        return None
+    section = detect_section(prompt)
+    if section not in await storage_call(repository.get_sections, progress["theme"]):
+        return None
+    return progress["theme"], section
+
 # -----------------------------------------------------
 #       APPEL MODELE POUR CONVERSATION
 # -----------------------------------------------------
-def call_chat_model(user_id: str, prompt: str):
-    update_user_context(user_id, "Utilisateur", prompt)
-    full_prompt = get_user_context(user_id) + "\nAI:"
-    if groq_is_available():
-        try:
-            response = client.chat.completions.create(
-                model=MODEL_NAME_ONLINE,
-                messages=[{"role": "user", "content": full_prompt}],
-                temperature=0.7
-            )
-            answer = response.choices[0].message.content
-        except Exception as e:
-            answer = f"[Erreur technique] {str(e)}"
+async def call_chat_online(full_prompt: str):
+    start = time.monotonic()
+    try:
+        with span("model"):
+            answer = await groq_service.complete(full_prompt, temperature=0.7, max_tokens=None)
+        record_success("groq", start, full_prompt, answer)
+        return answer
+    except Exception as e:
+        record_failure("groq", e)
+        return f"[Erreur technique] {str(e)}"
+
+async def call_chat_model(user_id: str, prompt: str):
+    await update_user_context(user_id, "Utilisateur", prompt)
+    set_labels(section="chat")
+    answer = semantic_get(user_id, prompt)
+    if answer is not None:
+        await update_user_context(user_id, "AI", answer)
+        return answer
+    full_prompt = await get_user_context(user_id) + "\nAI:"
+    calls = {"groq": lambda: call_chat_online(full_prompt), "ollama": lambda: call_offline_model(full_prompt)}
+    if config.ROUTER_HEDGE_CHAT:
+        # Requête couverte : le second backend est lancé si le premier tarde, la première réponse gagne
+        with span("model"):
+            answer = await router.hedge(full_prompt, config.ROUTER_CHAT_TOKENS, calls,
+                                        config.ROUTER_HEDGE_DELAY, is_error_output)
     else:
-        answer = call_offline_model(full_prompt)
-    update_user_context(user_id, "AI", answer)
+        answer = await call_with_failover(full_prompt, config.ROUTER_CHAT_TOKENS, calls)
+    semantic_set(user_id, prompt, answer)
+    await update_user_context(user_id, "AI", answer)
     return answer
 
 # -----------------------------------------------------
@@ -681,67 +573,496 @@ def get_next_section(current: str):
     return None
 
 # -----------------------------------------------------
-#                ROUTE PRINCIPALE
+#   SECTION SUIVANTE ANTICIPÉE (PENDANT LA LECTURE)
 # -----------------------------------------------------
-@app.get("/ask", response_model=ResponseModel)
-def ask(prompt: str = Query(...), context: str = Query("", description="Contexte optionnel"), user_id: str = Query("default")):
-    intention = detect_intention(prompt)
+# La section suggérée est presque toujours acceptée : quand les backends sont libres, elle est rédigée
+# en arrière-plan et un « Oui » la sert aussitôt (même prompt, sinon elle est jetée et régénérée)
+def spare_capacity() -> bool:
+    busy = sum(backend.in_flight + backend.waiting for backend in (groq_service, ollama_service))
+    return busy < config.PREFETCH_MAX_BUSY and job_manager.queue.size() == 0
+
+async def prefetch_prompt(user_id: str, theme: str, section: str, context: str) -> str:
+    return await section_prompt(theme, section, context, user_id)
+
+prefetcher = Prefetcher(
+    build=prefetch_prompt,
+    generate=call_section_model,
+    has_capacity=spare_capacity,
+    max_entries=config.PREFETCH_MAX_ENTRIES,
+    ttl=config.PREFETCH_TTL,
+    delay=config.PREFETCH_DELAY,
+) if config.PREFETCH_ENABLED else None
+
+def accepted_suggestion(user_id: str, prompt: str):
+    # « Oui », « vas-y », « la suite »... après une suggestion : la section suggérée est demandée,
+    # sauf si le message en nomme une autre
+    if prefetcher is None or not is_acceptance(prompt):
+        return None
+    suggestion = prefetcher.pending(user_id)
+    if suggestion is None:
+        return None
+    section = section_detector.explicit(prompt)
+    if section is not None and section != suggestion.section:
+        return None
+    return suggestion
 
-    if intention == "chat":
-        response = call_chat_model(user_id, prompt)
-        return ResponseModel(theme="Conversation", section="chat", response=response)
+# -----------------------------------------------------
+#   WORKFLOW MÉMOIRE (PARTAGÉ PAR /ask ET /ask/stream)
+# -----------------------------------------------------
+async def prepare_section(prompt: str, context: str, user_id: str, suggestion=None):
+    progress = await storage_call(repository.get_progress, user_id)
+
+    if suggestion is not None:
+        # Réponse à la suggestion : thème et section déjà connus
+        theme, detected_section = suggestion.theme, suggestion.section
+    else:
+        # Détection du thème
+        with span("theme"):
+            theme = resolve_theme(user_id, prompt, progress.get("theme") if progress else None)
 
-    # Détection du thème
-    theme = extract_theme(prompt)
+        # Détection de la section demandée
+        with span("section_detection"):
+            detected_section = detect_section(prompt)
 
-    # Détection de la section demandée
-    detected_section = detect_section(prompt)
+        if prefetcher is not None:
+            # Autre demande que la suggestion : la section anticipée ne sera pas servie
+            prefetcher.discard(user_id)
 
     # Gestion du workflow utilisateur
-    if user_id not in user_progress or user_progress[user_id].get("theme") != theme:
-        user_progress[user_id] = {"theme": theme, "current_section": detected_section}
+    if progress is None or progress.get("theme") != theme:
+        progress = {"theme": theme, "current_section": detected_section}
         section = detected_section
         response_text = f"Nous allons commencer par rédiger la section **{section}** du thème '{theme}'."
     else:
         # Si l'utilisateur demande une section spécifique, l'utiliser
-        if detected_section != user_progress[user_id]["current_section"]:
+        if detected_section != progress["current_section"]:
             section = detected_section
-            user_progress[user_id]["current_section"] = section
+            progress["current_section"] = section
             response_text = f"Je vais maintenant rédiger la section **{section}**."
         else:
-            section = user_progress[user_id]["current_section"]
+            section = progress["current_section"]
             response_text = f"Je continue avec la section **{section}**."
+    repository.save_progress(user_id, progress)
 
     # Construction du prompt avec la nouvelle méthodologie
-    final_prompt = build_prompt(theme, section, context)
-
-    # Appel du modèle
-    if groq_is_available():
-        output = call_online_model(final_prompt)
-    else:
-        output = call_offline_model(final_prompt)
+    set_labels(section=section)
+    with span("build_prompt"):
+        final_prompt = await section_prompt(theme, section, context, user_id)
+    return theme, section, response_text, final_prompt
 
+async def finalize_section(user_id: str, theme: str, section: str, output: str, context: str = "") -> str:
     # Sauvegarde mémoire
-    if theme not in memory_storage:
-        memory_storage[theme] = {}
-    memory_storage[theme][section] = output
+    await store_section(theme, section, output)
 
     # Mise à jour progression et suggestion section suivante
     next_sec = get_next_section(section)
     if next_sec:
-        user_progress[user_id]["current_section"] = next_sec
-        output += f"\n\n{'='*60}\n SECTION SUIVANTE SUGGÉRÉE : **{next_sec.upper()}**\n{'='*60}\n\nSouhaitez-vous que je rédige cette section maintenant ?"
-    else:
-        output += f"\n\n{'='*60}\nFÉLICITATIONS ! Toutes les sections ont été rédigées pour ce thème.\n{'='*60}\n\nVous pouvez maintenant :\n1. Relire et peaufiner chaque section\n2. Ajouter une bibliographie complète\n3. Rédiger un résumé/abstract\n4. Préparer la soutenance"
+        repository.save_progress(user_id, {"theme": theme, "current_section": next_sec})
+        if prefetcher is not None and not is_error_output(output):
+            prefetcher.suggest(user_id, theme, next_sec, context)
+        return f"\n\n{'='*60}\n SECTION SUIVANTE SUGGÉRÉE : **{next_sec.upper()}**\n{'='*60}\n\nSouhaitez-vous que je rédige cette section maintenant ?"
+    return f"\n\n{'='*60}\nFÉLICITATIONS ! Toutes les sections ont été rédigées pour ce thème.\n{'='*60}\n\nVous pouvez maintenant :\n1. Relire et peaufiner chaque section\n2. Ajouter une bibliographie complète\n3. Rédiger un résumé/abstract\n4. Préparer la soutenance"
+
+# -----------------------------------------------------
+#   CONTRÔLE D'ADMISSION (PAR UTILISATEUR ET GLOBAL)
+# -----------------------------------------------------
+# Seaux de jetons en requêtes et en tokens estimés : une rafale d'un utilisateur (ou de tous) reçoit un 429
+# avant toute construction de prompt, au lieu d'allonger l'attente de tout le monde sur Groq / Ollama
+admission = AdmissionController() if config.RATE_LIMIT_ENABLED else None
+
+# Réponse maximale demandée au modèle (max_tokens / num_predict), par type de génération
+OUTPUT_TOKENS = {
+    "chat": config.ROUTER_CHAT_TOKENS,
+    "memoire": max(ONLINE_OPTIONS["max_tokens"], OFFLINE_OPTIONS["num_predict"]),
+    "edit": config.SECTION_EDIT_MAX_TOKENS,
+}
+
+async def admit(user_id: str, intention: str, prompt: str, context: str = "", generations: int = 1):
+    if admission is None:
+        return
+    with span("admission"):
+        tokenizer = context_window.tokenizer
+        output = OUTPUT_TOKENS.get(intention, OUTPUT_TOKENS["memoire"])
+        await admission.admit(user_id, tokenizer.count(prompt) + tokenizer.count(context) + output * generations)
+
+async def classify_and_admit(prompt: str, context: str, user_id: str) -> str:
+    with span("classification"):
+        intention = detect_intention(prompt)
+    await admit(user_id, intention, prompt, context)
+    return intention
+
+@app.exception_handler(RateLimitError)
+async def rate_limited(request: Request, e: RateLimitError):
+    return JSONResponse(status_code=429, content={"detail": str(e), "retry_after": e.retry_after, "portee": e.scope},
+                        headers={"Retry-After": str(e.retry_after)})
+
+# -----------------------------------------------------
+#                ROUTE PRINCIPALE
+# -----------------------------------------------------
+async def answer_prompt(prompt: str, context: str, user_id: str, intention: str = None) -> ResponseModel:
+    # Révision d'une section existante : patch des paragraphes modifiés plutôt qu'une réécriture complète
+    target = await edit_target(prompt, user_id)
+    if target is not None:
+        edit = await edit_section(*target, instruction=prompt)
+        return ResponseModel(theme=edit["theme"], section=edit["section"], response=edit["response"])
+
+    if intention is None:
+        with span("classification"):
+            intention = detect_intention(prompt)
+
+    suggestion = accepted_suggestion(user_id, prompt)
+    if intention == "chat" and suggestion is None:
+        response = await call_chat_model(user_id, prompt)
+        return ResponseModel(theme="Conversation", section="chat", response=response)
+    if suggestion is not None and not context:
+        # « Oui » arrive sans contexte : celui donné pour la section précédente est repris
+        context = suggestion.context
+
+    theme, section, response_text, final_prompt = await prepare_section(prompt, context, user_id, suggestion)
+
+    # Appel du modèle (ou section anticipée, si le prompt n'a pas changé depuis)
+    output = await prefetcher.take(user_id, final_prompt) if suggestion is not None else None
+    if output is None:
+        output = await call_section_model(final_prompt)
+    if is_error_output(output):
+        # Tous les backends ont échoué : l'erreur est renvoyée, jamais enregistrée comme section
+        return ResponseModel(theme=theme, section=section, response=response_text + "\n\n" + output)
+
+    output += await finalize_section(user_id, theme, section, output, context)
 
     return ResponseModel(theme=theme, section=section, response=response_text + "\n\n" + output)
 
+@app.get("/ask", response_model=ResponseModel)
+async def ask(prompt: str = Query(...), context: str = Query("", description="Contexte optionnel"), user_id: str = Query("default")):
+    intention = await classify_and_admit(prompt, context, user_id)
+    return await answer_prompt(prompt, context, user_id, intention)
+
+@app.post("/v2/ask", response_model=ResponseModel)
+async def ask_v2(request: Request):
+    # Prompt et contexte dans le corps (JSON ou MessagePack) : ni limite de longueur d'URL ni contexte dans les logs
+    try:
+        body = decode_body(await read_body(request, config.ASK_MAX_BODY_BYTES), request.headers.get("content-type"))
+        ask_request = AskRequest.model_validate(body)
+    except BodyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    if not ask_request.prompt.strip():
+        raise HTTPException(status_code=422, detail="prompt vide")
+
+    intention = await classify_and_admit(ask_request.prompt, ask_request.context, ask_request.user_id)
+    result = await answer_prompt(ask_request.prompt, ask_request.context, ask_request.user_id, intention)
+    # Sérialisation directe (orjson si installé) puis gzip / brotli selon Accept-Encoding
+    content, headers = encode_response(result.model_dump(), request.headers.get("accept-encoding"),
+                                       config.COMPRESSION_MIN_BYTES, config.COMPRESSION_GZIP_LEVEL,
+                                       config.COMPRESSION_BROTLI_QUALITY)
+    return Response(content, media_type="application/json", headers=headers)
+
+# -----------------------------------------------------
+#   FILE DE JOBS : GÉNÉRATION HORS DE LA REQUÊTE HTTP
+# -----------------------------------------------------
+async def run_generation_job(job):
+    return (await answer_prompt(**job.payload)).model_dump()
+
+job_manager = JobManager(run_generation_job)
+
+@app.post("/jobs", status_code=202)
+async def create_job(prompt: str = Query(...), context: str = Query("", description="Contexte optionnel"), user_id: str = Query("default")):
+    intention = await classify_and_admit(prompt, context, user_id)
+    # La conversation passe devant les longues rédactions de section
+    priority = PRIORITY_CHAT if intention == "chat" else PRIORITY_SECTION
+    payload = {"prompt": prompt, "context": context, "user_id": user_id, "intention": intention}
+    try:
+        job = await job_manager.submit(user_id, intention, priority, payload)
+    except QueueFullError as e:
+        return JSONResponse(status_code=429, content={"detail": str(e), "retry_after": e.retry_after},
+                            headers={"Retry-After": str(e.retry_after)})
+    return {**job.snapshot(), "suivi": f"/jobs/{job.id}"}
+
+@app.get("/jobs/stats")
+def jobs_stats():
+    return job_manager.stats()
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu ou expiré")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return get_job_or_404(job_id).snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = get_job_or_404(job_id)
+
+    async def events():
+        # Un état à chaque changement (NDJSON), jusqu'à la fin du job
+        while True:
+            version = job.version
+            yield ndjson(job.snapshot())
+            if job.status in FINISHED:
+                return
+            await job_manager.wait_for_change(job, version, timeout=15)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return (await job_manager.cancel(job_id)).snapshot()
+
+# -----------------------------------------------------
+#   DOCUMENT COMPLET : PLAN PUIS SECTIONS EN PARALLÈLE
+# -----------------------------------------------------
+async def write_outline(job):
+    return await call_section_model(prompt_builder.build_outline(job.theme, sections_order, job.context))
+
+async def write_section(job, section: str, dependency_texts: dict):
+    # Plan commun + texte des seules sections dont celle-ci dépend (dans le budget de tokens)
+    previous_text = f"{OUTLINE_HEADER}\n{job.outline}"
+    dependencies = context_window.get_sections(job.theme, dependency_texts)
+    if dependencies:
+        previous_text += "\n\n" + dependencies
+    context = await with_bibliography(job.user_id, job.theme, section, job.context)
+    return await call_section_model(prompt_builder.build(job.theme, section, context, previous_text))
+
+async def save_document_section(job, section: str, text: str):
+    await store_section(job.theme, section, text)
+    if section == sections_order[-1]:
+        repository.save_progress(job.user_id, {"theme": job.theme, "current_section": section})
+
+document_generator = DocumentGenerator(write_outline, write_section, save_document_section, sections=sections_order)
+
+@app.post("/generate-document", status_code=202)
+async def generate_document(prompt: str = Query(...), context: str = Query("", description="Contexte optionnel"),
+                            user_id: str = Query("default")):
+    # Plan + toutes les sections : coût d'un document complet (plafonné à la rafale de l'utilisateur)
+    await admit(user_id, "memoire", prompt, context, generations=len(sections_order) + 1)
+    progress = await storage_call(repository.get_progress, user_id)
+    theme = resolve_theme(user_id, prompt, progress.get("theme") if progress else None)
+    # Hydratation de l'historique du thème avant que les sections ne s'y ajoutent en parallèle
+    await hydrate_theme(theme)
+    job = document_generator.submit(user_id, theme, context)
+    return {**job.snapshot(), "suivi": f"/generate-document/{job.id}"}
+
+@app.get("/generate-document/{job_id}")
+def generate_document_status(job_id: str, include_text: bool = Query(False)):
+    job = document_generator.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu ou expiré")
+    snapshot = job.snapshot()
+    if include_text:
+        snapshot["textes"] = {section: job.texts[section] for section in sections_order if section in job.texts}
+    return snapshot
+
+# -----------------------------------------------------
+#        ROUTE PRINCIPALE EN STREAMING (NDJSON)
+# -----------------------------------------------------
+def ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+async def stream_chat(user_id: str, prompt: str):
+    await update_user_context(user_id, "Utilisateur", prompt)
+    set_labels(section="chat")
+    answer = semantic_get(user_id, prompt)
+    if answer is not None:
+        await update_user_context(user_id, "AI", answer)
+        yield ndjson({"type": "meta", "theme": "Conversation", "section": "chat"})
+        yield ndjson({"type": "token", "content": answer})
+        yield ndjson({"type": "done", "theme": "Conversation", "section": "chat", "response": answer})
+        return
+    full_prompt = await get_user_context(user_id) + "\nAI:"
+    streams = {
+        "groq": lambda: stream_online_model(full_prompt, temperature=0.7, max_tokens=None, use_cache=False),
+        "ollama": lambda: stream_offline_model(full_prompt, temperature=0.7, use_cache=False),
+    }
+    tokens = stream_with_failover(full_prompt, config.ROUTER_CHAT_TOKENS, streams)
+
+    yield ndjson({"type": "meta", "theme": "Conversation", "section": "chat"})
+    parts = []
+    async for token in tokens:
+        parts.append(token)
+        yield ndjson({"type": "token", "content": token})
+    answer = "".join(parts)
+    semantic_set(user_id, prompt, answer)
+    await update_user_context(user_id, "AI", answer)
+    yield ndjson({"type": "done", "theme": "Conversation", "section": "chat", "response": answer})
+
+async def stream_revision(theme: str, section: str, instruction: str):
+    # Le patch n'a de sens qu'une fois complet : la section révisée est envoyée d'un bloc
+    yield ndjson({"type": "meta", "theme": theme, "section": section})
+    try:
+        edit = await edit_section(theme, section, instruction)
+        text = edit["response"]
+    except HTTPException as e:
+        text = e.detail
+    yield ndjson({"type": "token", "content": text})
+    yield ndjson({"type": "done", "theme": theme, "section": section, "response": text})
+
+async def replay(text: str):
+    yield text
+
+async def stream_section(user_id: str, prompt: str, context: str, suggestion=None):
+    if suggestion is not None and not context:
+        context = suggestion.context
+    theme, section, response_text, final_prompt = await prepare_section(prompt, context, user_id, suggestion)
+    prefetched = await prefetcher.take(user_id, final_prompt) if suggestion is not None else None
+    tokens = replay(prefetched) if prefetched is not None else stream_section_model(final_prompt)
+
+    yield ndjson({"type": "meta", "theme": theme, "section": section})
+    yield ndjson({"type": "token", "content": response_text + "\n\n"})
+    parts = []
+    failed = False
+    async for token in tokens:
+        parts.append(token)
+        failed = failed or (bool(token) and is_error_output(token))
+        yield ndjson({"type": "token", "content": token})
+
+    # Le texte complet est assemblé puis stocké comme dans /ask
+    output = "".join(parts)
+    if failed:
+        # Génération interrompue : le texte partiel n'est pas enregistré comme section
+        yield ndjson({"type": "done", "theme": theme, "section": section, "response": response_text + "\n\n" + output})
+        return
+    next_step = await finalize_section(user_id, theme, section, output, context)
+    yield ndjson({"type": "token", "content": next_step})
+    yield ndjson({"type": "done", "theme": theme, "section": section,
+                  "response": response_text + "\n\n" + output + next_step})
+
+@app.get("/ask/stream")
+async def ask_stream(prompt: str = Query(...), context: str = Query("", description="Contexte optionnel"), user_id: str = Query("default")):
+    intention = await classify_and_admit(prompt, context, user_id)
+    target = await edit_target(prompt, user_id)
+    if target is not None:
+        return StreamingResponse(stream_revision(*target, instruction=prompt), media_type="application/x-ndjson")
+    suggestion = accepted_suggestion(user_id, prompt)
+    if intention == "chat" and suggestion is None:
+        events = stream_chat(user_id, prompt)
+    else:
+        events = stream_section(user_id, prompt, context, suggestion)
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+# -----------------------------------------------------
+#   DÉMARRAGE : COMPILATION, CLIENTS, CHARGEMENT DU MODÈLE
+# -----------------------------------------------------
+# Rien de coûteux à l'import : tables de détection, gabarits et clients sont préparés
+# par le lifespan, le chargement du modèle Ollama tourne en arrière-plan (GET /ready)
+def compile_tables():
+    section_detector.compile()
+    intent_engine.compile()
+    theme_resolver.compile()
+    prompt_builder.compile()
+
+def prepare_groq():
+    try:
+        groq_service.prepare()
+    except Exception as e:
+        # Client impossible à construire (GROQ_API_KEY absente...) : Groq est écarté tout de suite,
+        # sans attendre que les sondes échouent
+        health.trip("groq", e)
+        raise
+
+startup = StartupPipeline()
+startup.add("tables", compile_tables)
+# Sans GROQ_API_KEY, l'étape échoue (signalée dans /ready) et les requêtes passent par Ollama
+startup.add("client_groq", prepare_groq)
+startup.add("client_ollama", ollama_service.prepare)
+if config.OLLAMA_WARMUP:
+    startup.add("ollama_warmup", ollama_service.preload, background=True)
+
+@app.get("/ready")
+def ready():
+    # 503 tant que le préchargement n'est pas terminé (sonde de disponibilité d'un orchestrateur)
+    if not startup.ready:
+        return JSONResponse(status_code=503, content=startup.snapshot())
+    return startup.snapshot()
+
+# -----------------------------------------------------
+#   RÉVISION ET VERSIONS D'UNE SECTION
+# -----------------------------------------------------
+@app.post("/sections/edit")
+async def edit_section_route(theme: str = Query(...), section: str = Query(...), instruction: str = Query(...),
+                             user_id: str = Query("default")):
+    await admit(user_id, "edit", instruction)
+    return await edit_section(theme, section, instruction)
+
+@app.get("/sections/versions")
+def section_versions(theme: str = Query(...), section: str = Query(...)):
+    return {"theme": theme, "section": section, "versions": repository.get_section_versions(theme, section)}
+
+@app.get("/sections/version")
+def section_version(theme: str = Query(...), section: str = Query(...), version: int = Query(...)):
+    text = repository.get_section_version(theme, section, version)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Version inconnue ou trop ancienne")
+    return {"theme": theme, "section": section, "version": version, "response": text}
+
+@app.post("/sections/restore")
+async def restore_section_version(theme: str = Query(...), section: str = Query(...), version: int = Query(...)):
+    text = await asyncio.to_thread(repository.get_section_version, theme, section, version)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Version inconnue ou trop ancienne")
+    new_version = await store_section(theme, section, text, note=f"restauration de la version {version}")
+    return {"theme": theme, "section": section, "version": new_version, "response": text}
+
+# -----------------------------------------------------
+#   BIBLIOGRAPHIE : DÉPÔT ET INDEXATION DES DOCUMENTS
+# -----------------------------------------------------
+def require_retrieval():
+    if retrieval is None:
+        raise HTTPException(status_code=404, detail="Bibliographie désactivée (RAG_ENABLED=0)")
+    return retrieval
+
+@app.post("/documents", status_code=201)
+async def upload_document(request: Request, user_id: str = Query(...), filename: str = Query("document")):
+    # Corps brut (le fichier lui-même) écrit par blocs sur disque : jamais chargé en entier en mémoire
+    store = require_retrieval()
+    size = 0
+    head = b""
+    with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as f:
+        path = f.name
+    try:
+        with open(path, "wb") as f:
+            async for block in request.stream():
+                size += len(block)
+                if size > config.RAG_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Fichier trop volumineux (max {config.RAG_MAX_UPLOAD_BYTES} octets)")
+                if len(head) < 8:
+                    head += block[:8 - len(head)]
+                f.write(block)
+        if not size:
+            raise HTTPException(status_code=400, detail="Fichier vide")
+        try:
+            kind = detect_kind(head, filename)
+            # Lecture et indexation hors de la boucle d'événements
+            with span("ingestion"):
+                document = await asyncio.to_thread(store.ingest, user_id, filename, kind, path)
+        except IngestionError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        os.remove(path)
+    return {**document, "taille": size}
+
+@app.get("/documents")
+def list_documents(user_id: str = Query(...)):
+    return {"user_id": user_id, "documents": require_retrieval().documents(user_id)}
+
+@app.delete("/documents/{document_id}")
+async def delete_document(document_id: str, user_id: str = Query(...)):
+    store = require_retrieval()
+    if not await asyncio.to_thread(store.remove, user_id, document_id):
+        raise HTTPException(status_code=404, detail="Document inconnu")
+    return {"user_id": user_id, "supprime": document_id}
+
 # -----------------------------------------------------
 #         ROUTE DE TEST
 # -----------------------------------------------------
 @app.get("/test-intention")
 def test_intention(prompt: str = Query(...)):
-    intention = detect_intention(prompt)
+    score = intent_engine.analyze(prompt)
+    intention = score.intention
     section = detect_section(prompt) if intention == "memoire" else "N/A"
     theme = extract_theme(prompt) if intention == "memoire" else "N/A"
 
@@ -762,6 +1083,7 @@ def test_intention(prompt: str = Query(...)):
     return {
         "prompt": prompt,
         "intention_detectee": intention,
+        "score_intention": score.as_dict(),
         "section_detectee": section,
         "section_description": section_description.get(section, "Section standard"),
         "theme_extrait": theme,
@@ -769,6 +1091,56 @@ def test_intention(prompt: str = Query(...)):
         "explication": f"chat = conversation simple | memoire = rédaction académique avec la nouvelle méthodologie"
     }
 
+# -----------------------------------------------------
+#         ROUTE SANTÉ DES BACKENDS
+# -----------------------------------------------------
+@app.get("/health/backends")
+def health_backends():
+    return {
+        "backends": health.snapshot(),
+        "clients": {"groq": groq_service.stats(), "ollama": ollama_service.stats()},
+        "routage": router.snapshot(),
+        "intervalle_sonde_s": health.interval,
+        "seuil_echecs": health.failure_threshold,
+        "delai_recuperation_s": health.recovery_timeout,
+    }
+
+# -----------------------------------------------------
+#         ROUTE STATISTIQUES DU CACHE
+# -----------------------------------------------------
+@app.get("/cache/stats")
+def cache_stats():
+    semantic = semantic_cache.stats() if semantic_cache is not None else {"enabled": False}
+    if response_cache is None:
+        return {"enabled": False, "single_flight": single_flight.stats(), "semantic": semantic}
+    return {"enabled": True, **response_cache.stats(), "single_flight": single_flight.stats(), "semantic": semantic}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métriques désactivées (METRICS_ENABLED=0)")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/chat/stats")
+def chat_stats():
+    return chat_history.stats()
+
+@app.get("/themes/stats")
+def themes_stats():
+    return theme_resolver.stats()
+
+@app.get("/prefetch/stats")
+def prefetch_stats():
+    if prefetcher is None:
+        return {"actif": False}
+    return {"actif": True, **prefetcher.stats()}
+
+@app.get("/rate-limit/stats")
+def rate_limit_stats():
+    if admission is None:
+        return {"actif": False}
+    return {"actif": True, **admission.stats()}
+
 # -----------------------------------------------------
 #         ROUTE POUR VOIR LA STRUCTURE
 # -----------------------------------------------------
@@ -831,15 +1203,28 @@ def get_exemples():
 #               MAIN
 # -----------------------------------------------------
 if __name__ == "__main__":
-    import uvicorn
+    from app.server import run
     print("\n" + "="*60)
     print("SERVER STARTING - NOUVELLE MÉTHODOLOGIE ACADÉMIQUE")
     print("="*60)
     print("\nEndpoints disponibles:")
     print("- GET /ask?prompt=...&context=...&user_id=... (Rédaction mémoire)")
+    print("- GET /ask/stream?prompt=...&context=...&user_id=... (Idem, tokens en streaming NDJSON)")
+    print("- POST /jobs?prompt=...&user_id=... (Génération en file d'attente, réponse immédiate)")
+    print("- GET /jobs/{job_id} | GET /jobs/{job_id}/events | DELETE /jobs/{job_id} (Suivi / annulation)")
+    print("- POST /generate-document?prompt=...&user_id=... (Mémoire complet, sections en parallèle)")
+    print("- GET /generate-document/{job_id} (Suivi du job, ?include_text=true pour les textes)")
+    print("- POST /sections/edit?theme=...&section=...&instruction=... (Révision par patch des paragraphes modifiés)")
+    print("- GET /sections/versions?theme=...&section=... | POST /sections/restore?...&version=... (Historique)")
     print("- GET /test-intention?prompt=... (Test de détection)")
     print("- GET /structure (Voir la structure détaillée)")
     print("- GET /exemples (Exemples de prompts)")
+    print("- GET /ready (Démarrage terminé : tables compilées, clients prêts, modèle Ollama chargé)")
+    print("- GET /health/backends (État des backends Groq / Ollama)")
+    print("- GET /cache/stats (Compteurs du cache des réponses)")
+    print("- GET /metrics (Métriques Prometheus : durées par route et par étape, tokens)")
+    print("- GET /chat/stats (Occupation mémoire des historiques de chat)")
     print("\nMéthodologie intégrée: Structure académique complète avec 9 sections détaillées")
     print("="*60)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # SERVER_WORKERS > 1 : plusieurs processus, état partagé dans SQLite (voir app/server.py)
+    run(app)
\ No newline at end of file
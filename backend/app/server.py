@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import uvicorn
+
+from app import config
+
+APP_PATH = "app.models.fastAPI:app"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_count() -> int:
+    return config.SERVER_WORKERS if config.SERVER_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def shared_state_env(sticky: bool) -> dict:
+    # Plusieurs processus : sections, progression et historique dans SQLite (WAL), cache des réponses
+    # partagé sur disque ; chaque worker garde son niveau mémoire (L1) devant
+    env = {"STORAGE_BACKEND": "sqlite"}
+    if not os.getenv("RESPONSE_CACHE_PATH"):
+        env["RESPONSE_CACHE_PATH"] = "response_cache.db"
+    if not sticky and not os.getenv("CHAT_L1_TTL"):
+        env["CHAT_L1_TTL"] = "2"
+    return env
+
+
+# -----------------------------------------------------
+#   WORKERS DERRIÈRE LE ROUTEUR (AFFINITÉ PAR UTILISATEUR)
+# -----------------------------------------------------
+class WorkerPool:
+    def __init__(self, count: int, base_port: int, env: dict):
+        self.ports = [base_port + index for index in range(count)]
+        self.env = env
+        self.processes = [None] * count
+        self._stopping = threading.Event()
+        self._supervisor = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+
+    def _spawn(self, index: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", APP_PATH, "--host", "127.0.0.1", "--port", str(self.ports[index]),
+             "--log-level", "warning"],
+            cwd=BACKEND_DIR, env={**os.environ, **self.env, "WORKER_ID": f"w{index}"},
+        )
+
+    def start(self):
+        for index in range(len(self.ports)):
+            self.processes[index] = self._spawn(index)
+        self._supervisor.start()
+
+    def _supervise(self):
+        # Un worker qui s'arrête est relancé sur le même port (ses utilisateurs y restent routés)
+        while not self._stopping.wait(1.0):
+            for index, process in enumerate(self.processes):
+                if process.poll() is not None:
+                    print(f"[SERVER ERROR] Worker w{index} arrêté (code {process.returncode}), relance")
+                    self.processes[index] = self._spawn(index)
+
+    def stop(self):
+        self._stopping.set()
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + 10
+        for process in self.processes:
+            if process is None:
+                continue
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0.1))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# -----------------------------------------------------
+#                       LANCEUR
+# -----------------------------------------------------
+def run(app=None):
+    workers = worker_count()
+    if workers == 1:
+        # Un seul processus : l'application peut être passée directement (python -m app.models.fastAPI)
+        uvicorn.run(app or APP_PATH, host=config.SERVER_HOST, port=config.SERVER_PORT)
+        return
+
+    if not config.SERVER_STICKY:
+        # Workers uvicorn sur le même port : le noyau répartit les connexions, l'état passe par SQLite.
+        # Les jobs (/jobs, /generate-document) restent propres au worker qui les a reçus.
+        os.environ.update(shared_state_env(sticky=False))
+        print(f"{workers} workers sur le port {config.SERVER_PORT} (sans affinité par utilisateur)")
+        uvicorn.run(APP_PATH, host=config.SERVER_HOST, port=config.SERVER_PORT, workers=workers)
+        return
+
+    from app.services.sticky_router import StickyRouter
+
+    pool = WorkerPool(workers, config.SERVER_WORKER_BASE_PORT, shared_state_env(sticky=True))
+    pool.start()
+    print(f"{workers} workers (ports {pool.ports[0]}-{pool.ports[-1]}) derrière le routeur du port {config.SERVER_PORT}")
+    try:
+        uvicorn.run(StickyRouter([f"http://127.0.0.1:{port}" for port in pool.ports]),
+                    host=config.SERVER_HOST, port=config.SERVER_PORT, log_level="warning")
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app import config
+from app.services.context_window import get_tokenizer
+
+
+# -----------------------------------------------------
+#   HISTORIQUE D'UN UTILISATEUR (TAMPON CIRCULAIRE)
+# -----------------------------------------------------
+class ChatMessage:
+    __slots__ = ("role", "message", "line", "tokens")
+
+    def __init__(self, role: str, message: str, tokenizer):
+        self.role = role
+        self.message = message
+        self.line = f"{role}: {message}"
+        self.tokens = tokenizer.count(self.line)
+
+
+class ChatHistory:
+    __slots__ = ("messages", "tokens", "transcript", "max_messages", "max_tokens", "last_used", "synced_at")
+
+    def __init__(self, max_messages: int, max_tokens: int):
+        # Pas de deque(maxlen=...) : il faut connaître les messages évincés pour tenir les comptes
+        self.messages = deque()
+        self.tokens = 0
+        self.transcript = ""
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.last_used = time.monotonic()
+        self.synced_at = self.last_used
+
+    def append(self, entry: ChatMessage) -> int:
+        self.messages.append(entry)
+        self.tokens += entry.tokens
+        self.transcript = f"{self.transcript}\n{entry.line}" if self.transcript else entry.line
+
+        # Capacité en tokens (et en messages) : les plus anciens sortent par la gauche,
+        # le dernier message est toujours conservé
+        evicted = 0
+        while len(self.messages) > 1 and (self.tokens > self.max_tokens or len(self.messages) > self.max_messages):
+            oldest = self.messages.popleft()
+            self.tokens -= oldest.tokens
+            evicted += oldest.tokens
+            # Transcript mis à jour en retirant la première ligne, sans tout reconstruire
+            self.transcript = self.transcript[len(oldest.line) + 1:]
+        return evicted
+
+
+# -----------------------------------------------------
+#   TOUS LES HISTORIQUES (PLAFOND GLOBAL, ÉVICTION LRU)
+# -----------------------------------------------------
+class ChatHistoryStore:
+    def __init__(self, repository=None, max_messages: int = None, max_tokens: int = None,
+                 max_users: int = None, max_total_tokens: int = None, tokenizer=None, l1_ttl: float = None):
+        # repository : stockage persistant optionnel (rechargement d'un utilisateur évincé)
+        self.repository = repository
+        self.max_messages = max_messages or config.CHAT_HISTORY_LIMIT
+        self.max_tokens = max_tokens or config.CHAT_HISTORY_MAX_TOKENS
+        self.max_users = max_users or config.CHAT_MAX_USERS
+        self.max_total_tokens = max_total_tokens or config.CHAT_MEMORY_MAX_TOKENS
+        self.tokenizer = tokenizer or get_tokenizer()
+        # Plusieurs workers sans routage par utilisateur : le stockage partagé fait foi au-delà de l1_ttl
+        self.l1_ttl = config.CHAT_L1_TTL if l1_ttl is None else l1_ttl
+        self._histories = OrderedDict()   # {user_id: ChatHistory}, du moins au plus récemment utilisé
+        self._lock = threading.Lock()
+        self.total_tokens = 0
+        self.evicted_users = 0
+
+    def _load(self, user_id: str) -> ChatHistory:
+        history = ChatHistory(self.max_messages, self.max_tokens)
+        if self.repository is not None:
+            for role, message in self.repository.get_chat(user_id, self.max_messages):
+                entry = ChatMessage(role, message, self.tokenizer)
+                self.total_tokens += entry.tokens - history.append(entry)
+        return history
+
+    def _get(self, user_id: str) -> ChatHistory:
+        now = time.monotonic()
+        history = self._histories.get(user_id)
+        if history is not None and self.l1_ttl and self.repository is not None and now - history.synced_at > self.l1_ttl:
+            # Un autre worker a pu répondre à cet utilisateur entre-temps
+            self.total_tokens -= history.tokens
+            del self._histories[user_id]
+            history = None
+        if history is None:
+            history = self._load(user_id)
+            self._histories[user_id] = history
+            self._evict_idle(keep=user_id)
+        else:
+            self._histories.move_to_end(user_id)
+        history.last_used = now
+        return history
+
+    def _evict_idle(self, keep: str):
+        while self._histories and (len(self._histories) > self.max_users or self.total_tokens > self.max_total_tokens):
+            user_id = next(iter(self._histories))
+            if user_id == keep:
+                break
+            history = self._histories.pop(user_id)
+            self.total_tokens -= history.tokens
+            self.evicted_users += 1
+
+    def get_context(self, user_id: str) -> str:
+        with self._lock:
+            return self._get(user_id).transcript
+
+    def append(self, user_id: str, role: str, message: str):
+        with self._lock:
+            # Chargement avant l'écriture : sinon le rechargement depuis le dépôt lit déjà ce message
+            # et il est ajouté une seconde fois
+            history = self._get(user_id)
+            entry = ChatMessage(role, message, self.tokenizer)
+            self.total_tokens += entry.tokens - history.append(entry)
+            if self.repository is not None:
+                self.repository.append_chat(user_id, role, message)
+            self._evict_idle(keep=user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._histories),
+                "total_tokens": self.total_tokens,
+                "max_users": self.max_users,
+                "max_total_tokens": self.max_total_tokens,
+                "evicted_users": self.evicted_users,
+            }
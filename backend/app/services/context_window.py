@@ -0,0 +1,166 @@
+import re
+import time
+
+from app import config
+
+# -----------------------------------------------------
+#        COMPTAGE DE TOKENS (TOKENIZER INTERCHANGEABLE)
+# -----------------------------------------------------
+class ApproxTokenizer:
+    # Approximation hors ligne : ~3.5 caractères par token pour du français
+    name = "approx"
+
+    def __init__(self, chars_per_token: float = 3.5):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1 if text else 0
+
+
+class TiktokenTokenizer:
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def get_tokenizer(name: str = None):
+    name = name or config.CONTEXT_TOKENIZER
+    if name == "tiktoken":
+        try:
+            return TiktokenTokenizer()
+        except ImportError:
+            pass
+    return ApproxTokenizer()
+
+
+# -----------------------------------------------------
+#   RÉSUMÉ EXTRACTIF D'UNE SECTION (CALCULÉ À L'ÉCRITURE)
+# -----------------------------------------------------
+HEADING = re.compile(r"^(?:#+\s|\d+(?:\.\d+)*[\.\)]?\s|[A-ZÀ-Ý0-9 ,:'\-]{6,}$)")
+SENTENCE_END = re.compile(r"(?<=[\.\!\?])\s")
+
+
+def summarize(text: str, max_tokens: int, tokenizer) -> str:
+    # Titres conservés tels quels, première phrase de chaque paragraphe, dans la limite du budget
+    picked = []
+    used = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        candidate = line if HEADING.match(line) else SENTENCE_END.split(line, 1)[0]
+        cost = tokenizer.count(candidate)
+        if used + cost > max_tokens:
+            break
+        picked.append(candidate)
+        used += cost
+    return "\n".join(picked)
+
+
+# -----------------------------------------------------
+#   HISTORIQUE DES SECTIONS DANS UN BUDGET DE TOKENS
+# -----------------------------------------------------
+class SectionEntry:
+    __slots__ = ("full", "full_tokens", "summary", "summary_tokens")
+
+    def __init__(self, section: str, text: str, tokenizer, summary_tokens: int):
+        self.full = f"[{section}] {text}"
+        self.full_tokens = tokenizer.count(self.full)
+        self.summary = f"[{section} - résumé] {summarize(text, summary_tokens, tokenizer)}"
+        self.summary_tokens = tokenizer.count(self.summary)
+
+
+class ContextWindow:
+    def __init__(self, budget: int = None, summary_tokens: int = None, tokenizer=None, ttl: float = None):
+        # budget <= 0 : pas de limite, toutes les sections sont reprises intégralement
+        self.budget = budget if budget is not None else config.CONTEXT_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens if summary_tokens is not None else config.CONTEXT_SUMMARY_TOKENS
+        self.tokenizer = tokenizer or get_tokenizer()
+        # Un thème peut être écrit par un autre worker : au-delà de ttl, le stockage partagé fait foi
+        self.ttl = config.CONTEXT_L1_TTL if ttl is None else ttl
+        self._entries = {}    # {theme: {section: SectionEntry}}
+        self._rendered = {}   # {theme: historique déjà assemblé}
+        self._synced_at = {}  # {theme: dernière relecture depuis le stockage}
+
+    def update(self, theme: str, section: str, text: str):
+        # Comptage et résumé faits une seule fois, au stockage de la section
+        self._entries.setdefault(theme, {})[section] = SectionEntry(section, text, self.tokenizer, self.summary_tokens)
+        self._rendered.pop(theme, None)
+
+    def has(self, theme: str) -> bool:
+        synced_at = self._synced_at.get(theme)
+        if synced_at is None:
+            return False
+        return not (self.ttl and time.monotonic() - synced_at > self.ttl)
+
+    def load(self, theme: str, sections: dict):
+        # Hydratation depuis le stockage persistant (thème jamais vu ou relu après ttl) :
+        # les sections inchangées gardent leur comptage et leur résumé
+        previous = self._entries.get(theme, {})
+        entries = {}
+        for section, text in sections.items():
+            entry = previous.get(section)
+            if entry is None or entry.full != f"[{section}] {text}":
+                entry = SectionEntry(section, text, self.tokenizer, self.summary_tokens)
+            entries[section] = entry
+        if list(entries.items()) != list(previous.items()):
+            self._rendered.pop(theme, None)
+        self._entries[theme] = entries
+        self._synced_at[theme] = time.monotonic()
+
+    def drop(self, theme: str):
+        self._entries.pop(theme, None)
+        self._rendered.pop(theme, None)
+        self._synced_at.pop(theme, None)
+
+    def get(self, theme: str) -> str:
+        rendered = self._rendered.get(theme)
+        if rendered is None:
+            rendered = self._render(list(self._entries.get(theme, {}).items()))
+            self._rendered[theme] = rendered
+        return rendered
+
+    def get_sections(self, theme: str, sections) -> str:
+        # Sous-ensemble de l'historique (dépendances d'une section), même budget, sans mise en cache
+        entries = self._entries.get(theme, {})
+        return self._render([(section, entries[section]) for section in sections if section in entries])
+
+    def _render(self, entries: list) -> str:
+        if not entries:
+            return ""
+        if self.budget <= 0 or sum(entry.full_tokens for _, entry in entries) <= self.budget:
+            return "\n".join(entry.full for _, entry in entries)
+
+        # 1. Tout en résumé, en abandonnant les sections les plus anciennes si besoin
+        first = 0
+        cost = sum(entry.summary_tokens for _, entry in entries)
+        while first < len(entries) and cost > self.budget:
+            cost -= entries[first][1].summary_tokens
+            first += 1
+
+        # 2. Texte intégral pour les sections les plus récentes tant que le budget le permet
+        use_full = set()
+        for index in range(len(entries) - 1, first - 1, -1):
+            entry = entries[index][1]
+            extra = entry.full_tokens - entry.summary_tokens
+            if cost + extra > self.budget:
+                break
+            cost += extra
+            use_full.add(index)
+
+        lines = []
+        if first:
+            omitted = ", ".join(section for section, _ in entries[:first])
+            lines.append(f"[sections antérieures omises : {omitted}]")
+        for index in range(first, len(entries)):
+            entry = entries[index][1]
+            lines.append(entry.full if index in use_full else entry.summary)
+        return "\n".join(lines)
+
+    def tokens(self, theme: str) -> int:
+        return self.tokenizer.count(self.get(theme))
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from app import config
+from app.services.job_queue import new_job_id
+
+# États d'un job et de chacune de ses sections
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# -----------------------------------------------------
+#   DÉPENDANCES ENTRE SECTIONS (GRAPHE ACYCLIQUE)
+# -----------------------------------------------------
+# Toutes les sections partent du plan général ; seules celles qui doivent lire
+# le texte d'une autre l'attendent. Les chapitres 1 et 2 tournent côte à côte.
+SECTION_DEPENDENCIES = {
+    "introduction": (),
+    "chapitre 1 - cadre théorique": (),
+    "chapitre 1 - synthèse travaux": (),
+    "chapitre 1 - analyse critique": (),
+    "chapitre 2 - matériels et terrain": (),
+    "chapitre 2 - méthodologie": (),
+    "chapitre 3 - résultats": (),
+    "chapitre 3 - discussion": ("chapitre 3 - résultats",),
+    "conclusion": ("chapitre 3 - discussion",),
+}
+
+# Sorties des appels modèles qui signalent un échec (les appels ne lèvent pas d'exception)
+ERROR_PREFIXES = ("[ONLINE ERROR", "[OFFLINE ERROR", "[OFFLINE FATAL ERROR", "[Erreur technique]")
+
+
+def is_error_output(output: str) -> bool:
+    return not output or output.startswith(ERROR_PREFIXES)
+
+
+# -----------------------------------------------------
+#               JOB DE GÉNÉRATION D'UN DOCUMENT
+# -----------------------------------------------------
+class DocumentJob:
+    def __init__(self, user_id: str, theme: str, context: str, sections: list):
+        self.id = new_job_id()
+        self.user_id = user_id
+        self.theme = theme
+        self.context = context
+        self.status = PENDING
+        self.outline = None
+        self.error = None
+        self.sections = {section: {"status": PENDING, "started_at": None, "finished_at": None, "error": None}
+                         for section in sections}
+        self.texts = {}   # {section: texte rédigé}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+    def snapshot(self) -> dict:
+        done = sum(1 for state in self.sections.values() if state["status"] in (DONE, FAILED))
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "theme": self.theme,
+            "status": self.status,
+            "progression": f"{done}/{len(self.sections)}",
+            "plan": self.outline,
+            "sections": {section: dict(state) for section, state in self.sections.items()},
+            "erreur": self.error,
+            "duree_s": round(end - self.created_at, 3),
+        }
+
+
+# -----------------------------------------------------
+#   EXÉCUTION PARALLÈLE DU GRAPHE (LIMITE DE CONCURRENCE)
+# -----------------------------------------------------
+class DocumentGenerator:
+    def __init__(self, write_outline, write_section, on_section_done=None, sections=None,
+                 dependencies=SECTION_DEPENDENCIES, concurrency: int = None, max_jobs: int = None):
+        # write_outline(job) -> plan ; write_section(job, section, textes des dépendances) -> texte
+        # await on_section_done(job, section, texte) : stockage (memory_storage / dépôt)
+        self.write_outline = write_outline
+        self.write_section = write_section
+        self.on_section_done = on_section_done
+        self.sections = list(sections or dependencies)
+        self.dependencies = {section: tuple(dependencies.get(section, ())) for section in self.sections}
+        self._check_graph()
+        self.concurrency = concurrency or config.DOCUMENT_CONCURRENCY
+        self.max_jobs = max_jobs or config.DOCUMENT_MAX_JOBS
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.jobs = OrderedDict()   # {job_id: DocumentJob}, du plus ancien au plus récent
+
+    def _check_graph(self):
+        # Ordre topologique possible : chaque dépendance doit précéder la section dans la liste
+        seen = set()
+        for section in self.sections:
+            missing = [dep for dep in self.dependencies[section] if dep not in seen]
+            if missing:
+                raise ValueError(f"Dépendances invalides pour '{section}' : {missing}")
+            seen.add(section)
+
+    def submit(self, user_id: str, theme: str, context: str = "") -> DocumentJob:
+        job = DocumentJob(user_id, theme, context, self.sections)
+        self.jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self.run(job))
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        # Seuls les jobs terminés sont oubliés, les plus anciens d'abord
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].status in (DONE, FAILED):
+                del self.jobs[job_id]
+
+    async def run(self, job: DocumentJob):
+        job.status = RUNNING
+        try:
+            async with self._semaphore:
+                job.outline = await self.write_outline(job)
+            if is_error_output(job.outline):
+                raise RuntimeError(job.outline or "plan vide")
+
+            finished = {section: asyncio.Event() for section in self.sections}
+            await asyncio.gather(*(self._run_section(job, section, finished) for section in self.sections))
+            job.status = DONE if all(s["status"] == DONE for s in job.sections.values()) else FAILED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    async def _run_section(self, job: DocumentJob, section: str, finished: dict):
+        state = job.sections[section]
+        try:
+            for dep in self.dependencies[section]:
+                await finished[dep].wait()
+            # Une dépendance en échec n'empêche pas la rédaction : la section part du plan seul
+            dependency_texts = {dep: job.texts[dep] for dep in self.dependencies[section] if dep in job.texts}
+            async with self._semaphore:
+                state["status"] = RUNNING
+                state["started_at"] = time.time()
+                output = await self.write_section(job, section, dependency_texts)
+            if is_error_output(output):
+                state["status"], state["error"] = FAILED, output
+            else:
+                job.texts[section] = output
+                if self.on_section_done is not None:
+                    await self.on_section_done(job, section, output)
+                state["status"] = DONE
+        except Exception as e:
+            state["status"], state["error"] = FAILED, str(e)
+        finally:
+            state["finished_at"] = time.time()
+            finished[section].set()
+
+    async def aclose(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
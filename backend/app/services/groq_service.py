@@ -0,0 +1,150 @@
+import re
+import time
+
+import httpx
+
+from app import config
+from app.services.llm_client import LLMBackend
+
+
+# -----------------------------------------------------
+#     QUOTAS GROQ (EN-TÊTES x-ratelimit-* DES RÉPONSES)
+# -----------------------------------------------------
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> float:
+    # Format Groq : "7.66s", "2m59.56s", "120ms", "1h2m3s"
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_PART.findall(value))
+
+
+class RateLimitState:
+    def __init__(self):
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0   # horloge monotone
+        self.tokens_reset_at = 0.0
+        self.blocked_until = 0.0       # après un 429 (Retry-After)
+
+    def update(self, headers, status_code: int):
+        now = time.monotonic()
+        if "x-ratelimit-remaining-requests" in headers:
+            self.remaining_requests = int(float(headers["x-ratelimit-remaining-requests"]))
+            self.requests_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if "x-ratelimit-remaining-tokens" in headers:
+            self.remaining_tokens = int(float(headers["x-ratelimit-remaining-tokens"]))
+            self.tokens_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-tokens"))
+        if status_code == 429:
+            self.blocked_until = now + (parse_duration(headers.get("retry-after")) or 1.0)
+
+    def allows(self, tokens: int, reserve_requests: int = 0, reserve_tokens: int = 0) -> bool:
+        # Faux si la requête risque un 429 : mieux vaut déborder sur Ollama avant
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        if self.remaining_requests is not None and now < self.requests_reset_at \
+                and self.remaining_requests <= reserve_requests:
+            return False
+        if self.remaining_tokens is not None and now < self.tokens_reset_at \
+                and self.remaining_tokens < tokens + reserve_tokens:
+            return False
+        return True
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "requetes_restantes": self.remaining_requests,
+            "tokens_restants": self.remaining_tokens,
+            "reset_requetes_s": round(max(0.0, self.requests_reset_at - now), 2),
+            "reset_tokens_s": round(max(0.0, self.tokens_reset_at - now), 2),
+            "bloque_s": round(max(0.0, self.blocked_until - now), 2),
+        }
+
+
+# -----------------------------------------------------
+#     CLIENT ASYNCHRONE GROQ (CONNEXIONS KEEP-ALIVE)
+# -----------------------------------------------------
+class GroqService(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key: str = None, model: str = None, timeout: float = None,
+                 max_concurrency: int = None, queue_timeout: float = None, base_url: str = None, client=None):
+        super().__init__(
+            max_concurrency if max_concurrency is not None else config.GROQ_MAX_CONCURRENCY,
+            queue_timeout if queue_timeout is not None else config.GROQ_QUEUE_TIMEOUT,
+        )
+        self.api_key = api_key or config.GROQ_API_KEY
+        self.model = model or config.MODEL_NAME_ONLINE
+        self.timeout = timeout if timeout is not None else config.GROQ_TIMEOUT
+        # Autre URL que l'API Groq (proxy, serveur de test local) ; None = URL par défaut du SDK
+        self.base_url = base_url or config.GROQ_BASE_URL or None
+        self.rate_limit = RateLimitState()
+        # Client injecté (tests, benchmarks) ou construit au premier usage
+        self._client = client
+
+    def _get_client(self):
+        if self._client is None:
+            # SDK importé ici : son chargement (~0,1 s) ne pèse pas sur l'import de l'application
+            from groq import AsyncGroq
+            self._client = AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=config.HTTP_CONNECT_TIMEOUT),
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_keepalive_connections=config.HTTP_MAX_KEEPALIVE),
+                    event_hooks={"response": [self._on_response]},
+                ),
+            )
+        return self._client
+
+    async def _on_response(self, response: httpx.Response):
+        # Chaque réponse (streaming compris) met à jour les quotas restants
+        self.rate_limit.update(response.headers, response.status_code)
+
+    def _options(self, temperature: float, max_tokens: int) -> dict:
+        options = {"temperature": temperature}
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        return options
+
+    async def complete(self, prompt: str, temperature: float = 0.1, max_tokens: int = 4000) -> str:
+        async with self.slot():
+            response = await self._get_client().chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                **self._options(temperature, max_tokens)
+            )
+        return response.choices[0].message.content
+
+    async def stream(self, prompt: str, temperature: float = 0.1, max_tokens: int = 4000):
+        async with self.slot():
+            stream = await self._get_client().chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                **self._options(temperature, max_tokens)
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def stats(self) -> dict:
+        return {**super().stats(), "quotas": self.rate_limit.snapshot()}
+
+    def prepare(self):
+        # Appelé au démarrage du serveur : le client est prêt avant la première requête
+        self._get_client()
+
+    async def ping(self):
+        await self._get_client().with_options(timeout=config.HEALTH_PROBE_TIMEOUT, max_retries=0).models.list()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,191 @@
+import asyncio
+import inspect
+import threading
+import time
+
+from app import config
+
+# États du disjoncteur (circuit breaker)
+CLOSED = "closed"          # backend sain, les requêtes passent
+OPEN = "open"              # trop d'échecs, les requêtes sont détournées
+HALF_OPEN = "half_open"    # délai écoulé, une seule requête d'essai autorisée
+
+
+# -----------------------------------------------------
+#        DISJONCTEUR PAR BACKEND (ÉTAT EN CACHE)
+# -----------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, name: str, probe, failure_threshold: int, recovery_timeout: float, ttl: float):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.ttl = ttl
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.last_checked = 0.0
+        self.last_success = 0.0
+        self.last_error = None
+        self.last_latency = None
+        self.transitions = 0
+        self.last_transition = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.transitions += 1
+            self.last_transition = time.time()
+
+    def _refresh(self, now: float):
+        # Passage automatique OPEN -> HALF_OPEN après le délai de récupération
+        if self.state == OPEN and now - self.opened_at >= self.recovery_timeout:
+            self._set_state(HALF_OPEN)
+            self.trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self.state == CLOSED:
+                return True
+            # Avec une sonde, c'est elle qui fait l'essai half-open : pas de requête utilisateur en cobaye
+            if self.state == HALF_OPEN and self.probe is None and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        # Lecture seule : ne consomme pas l'essai half-open
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self.state != OPEN
+
+    def record_success(self, latency: float = None):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            self.last_checked = time.monotonic()
+            self.last_success = time.time()
+            self.last_error = None
+            if latency is not None:
+                self.last_latency = latency
+            self._set_state(CLOSED)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            now = time.monotonic()
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            self.last_checked = now
+            self.last_error = str(error) if error is not None else "échec inconnu"
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = now
+                self._set_state(OPEN)
+
+    def trip(self, error=None):
+        # Indisponibilité certaine (client Groq impossible à construire...) : ouvert sans attendre le seuil
+        with self._lock:
+            now = time.monotonic()
+            self.consecutive_failures = max(self.consecutive_failures, self.failure_threshold)
+            self.trial_in_flight = False
+            self.last_checked = now
+            self.last_error = str(error) if error is not None else "indisponible"
+            self.opened_at = now
+            self._set_state(OPEN)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.last_checked > self.ttl
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh(time.monotonic())
+            age = time.monotonic() - self.last_checked if self.last_checked else None
+            return {
+                "state": self.state,
+                "available": self.state != OPEN,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                "last_latency_ms": round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+                "last_success": self.last_success or None,
+                "checked_seconds_ago": round(age, 1) if age is not None else None,
+                "stale": age is None or age > self.ttl,
+                "transitions": self.transitions,
+                "last_transition": self.last_transition or None,
+            }
+
+
+# -----------------------------------------------------
+#        SONDE EN ARRIÈRE-PLAN DE TOUS LES BACKENDS
+# -----------------------------------------------------
+class HealthMonitor:
+    def __init__(self, interval: float = None, ttl: float = None,
+                 failure_threshold: int = None, recovery_timeout: float = None):
+        self.interval = interval if interval is not None else config.HEALTH_CHECK_INTERVAL
+        self.ttl = ttl if ttl is not None else config.HEALTH_CACHE_TTL
+        self.failure_threshold = failure_threshold if failure_threshold is not None else config.HEALTH_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout if recovery_timeout is not None else config.HEALTH_RECOVERY_TIMEOUT
+        self.backends = {}
+        self._task = None
+
+    def register(self, name: str, probe):
+        # probe : callable sync ou async qui lève une exception si le backend est indisponible
+        self.backends[name] = CircuitBreaker(name, probe, self.failure_threshold, self.recovery_timeout, self.ttl)
+
+    def allow_request(self, name: str) -> bool:
+        return self.backends[name].allow_request()
+
+    def is_available(self, name: str) -> bool:
+        return self.backends[name].is_available()
+
+    def record_success(self, name: str, latency: float = None):
+        self.backends[name].record_success(latency)
+
+    def record_failure(self, name: str, error=None):
+        self.backends[name].record_failure(error)
+
+    def trip(self, name: str, error=None):
+        self.backends[name].trip(error)
+
+    async def check(self, name: str):
+        breaker = self.backends[name]
+        # Circuit ouvert et délai non écoulé : inutile de sonder
+        if not breaker.is_available():
+            return
+        start = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(breaker.probe):
+                pending = breaker.probe()
+            else:
+                # Sonde bloquante : exécutée hors de la boucle d'événements
+                pending = asyncio.to_thread(breaker.probe)
+            await asyncio.wait_for(pending, timeout=config.HEALTH_PROBE_TIMEOUT)
+            breaker.record_success(time.monotonic() - start)
+        except Exception as e:
+            breaker.record_failure(e)
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(name) for name in self.backends))
+
+    async def _run(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {name: breaker.snapshot() for name, breaker in self.backends.items()}
@@ -0,0 +1,119 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Espace de noms WordprocessingML (word/document.xml)
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+PDF = "pdf"
+DOCX = "docx"
+TEXT = "text"
+
+
+class IngestionError(Exception):
+    pass
+
+
+def detect_kind(head: bytes, filename: str = "") -> str:
+    # Signature du fichier plutôt que le type MIME annoncé par le client
+    if head.startswith(b"%PDF"):
+        return PDF
+    if head.startswith(b"PK"):
+        return DOCX
+    if filename.lower().endswith((".txt", ".md")):
+        return TEXT
+    raise IngestionError("Format non reconnu : seuls les PDF, DOCX et fichiers texte sont acceptés")
+
+
+# -----------------------------------------------------
+#   LECTURE PAGE PAR PAGE (MÉMOIRE BORNÉE)
+# -----------------------------------------------------
+def iter_docx(path: str):
+    # iterparse : le XML n'est jamais chargé en entier, chaque bloc du corps est libéré une fois lu
+    page = 1
+    parts = []
+    depth = 0
+    body = None
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+            for event, element in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if element.tag == W + "body":
+                        body = element
+                    continue
+                depth -= 1
+                tag = element.tag
+                if tag == W + "t" and element.text:
+                    parts.append(element.text)
+                elif tag == W + "tab":
+                    parts.append(" ")
+                elif tag == W + "lastRenderedPageBreak" or (tag == W + "br" and element.get(W + "type") == "page"):
+                    page += 1
+                elif tag == W + "p":
+                    text = "".join(parts).strip()
+                    parts = []
+                    if text:
+                        yield page, text
+                if depth == 2 and body is not None:
+                    # Fin d'un paragraphe ou d'un tableau de premier niveau
+                    body.clear()
+    except (KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+        raise IngestionError(f"DOCX illisible : {e}") from e
+
+
+def iter_pdf(path: str):
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        raise IngestionError("Lecture des PDF indisponible : installez pypdf (pip install pypdf)")
+    try:
+        # Les pages sont analysées à la demande : une seule page en mémoire à la fois
+        reader = PdfReader(path)
+        for number, page in enumerate(reader.pages, 1):
+            text = page.extract_text() or ""
+            for paragraph in PARAGRAPH_SPLIT.split(text):
+                if paragraph.strip():
+                    yield number, paragraph.strip()
+    except PdfReadError as e:
+        raise IngestionError(f"PDF illisible : {e}") from e
+
+
+def iter_text(path: str):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = []
+        for line in f:
+            if line.strip():
+                lines.append(line.strip())
+            elif lines:
+                yield 1, " ".join(lines)
+                lines = []
+        if lines:
+            yield 1, " ".join(lines)
+
+
+READERS = {PDF: iter_pdf, DOCX: iter_docx, TEXT: iter_text}
+
+
+def iter_paragraphs(path: str, kind: str):
+    return READERS[kind](path)
+
+
+# -----------------------------------------------------
+#   DÉCOUPAGE EN PASSAGES (FENÊTRE GLISSANTE DE MOTS)
+# -----------------------------------------------------
+def chunk_paragraphs(paragraphs, words_per_chunk: int, overlap: int):
+    # Génère (page de début, texte) ; `overlap` mots repris d'un passage au suivant
+    words = []   # [(mot, page)]
+    emitted = False
+    for page, text in paragraphs:
+        words.extend((word, page) for word in text.split())
+        while len(words) >= words_per_chunk:
+            chunk = words[:words_per_chunk]
+            yield chunk[0][1], " ".join(word for word, _ in chunk)
+            emitted = True
+            words = words[words_per_chunk - overlap:]
+    if words and (not emitted or len(words) > overlap):
+        yield words[0][1], " ".join(word for word, _ in words)
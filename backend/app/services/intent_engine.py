@@ -0,0 +1,186 @@
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+# -----------------------------------------------------
+#      VOCABULAIRE DE DÉTECTION D'INTENTION
+# -----------------------------------------------------
+GREETINGS = ("bonjour", "salut", "hello", "hi", "coucou", "hey", "bonsoir")
+
+MEMOIRE_KEYWORDS = (
+    "rédiger", "rédige", "rédaction", "mémoire", "memoire", "thèse", "these",
+    "rapport", "projet", "dissertation", "introduction", "chapitre", "conclusion",
+    "section", "problématique", "méthodologie", "bibliographie", "littérature",
+    "revue", "état de l'art", "méthodes", "résultats", "discussion", "analyse",
+    "partie", "paragraphe", "sujet", "thème", "titre", "universitaire", "académique",
+    "cadre théorique", "matériels et méthodes", "contexte d'étude", "problématique",
+)
+
+MEMOIRE_PHRASES = (
+    "aide moi à rédiger", "aide-moi à rédiger", "aide pour rédiger",
+    "je dois rédiger", "je veux rédiger", "j'ai besoin de rédiger",
+    "comment rédiger", "comment faire un", "structure d'un mémoire",
+    "plan de mémoire", "aide pour mon mémoire", "aide pour ma thèse",
+    "rédiger l'introduction", "rédiger le chapitre", "rédiger la conclusion",
+)
+
+# Seuils de décision (identiques à la détection d'origine)
+MAX_GREETING_WORDS = 3
+MIN_KEYWORD_SCORE = 2
+MIN_MEMOIRE_WORDS = 21
+
+GREETING = "greeting"
+PHRASE = "phrase"
+KEYWORD = "keyword"
+
+
+# -----------------------------------------------------
+#   AUTOMATE AHO-CORASICK (TOUS LES TERMES EN UNE PASSE)
+# -----------------------------------------------------
+class AhoCorasick:
+    def __init__(self, terms):
+        # terms : itérable de (terme, étiquette)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for term, label in terms:
+            self._add(term, label)
+        self._build()
+
+    def _add(self, term: str, label):
+        node = 0
+        for char in term:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((term, label))
+
+    def _build(self):
+        # Parcours en largeur : liens d'échec puis table de transitions complète (DFA),
+        # pour qu'un caractère du texte coûte une seule consultation de dictionnaire.
+        order = []
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # Les sorties du suffixe le plus long sont héritées une fois pour toutes
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        for node in order:
+            transitions = dict(self._delta[self._fail[node]])
+            transitions.update(self._goto[node])
+            self._delta[node] = transitions
+
+    def iter_matches(self, text: str):
+        # Génère (position de début, terme, étiquette) pour chaque occurrence
+        delta, out = self._delta, self._out
+        node = 0
+        for end, char in enumerate(text, 1):
+            node = delta[node].get(char, 0)
+            if out[node]:
+                for term, label in out[node]:
+                    yield end - len(term), term, label
+
+
+# -----------------------------------------------------
+#               SCORE D'INTENTION STRUCTURÉ
+# -----------------------------------------------------
+@dataclass
+class IntentScore:
+    intention: str
+    reason: str
+    confidence: float
+    word_count: int
+    greeting: str = None
+    phrases: list = field(default_factory=list)
+    keywords: dict = field(default_factory=dict)   # {mot-clé: occurrences}
+    keyword_score: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "intention": self.intention,
+            "raison": self.reason,
+            "confiance": self.confidence,
+            "nombre_mots": self.word_count,
+            "salutation": self.greeting,
+            "phrases_trouvees": self.phrases,
+            "mots_cles_trouves": self.keywords,
+            "score_mots_cles": self.keyword_score,
+        }
+
+
+class IntentEngine:
+    def __init__(self, greetings=GREETINGS, keywords=MEMOIRE_KEYWORDS, phrases=MEMOIRE_PHRASES):
+        # Un mot-clé listé plusieurs fois compte autant de fois (comportement d'origine)
+        self.keyword_weights = Counter(keywords)
+        self.greetings = greetings
+        self.phrases = phrases
+        self.automaton = None
+
+    def compile(self):
+        # Automate construit au démarrage du serveur ; sinon au premier appel (scripts, benchmarks)
+        if self.automaton is None:
+            terms = [(g, GREETING) for g in dict.fromkeys(self.greetings)]
+            terms += [(p, PHRASE) for p in dict.fromkeys(self.phrases)]
+            terms += [(k, KEYWORD) for k in self.keyword_weights]
+            self.automaton = AhoCorasick(terms)
+        return self
+
+    def analyze(self, message: str) -> IntentScore:
+        automaton = self.automaton if self.automaton is not None else self.compile().automaton
+        text = message.lower().strip()
+        word_count = len(text.split())
+
+        greeting = None
+        phrases = []
+        keywords = Counter()
+        for start, term, label in automaton.iter_matches(text):
+            if label == KEYWORD:
+                keywords[term] += 1
+            elif label == PHRASE:
+                if term not in phrases:
+                    phrases.append(term)
+            elif start == 0 and greeting is None:
+                end = len(term)
+                if end == len(text) or text[end] == " ":
+                    greeting = term
+        keyword_score = sum(self.keyword_weights[k] for k in keywords)
+
+        score = IntentScore(
+            intention="chat", reason="", confidence=0.0, word_count=word_count,
+            greeting=greeting, phrases=phrases, keywords=dict(keywords), keyword_score=keyword_score,
+        )
+        # Même ordre de décision que la détection d'origine
+        if greeting is not None and word_count <= MAX_GREETING_WORDS:
+            score.reason, score.confidence = "salutation courte", 0.95
+        elif phrases:
+            score.intention, score.reason, score.confidence = "memoire", "phrase de rédaction", 0.95
+        elif keyword_score >= MIN_KEYWORD_SCORE:
+            score.intention, score.reason = "memoire", "mots-clés académiques"
+            score.confidence = min(0.6 + 0.1 * keyword_score, 0.95)
+        elif word_count >= MIN_MEMOIRE_WORDS:
+            score.intention, score.reason, score.confidence = "memoire", "message long", 0.6
+        elif keyword_score == 1:
+            score.reason, score.confidence = "un seul mot-clé académique", 0.55
+        else:
+            score.reason, score.confidence = "aucun signal académique", 0.8
+        return score
+
+
+intent_engine = IntentEngine()
+
+
+def detect_intention(message: str) -> str:
+    return intent_engine.analyze(message).intention
@@ -0,0 +1,278 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from app import config
+
+# États d'un job
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Priorités (plus petit = servi en premier)
+PRIORITY_CHAT = 0
+PRIORITY_SECTION = 1
+
+
+class QueueFullError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def new_job_id() -> str:
+    # Préfixe du worker : le routeur du mode multi-workers renvoie le suivi d'un job à son worker
+    job_id = uuid.uuid4().hex
+    return f"{config.WORKER_ID}-{job_id}" if config.WORKER_ID else job_id
+
+
+# -----------------------------------------------------
+#                       JOB
+# -----------------------------------------------------
+class Job:
+    def __init__(self, user_id: str, kind: str, priority: int, payload: dict):
+        self.id = new_job_id()
+        self.user_id = user_id
+        self.kind = kind
+        self.priority = priority
+        self.payload = payload
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0          # incrémenté à chaque changement d'état (abonnés)
+        self.cancel_requested = False
+        self.task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "type": self.kind,
+            "priorite": self.priority,
+            "status": self.status,
+            "result": self.result,
+            "erreur": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# -----------------------------------------------------
+#   INTERFACE DE LA FILE (REMPLAÇABLE PAR UNE FILE PARTAGÉE)
+# -----------------------------------------------------
+class JobQueue:
+    # Ajoute un job ; lève QueueFullError si la file est pleine
+    async def put(self, job: Job):
+        raise NotImplementedError
+
+    # Prochain job à exécuter (attend s'il n'y en a aucun)
+    async def take(self) -> Job:
+        raise NotImplementedError
+
+    # Retire un job encore en attente ; False s'il n'est plus dans la file
+    async def remove(self, job: Job) -> bool:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+# -----------------------------------------------------
+#   FILE EN MÉMOIRE : PRIORITÉS + TOURNIQUET PAR UTILISATEUR
+# -----------------------------------------------------
+class InMemoryJobQueue(JobQueue):
+    def __init__(self, max_size: int = None, max_per_user: int = None):
+        self.max_size = max_size or config.JOB_QUEUE_MAX_SIZE
+        self.max_per_user = max_per_user or config.JOB_MAX_PER_USER
+        # {priorité: OrderedDict {user_id: deque(jobs)}} ; l'utilisateur servi repasse en fin de tour
+        self._levels = {}
+        self._per_user = {}
+        self._size = 0
+        self._not_empty = asyncio.Condition()
+
+    async def put(self, job: Job):
+        async with self._not_empty:
+            if self._size >= self.max_size:
+                raise QueueFullError("File de génération pleine", retry_after=0)
+            if self._per_user.get(job.user_id, 0) >= self.max_per_user:
+                raise QueueFullError(f"Trop de jobs en attente pour l'utilisateur {job.user_id}", retry_after=0)
+            users = self._levels.setdefault(job.priority, OrderedDict())
+            users.setdefault(job.user_id, deque()).append(job)
+            self._per_user[job.user_id] = self._per_user.get(job.user_id, 0) + 1
+            self._size += 1
+            self._not_empty.notify()
+
+    async def take(self) -> Job:
+        async with self._not_empty:
+            while self._size == 0:
+                await self._not_empty.wait()
+            for priority in sorted(self._levels):
+                users = self._levels[priority]
+                if not users:
+                    continue
+                user_id, jobs = next(iter(users.items()))
+                job = jobs.popleft()
+                if jobs:
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                self._release(job)
+                return job
+
+    async def remove(self, job: Job) -> bool:
+        async with self._not_empty:
+            jobs = self._levels.get(job.priority, {}).get(job.user_id)
+            if not jobs or job not in jobs:
+                return False
+            jobs.remove(job)
+            if not jobs:
+                del self._levels[job.priority][job.user_id]
+            self._release(job)
+            return True
+
+    def _release(self, job: Job):
+        self._size -= 1
+        remaining = self._per_user[job.user_id] - 1
+        if remaining:
+            self._per_user[job.user_id] = remaining
+        else:
+            del self._per_user[job.user_id]
+
+    def size(self) -> int:
+        return self._size
+
+
+# -----------------------------------------------------
+#        POOL DE WORKERS (NOMBRE DE GÉNÉRATIONS BORNÉ)
+# -----------------------------------------------------
+class JobManager:
+    def __init__(self, handler, queue: JobQueue = None, workers: int = None, max_jobs: int = None):
+        # handler(job) -> résultat sérialisable en JSON
+        self.handler = handler
+        self.queue = queue or InMemoryJobQueue()
+        self.workers = workers or config.JOB_WORKERS
+        self.max_jobs = max_jobs or config.JOB_MAX_KEPT
+        self.jobs = OrderedDict()   # {job_id: Job}, du plus ancien au plus récent
+        self._changed = None
+        self._tasks = []
+        self._stopping = False
+        self._avg_duration = None   # moyenne glissante, pour estimer Retry-After
+        self.completed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._changed = asyncio.Condition()
+            self._tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        tasks = self._tasks + [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def retry_after(self) -> int:
+        # Temps estimé pour que la file se vide d'un tour de workers
+        duration = self._avg_duration or 10.0
+        return max(1, int(duration * (self.queue.size() + 1) / self.workers))
+
+    async def submit(self, user_id: str, kind: str, priority: int, payload: dict) -> Job:
+        job = Job(user_id, kind, priority, payload)
+        try:
+            await self.queue.put(job)
+        except QueueFullError as e:
+            e.retry_after = self.retry_after()
+            raise
+        self.jobs[job.id] = job
+        self._prune()
+        await self._notify(job)
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job.cancel_requested = True
+        if job.status == QUEUED and await self.queue.remove(job):
+            await self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def wait_for_change(self, job: Job, version: int, timeout: float):
+        # Abonnement : rend la main au prochain changement d'état du job (ou après timeout)
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: job.version != version), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "en_attente": self.queue.size(),
+            "jobs": counts,
+            "termines": self.completed,
+            "duree_moyenne_s": round(self._avg_duration, 3) if self._avg_duration else None,
+        }
+
+    def _prune(self):
+        # Seuls les jobs terminés sont oubliés, les plus anciens d'abord
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].status in FINISHED:
+                del self.jobs[job_id]
+
+    async def _notify(self, job: Job):
+        job.version += 1
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _finish(self, job: Job, status: str, result=None, error: str = None):
+        job.status, job.result, job.error = status, result, error
+        job.finished_at = time.time()
+        job.task = None
+        await self._notify(job)
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.take()
+            if job.cancel_requested:
+                # Annulé entre la sortie de file et le démarrage
+                await self._finish(job, CANCELLED)
+                continue
+            job.status = RUNNING
+            job.started_at = time.time()
+            await self._notify(job)
+            # Tâche séparée : une annulation arrête la génération sans tuer le worker
+            job.task = asyncio.get_running_loop().create_task(self.handler(job))
+            try:
+                result = await job.task
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+                await self._finish(job, CANCELLED)
+            except Exception as e:
+                await self._finish(job, FAILED, error=str(e))
+            else:
+                duration = time.time() - job.started_at
+                self._avg_duration = duration if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * duration
+                self.completed += 1
+                await self._finish(job, DONE, result=result)
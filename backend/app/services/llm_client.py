@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.services.metrics import span
+
+
+# -----------------------------------------------------
+#               ERREURS DES BACKENDS LLM
+# -----------------------------------------------------
+class BackendError(Exception):
+    pass
+
+
+class BackendBusyError(BackendError):
+    # Aucun créneau libre dans le délai imparti
+    pass
+
+
+# -----------------------------------------------------
+#     BASE COMMUNE : LIMITE DE CONCURRENCE PAR BACKEND
+# -----------------------------------------------------
+class LLMBackend:
+    name = "backend"
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            # Attente d'un créneau comptée à part du temps de génération
+            with span("queue"):
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise BackendBusyError(f"{self.name} saturé : aucun créneau libre après {self.queue_timeout:.0f}s")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+        }
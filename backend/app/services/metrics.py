@@ -0,0 +1,255 @@
+import contextvars
+import threading
+import time
+
+from app import config
+from app.services.context_window import get_tokenizer
+
+# Bornes des histogrammes de durée (secondes) : de la détection (µs) à la génération (minutes)
+DURATION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# En-tête de requête qui demande le détail Server-Timing dans la réponse (X-Server-Timing: 1)
+SERVER_TIMING_HEADER = b"x-server-timing"
+SERVER_TIMING_ON = b"1"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# -----------------------------------------------------
+#     COMPTEURS ET HISTOGRAMMES (FORMAT TEXTE PROMETHEUS)
+# -----------------------------------------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, key)} {value:g}" for key, value in values]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}   # {valeurs des labels: [comptes par borne..., somme, total]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {values[-2]:g}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+REQUESTS = registry.counter("memory_ai_requests_total", "Requêtes HTTP traitées", ("route", "status"))
+REQUEST_DURATION = registry.histogram("memory_ai_request_duration_seconds", "Durée totale des requêtes HTTP",
+                                      ("route",))
+STAGE_DURATION = registry.histogram("memory_ai_stage_duration_seconds", "Durée de chaque étape d'une requête",
+                                    ("route", "stage", "backend", "section"))
+TOKENS = registry.counter("memory_ai_tokens_total", "Tokens envoyés (prompt) et générés (completion)",
+                          ("backend", "kind"))
+BYTES = registry.counter("memory_ai_bytes_total", "Octets envoyés (prompt) et générés (completion)",
+                         ("backend", "kind"))
+
+
+# -----------------------------------------------------
+#   ÉTAPES D'UNE REQUÊTE (SPANS PORTÉS PAR UN CONTEXTVAR)
+# -----------------------------------------------------
+class RequestTrace:
+    __slots__ = ("spans", "labels")
+
+    def __init__(self):
+        self.spans = []     # [(étape, secondes)]
+        self.labels = {}    # backend, section
+
+    def totals(self) -> dict:
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.totals().items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "stage", "start")
+
+    def __init__(self, trace: RequestTrace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans.append((self.stage, time.perf_counter() - self.start))
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(stage: str):
+    # Hors requête instrumentée (métriques désactivées, tâche de fond) : aucun coût de mesure
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, stage)
+
+
+def set_labels(**labels):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.labels.update(labels)
+
+
+_tokenizer = get_tokenizer()
+
+
+def record_generation(backend: str, prompt: str, output: str):
+    if not config.METRICS_ENABLED:
+        return
+    TOKENS.inc(_tokenizer.count(prompt), backend=backend, kind="prompt")
+    TOKENS.inc(_tokenizer.count(output), backend=backend, kind="completion")
+    BYTES.inc(len(prompt.encode("utf-8")), backend=backend, kind="prompt")
+    BYTES.inc(len(output.encode("utf-8")), backend=backend, kind="completion")
+
+
+# -----------------------------------------------------
+#     MIDDLEWARE ASGI : DURÉES PAR ROUTE ET SERVER-TIMING
+# -----------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app, enabled: bool = None, server_timing: bool = None):
+        self.app = app
+        self.enabled = config.METRICS_ENABLED if enabled is None else enabled
+        self.server_timing = config.SERVER_TIMING_ENABLED if server_timing is None else server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        want_timing = self.server_timing and any(
+            name == SERVER_TIMING_HEADER and value.strip() == SERVER_TIMING_ON for name, value in scope.get("headers", ())
+        )
+        if not (self.enabled or want_timing):
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if want_timing:
+                    # En streaming, seules les étapes terminées avant le premier octet y figurent
+                    timing = trace.server_timing(time.perf_counter() - start).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            if self.enabled:
+                self._observe(scope, trace, status, time.perf_counter() - start)
+
+    def _observe(self, scope, trace: RequestTrace, status: int, total: float):
+        # Gabarit de la route (/jobs/{job_id}) plutôt que le chemin, pour borner le nombre de séries
+        route = getattr(scope.get("route"), "path", None) or "other"
+        REQUESTS.inc(route=route, status=str(status))
+        REQUEST_DURATION.observe(total, route=route)
+        backend = trace.labels.get("backend", "")
+        section = trace.labels.get("section", "")
+        for stage, seconds in trace.totals().items():
+            STAGE_DURATION.observe(seconds, route=route, stage=stage, backend=backend, section=section)
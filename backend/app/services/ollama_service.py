@@ -0,0 +1,106 @@
+import json
+
+import httpx
+
+from app import config
+from app.services.llm_client import BackendError, LLMBackend
+
+
+# -----------------------------------------------------
+#     CLIENT ASYNCHRONE OLLAMA (CONNEXIONS KEEP-ALIVE)
+# -----------------------------------------------------
+class OllamaService(LLMBackend):
+    name = "ollama"
+
+    def __init__(self, url: str = None, model: str = None, timeout: float = None,
+                 max_concurrency: int = None, queue_timeout: float = None, keep_alive: str = None, client=None):
+        super().__init__(
+            max_concurrency if max_concurrency is not None else config.OLLAMA_MAX_CONCURRENCY,
+            queue_timeout if queue_timeout is not None else config.OLLAMA_QUEUE_TIMEOUT,
+        )
+        self.url = url or config.OLLAMA_URL
+        self.base_url = self.url.rsplit("/api/", 1)[0]
+        self.model = model or config.MODEL_NAME_OFFLINE
+        self.timeout = timeout if timeout is not None else config.OLLAMA_TIMEOUT
+        self.keep_alive = keep_alive if keep_alive is not None else config.OLLAMA_KEEP_ALIVE
+        # Options ajoutées à chaque requête (ex. num_gpu=0 après une erreur CUDA)
+        self.extra_options = {}
+        # Client injecté (tests, benchmarks) ou construit au premier usage
+        self._client = client
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Un seul pool de connexions réutilisé par toutes les requêtes
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=config.HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_keepalive_connections=config.HTTP_MAX_KEEPALIVE),
+            )
+        return self._client
+
+    def _payload(self, prompt: str, stream: bool, options: dict) -> dict:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {**options, **self.extra_options},
+        }
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def force_cpu(self):
+        # Le démon Ollama déjà lancé ignore l'environnement de ce processus :
+        # le repli CPU passe par l'option num_gpu de chaque requête.
+        self.extra_options["num_gpu"] = 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "cpu_only": self.extra_options.get("num_gpu") == 0}
+
+    async def generate(self, prompt: str, temperature: float = 0.1, num_predict: int = 3000) -> str:
+        payload = self._payload(prompt, False, {"temperature": temperature, "num_predict": num_predict})
+        async with self.slot():
+            response = await self._get_client().post(self.url, json=payload)
+        data = response.json()
+        if "response" in data:
+            return data["response"]
+        if "error" in data:
+            raise BackendError(data["error"])
+        raise BackendError("Réponse inconnue du modèle.")
+
+    async def stream(self, prompt: str, temperature: float = 0.1, num_predict: int = 3000):
+        payload = self._payload(prompt, True, {"temperature": temperature, "num_predict": num_predict})
+        async with self.slot():
+            async with self._get_client().stream("POST", self.url, json=payload) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise BackendError(data["error"])
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+
+    async def preload(self):
+        # Prompt vide : Ollama charge le modèle en mémoire sans rien générer
+        payload = {"model": self.model, "prompt": "", "stream": False, "options": dict(self.extra_options)}
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        response = await self._get_client().post(self.url, json=payload)
+        data = response.json()
+        if "error" in data:
+            raise BackendError(data["error"])
+
+    def prepare(self):
+        # Appelé au démarrage du serveur : le client est prêt avant la première requête
+        self._get_client()
+
+    async def ping(self):
+        response = await self._get_client().get(f"{self.base_url}/api/tags", timeout=config.HEALTH_PROBE_TIMEOUT)
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+from app.services.document_jobs import is_error_output
+
+# Réponse qui ne fait qu'accepter la section suggérée (« oui », « vas-y », « oui, la suite stp »...) :
+# le message entier doit en être fait, « ok merci » ou « continue avec la conclusion » n'en sont pas
+ACCEPT_WORDS = (r"(?:oui|ouais|ok|okay|d'accord|vas-y|vas y|allez-y|allez|go|volontiers|bien sûr|continue|continuons|"
+                r"on continue|la suite|passe à la suite|section suivante|rédige-la|redige-la)")
+PLEASE_WORDS = r"(?:stp|svp|s'il te plaît|s'il te plait|s'il vous plaît|s'il vous plait)"
+ACCEPT_SUGGESTION = re.compile(
+    rf"^\s*{ACCEPT_WORDS}(?:[\s,.!;]+(?:{ACCEPT_WORDS}|{PLEASE_WORDS}))*[\s,.!;]*$",
+    re.IGNORECASE,
+)
+
+# États d'une génération anticipée
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def is_acceptance(prompt: str) -> bool:
+    return ACCEPT_SUGGESTION.match(prompt.replace("’", "'")) is not None
+
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+class Suggestion:
+    __slots__ = ("theme", "section", "context", "digest", "task", "status", "created_at")
+
+    def __init__(self, theme: str, section: str, context: str):
+        self.theme = theme
+        self.section = section
+        self.context = context
+        self.digest = None   # empreinte du prompt réellement généré
+        self.task = None
+        self.status = PENDING
+        self.created_at = time.monotonic()
+
+
+# -----------------------------------------------------
+#   SECTION SUIVANTE GÉNÉRÉE PENDANT LA LECTURE
+# -----------------------------------------------------
+class Prefetcher:
+    # Après chaque section, la suivante est suggérée ; si les backends sont libres, elle est rédigée
+    # en arrière-plan et servie telle quelle quand l'utilisateur accepte (même prompt, même texte)
+    def __init__(self, build, generate, has_capacity, max_entries: int, ttl: float, delay: float):
+        self.build = build                  # await build(user_id, thème, section, contexte) -> prompt
+        self.generate = generate            # prompt -> texte (coroutine)
+        self.has_capacity = has_capacity    # () -> bool : assez de marge pour une génération spéculative
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.delay = delay
+        self._entries = OrderedDict()       # {user_id: Suggestion}, ordre LRU
+        self.counts = {"suggerees": 0, "lancees": 0, "ignorees": 0, "servies": 0, "perdues": 0}
+
+    def suggest(self, user_id: str, theme: str, section: str, context: str):
+        self.discard(user_id)
+        entry = Suggestion(theme, section, context)
+        self._entries[user_id] = entry
+        self.counts["suggerees"] += 1
+        entry.task = asyncio.get_running_loop().create_task(self._run(user_id, entry))
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._cancel(evicted)
+
+    async def _run(self, user_id: str, entry: Suggestion):
+        # Laisse passer les requêtes en cours (lecture de la réponse, question suivante) avant de décider
+        await asyncio.sleep(self.delay)
+        if not self.has_capacity():
+            entry.status = SKIPPED
+            self.counts["ignorees"] += 1
+            return None
+        entry.status = RUNNING
+        self.counts["lancees"] += 1
+        try:
+            prompt = await self.build(user_id, entry.theme, entry.section, entry.context)
+            entry.digest = prompt_digest(prompt)
+            output = await self.generate(prompt)
+        except Exception:
+            output = None
+        if is_error_output(output):
+            entry.status = FAILED
+            return None
+        entry.status = READY
+        return output
+
+    def pending(self, user_id: str):
+        # Suggestion encore valable pour cet utilisateur (sinon None)
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+            self.discard(user_id)
+            return None
+        return entry
+
+    async def take(self, user_id: str, prompt: str):
+        # Texte anticipé si le prompt est identique à celui généré (même thème, contexte et sections
+        # précédentes) ; une génération encore en cours est attendue plutôt que relancée
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return None
+        if entry.digest is None or entry.digest != prompt_digest(prompt) or entry.status in (SKIPPED, FAILED):
+            self._cancel(entry)
+            return None
+        try:
+            output = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                return None
+            raise
+        if output is None:
+            return None
+        self.counts["servies"] += 1
+        return output
+
+    def discard(self, user_id: str):
+        # Thème ou contexte changé : la section anticipée ne servira plus
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._cancel(entry)
+
+    def discard_theme(self, theme: str):
+        # Une section du thème a changé : les prompts anticipés ne correspondent plus
+        for user_id in [user_id for user_id, entry in self._entries.items() if entry.theme == theme]:
+            self.discard(user_id)
+
+    def _cancel(self, entry: Suggestion):
+        # Génération lancée pour rien (perdue), ou simple suggestion abandonnée
+        if entry.status in (RUNNING, READY):
+            self.counts["perdues"] += 1
+        if entry.task is not None and not entry.task.done():
+            entry.task.cancel()
+
+    def stats(self) -> dict:
+        statuses = {}
+        for entry in self._entries.values():
+            statuses[entry.status] = statuses.get(entry.status, 0) + 1
+        return {"en_cours": statuses, **self.counts}
+
+    async def aclose(self):
+        tasks = [entry.task for entry in self._entries.values() if entry.task is not None and not entry.task.done()]
+        self._entries.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
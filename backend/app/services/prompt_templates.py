@@ -0,0 +1,463 @@
+import string
+
+# -----------------------------------------------------
+#     BLOCS STATIQUES DU PROMPT (CRÉÉS UNE SEULE FOIS)
+# -----------------------------------------------------
+# NOUVELLE MÉTHODOLOGIE DÉTAILLÉE
+METHODOLOGY = """
+MÉTHODOLOGIE ACADÉMIQUE DÉTAILLÉE POUR LA RÉDACTION DE MÉMOIRE
+
+========================================
+INTRODUCTION GÉNÉRALE
+========================================
+Fonction : Poser les fondations du mémoire, justifier son existence et en présenter la structure logique.
+
+1. CONTEXTE D'ÉTUDE
+   • Cadre général : Présentation du domaine scientifique, professionnel ou sociétal dans lequel s'inscrit le sujet.
+   • Cadre spécifique : Délimitation précise du terrain, de l'entreprise, de la communauté ou du corpus d'étude.
+   • Justification et intérêt : Pourquoi ce sujet est-il important maintenant ? (Enjeux actuels, lacunes observées, demandes institutionnelles).
+   • Historique succinct : Évolution de la situation ayant conduit au besoin d'étude.
+
+2. PROBLÉMATIQUE ET OBJECTIFS
+   • Question de départ : La question large qui a initié la réflexion.
+   • Problématique formulée : La question centrale, précise, argumentée et construite qui guide toute la recherche. Elle montre la "tension" ou le "problème" à résoudre.
+   • Objectif général : La finalité ultime du mémoire (ex : Concevoir, Évaluer, Comprendre, Proposer un modèle).
+   • Objectifs spécifiques (SMART) : La décomposition concrète et hiérarchisée des étapes à franchir pour atteindre l'objectif général.
+
+3. PLAN DU DOCUMENT
+   • Logique de la structure : Justification du choix des chapitres (approche dialectique, analytique, comparative, etc.).
+   • Annonce synthétique : Présentation claire et succincte du contenu de chaque partie principale.
+
+========================================
+CHAPITRE 1 : REVUE DE LA LITTÉRATURE / ÉTAT DE L'ART
+========================================
+Fonction : Démontrer la maîtrise du sujet, identifier les connaissances établies et les lacunes pour justifier sa propre recherche.
+
+1.1 PRÉSENTATION DES CONCEPTS CLÉS ET CADRE THÉORIQUE
+   • Définitions opérationnelles : Définition précise des termes centraux du sujet, en citant les auteurs de référence.
+   • Cadre théorique : Présentation et explication des théories, modèles ou paradigmes qui serviront de grille d'analyse.
+   • Historique et évolution des idées : Comment les concepts et théories ont-ils évolué jusqu'à aujourd'hui ?
+
+1.2 SYNTHÈSE DES TRAVAUX ANTÉRIEURS ET RÉCENTS
+   • Méthodologie de la revue : Critères de sélection des sources (mots-clés, bases de données, périodes, langues).
+   • Cartographie de la recherche : Classement des travaux par écoles de pensée, méthodologies, ou résultats convergents/divergents.
+   • Études fondatrices et pionnières : Les recherches qui ont marqué le domaine.
+   • Études les plus récentes : L'état actuel de la recherche, identifiant les fronts de science.
+
+1.3 ANALYSE CRITIQUE ET IDENTIFICATION DU GAP
+   • Discussion critique : Confrontation des points de vue, forces et faiblesses des méthodologies employées, limites des résultats.
+   • Synthèse des apports : Ce qui est acquis, consensuel.
+   • Identification de la niche (le "gap") : Mise en évidence claire de la lacune, de la question non résolue que votre mémoire vient combler.
+
+========================================
+CHAPITRE 2 : MATÉRIELS ET MÉTHODES
+========================================
+Fonction : Décrire avec une précision reproductible le "comment" de la recherche. C'est le protocole scientifique.
+
+2.1 MATÉRIELS, OUTILS ET TERRAIN
+   • Description du terrain / population / corpus :
+        - Sélection et critères d'inclusion/exclusion.
+        - Taille, caractéristiques principales (descriptif statistique ou qualitatif).
+        - Accès au terrain et considérations éthiques (accord, consentement, anonymat).
+   • Matériels (Hardware/Software) :
+        - Liste et spécifications techniques des équipements.
+        - Logiciels utilisés (pour l'analyse, la modélisation, les statistiques) avec version.
+   • Outils de collecte :
+        - Questionnaire (en annexe), guide d'entretien, grille d'observation.
+        - Justification de leur élaboration (adaptation d'outils validés, création originale).
+
+2.2 MÉTHODOLOGIE DE LA RECHERCHE
+   • Choix du design de recherche : Qualitative, Quantitative ou Mixte. Justification.
+   • Procédure de collecte des données : Déroulement chronologique précis (étape par étape), période, durée, conditions.
+   • Méthodes d'analyse des données :
+        - Pour données quantitatives : Tests statistiques utilisés (avec justification), logiciel.
+        - Pour données qualitatives : Méthode d'analyse (analyse de contenu, thématique, discours), processus de codage.
+   • Limites méthodologiques et biais potentiels : Anticipation et reconnaissance des limites inhérentes aux choix méthodologiques.
+
+========================================
+CHAPITRE 3 : RÉSULTATS, ANALYSE ET DISCUSSION
+========================================
+Fonction : Présenter, interpréter et confronter les résultats à la lumière du cadre théorique.
+
+STRUCTURE OPTION A : RÉSULTATS ET DISCUSSION INTÉGRÉS (par thème/objectif)
+   • Présentation des résultats : Faits bruts organisés (tableaux, graphiques, citations significatives).
+   • Analyse et Interprétation : Que signifient ces faits ? Explication immédiate.
+   • Discussion : Confrontation de ce résultat avec les travaux cités au Chapitre 1 (confirmation, infirmation, nuance).
+
+STRUCTURE OPTION B : RÉSULTATS ET DISCUSSION SÉPARÉS
+   3.1 PRÉSENTATION DES RÉSULTATS
+        - Organisation stricte selon les objectifs spécifiques ou les thèmes de recherche.
+        - Présentation neutre et factuelle des données, sans interprétation.
+        - Utilisation efficace des visuels (graphiques, tableaux clairement titrés et commentés).
+   
+   3.2 ANALYSE ET DISCUSSION GÉNÉRALE
+        - Interprétation globale : Donner du sens à l'ensemble des résultats.
+        - Discussion argumentée : Confrontation systématique avec l'état de l'art, explication des convergences/divergences.
+        - Réponse à la problématique : Montrer en quoi les résultats apportent des éléments de réponse.
+
+========================================
+CONCLUSION ET PERSPECTIVES
+========================================
+Fonction : Boucler la boucle logique du mémoire, résoudre la problématique et ouvrir sur l'avenir.
+
+1. BILAN SYNTHÉTIQUE ET RÉPONSES APPORTÉES
+   • Récapitulation synthétique : Rappel très concis des objectifs et de la démarche.
+   • Réponse à la problématique : Formulation claire et affirmative de la réponse principale.
+   • Synthèse des apports principaux : Les 3-4 contributions majeures (théoriques, méthodologiques, pratiques).
+   • Limites de l'étude : Reconnaissance honnête et argumentée des limites.
+
+2. PERSPECTIVES
+   • Perspectives de recherche : Propositions concrètes pour des recherches futures.
+   • Perspectives pratiques / Recommandations : Propositions d'actions concrètes.
+   • Ouverture : Élargissement du sujet vers un débat plus vaste.
+"""
+
+# Instructions spécifiques par section
+SECTION_INSTRUCTIONS = {
+    "introduction": """
+Pour l'INTRODUCTION GÉNÉRALE, développez chaque point suivant :
+1. Contexte d'étude (environ 25 lignes)
+   - Cadre général et spécifique
+   - Justification de l'intérêt actuel du sujet
+   - Historique succinct si pertinent
+
+2. Problématique et objectifs (environ 25 lignes)
+   - Formulation précise de la problématique avec justification
+   - Objectif général bien défini
+   - 3-5 objectifs spécifiques formulés de manière SMART
+
+3. Plan du document (environ 10 lignes)
+   - Logique de la structure choisie
+   - Annonce synthétique des chapitres
+""",
+    "chapitre 1 - cadre théorique": """
+Pour le CADRE THÉORIQUE (Chapitre 1.1), développez :
+1. Définitions opérationnelles (environ 20 lignes)
+   - Définitions précises des concepts clés avec auteurs
+   - Clarification des termes techniques
+
+2. Cadre théorique (environ 25 lignes)
+   - Présentation des théories principales
+   - Explication de leur pertinence pour votre étude
+   - Articulation entre les différentes théories
+
+3. Historique et évolution des idées (environ 15 lignes)
+   - Évolution chronologique des concepts
+   - Tournants théoriques importants
+""",
+    "chapitre 1 - synthèse travaux": """
+Pour la SYNTHÈSE DES TRAVAUX (Chapitre 1.2), développez :
+1. Méthodologie de la revue (environ 15 lignes)
+   - Critères de sélection des sources
+   - Bases de données consultées
+   - Période couverte
+
+2. Cartographie de la recherche (environ 20 lignes)
+   - Classification des travaux par approches
+   - Tableau synthétique des principales études
+   - Tendances dominantes dans la littérature
+
+3. Études clés (environ 25 lignes)
+   - Présentation des études fondatrices
+   - Analyse des travaux récents les plus pertinents
+   - Synthèse des principaux résultats existants
+""",
+    "chapitre 1 - analyse critique": """
+Pour l'ANALYSE CRITIQUE (Chapitre 1.3), développez :
+1. Discussion critique (environ 25 lignes)
+   - Forces et faiblesses des méthodologies rencontrées
+   - Limites des résultats des études existantes
+   - Controverses ou débats dans la littérature
+
+2. Synthèse des apports (environ 15 lignes)
+   - Consensus établis dans le domaine
+   - Connaissances acquises et validées
+
+3. Identification du gap (environ 20 lignes)
+   - Lacunes de recherche clairement identifiées
+   - Questions non résolues
+   - Justification de l'originalité de votre approche
+""",
+    "chapitre 2 - matériels et terrain": """
+Pour les MATÉRIELS ET TERRAIN (Chapitre 2.1), développez :
+1. Description du terrain/corpus (environ 25 lignes)
+   - Critères de sélection détaillés
+   - Caractéristiques principales (tableau descriptif si pertinent)
+   - Procédures d'accès et considérations éthiques
+
+2. Matériels et outils (environ 20 lignes)
+   - Liste complète avec spécifications techniques
+   - Justification des choix techniques
+   - Conditions d'utilisation et calibration
+
+3. Outils de collecte (environ 15 lignes)
+   - Présentation des instruments utilisés
+   - Procédure de validation/adaptation
+   - Fiabilité et validité des outils
+""",
+    "chapitre 2 - méthodologie": """
+Pour la MÉTHODOLOGIE (Chapitre 2.2), développez :
+1. Design de recherche (environ 20 lignes)
+   - Justification du choix qualitatif/quantitatif/mixte
+   - Schéma de la recherche
+   - Variables étudiées (si applicable)
+
+2. Procédure de collecte (environ 25 lignes)
+   - Déroulement chronologique étape par étape
+   - Conditions expérimentales ou d'observation
+   - Durée et planning de la collecte
+
+3. Méthodes d'analyse (environ 20 lignes)
+   - Techniques statistiques ou d'analyse qualitative
+   - Justification des choix méthodologiques
+   - Procédures de traitement des données
+
+4. Limites méthodologiques (environ 15 lignes)
+   - Biais potentiels identifiés
+   - Contraintes pratiques rencontrées
+   - Stratégies de contrôle mises en place
+""",
+    "chapitre 3 - résultats": """
+Pour les RÉSULTATS (Chapitre 3.1), développez :
+1. Organisation des résultats (environ 15 lignes)
+   - Structure selon les objectifs spécifiques
+   - Logique de présentation
+
+2. Présentation factuelle (environ 30 lignes)
+   - Données brutes organisées clairement
+   - Tableaux et graphiques pertinents avec légendes explicatives
+   - Citations significatives (pour études qualitatives)
+
+3. Neutralité scientifique (environ 10 lignes)
+   - Présentation sans interprétation
+   - Objectivité des données présentées
+""",
+    "chapitre 3 - discussion": """
+Pour la DISCUSSION (Chapitre 3.2), développez :
+1. Interprétation des résultats (environ 25 lignes)
+   - Signification des principaux résultats
+   - Explications possibles des observations
+
+2. Confrontation avec la littérature (environ 30 lignes)
+   - Comparaison avec les études du chapitre 1
+   - Explication des convergences et divergences
+   - Positionnement par rapport au cadre théorique
+
+3. Réponse à la problématique (environ 15 lignes)
+   - Articulation entre résultats et question de recherche
+   - Éléments de réponse apportés
+   - Nouvelles questions soulevées
+""",
+    "conclusion": """
+Pour la CONCLUSION, développez :
+1. Bilan synthétique (environ 20 lignes)
+   - Récapitulation concise de la démarche
+   - Synthèse des principaux résultats
+
+2. Réponse globale (environ 15 lignes)
+   - Formulation claire de la réponse à la problématique
+   - Apports principaux de la recherche
+
+3. Limites de l'étude (environ 15 lignes)
+   - Reconnaissance honnête des limites
+   - Impact potentiel sur les résultats
+
+4. Perspectives (environ 20 lignes)
+   - Pistes de recherche futures concrètes
+   - Recommandations pratiques si applicables
+   - Ouverture sur des questions plus larges
+"""
+}
+
+BRAINSTORMING = """
+BRAINSTORMING ACADÉMIQUE REQUIS :
+Avant de rédiger, effectuez un brainstorming interne pour organiser TOUTES les informations pertinentes.
+Pensez à :
+1. Les concepts clés et leurs interrelations
+2. Les auteurs majeurs et leurs contributions
+3. Les méthodologies alternatives possibles
+4. Les résultats attendus et inattendus
+5. Les implications théoriques et pratiques
+
+EXIGENCES DE RÉDACTION :
+• Chaque sous-point doit faire au minimum 15-20 lignes
+• Style académique rigoureux avec citations appropriées
+• Structure hiérarchique claire (1., 1.1, 1.1.1, etc.)
+• Explications didactiques accessibles à un débutant
+• Éviter les répétitions et les généralités
+• Proposer des exemples concrets et des tableaux synthétiques
+• Inclure une synthèse à la fin de chaque section
+"""
+
+DEFAULT_INSTRUCTION = "Développez la section '{section}' de manière structurée et détaillée."
+
+# Gabarit du prompt : les blocs statiques viennent en tête pour que le préfixe
+# soit identique octet pour octet d'une requête à l'autre (réutilisation du cache
+# KV côté modèle), les parties variables (thème, contexte, historique) ensuite.
+PROMPT_TEMPLATE = """{methodology}
+
+{brainstorming}
+
+INSTRUCTIONS SPÉCIFIQUES POUR CETTE SECTION :
+{instruction}
+
+THÈME DU MÉMOIRE : **{theme}**
+SECTION À RÉDIGER : **{section}**
+CONTEXTE FOURNI : {context}
+
+HISTORIQUE DES SECTIONS DÉJÀ RÉDIGÉES :
+{previous_text}
+
+CONSIGNES FINALES :
+1. Rédigez UNIQUEMENT la section demandée : {section}
+2. Suivez scrupuleusement la méthodologie académique présentée
+3. Structurez avec des titres et sous-titres hiérarchiques
+4. Chaque paragraphe doit être développé et argumenté
+5. Inclure des exemples concrets liés au thème "{theme}"
+6. Terminer par une synthèse des points abordés
+7. Proposer naturellement la section suivante dans le flux logique
+
+COMMENCEZ LA RÉDACTION MAINTENANT :
+"""
+
+# Plan commun produit avant la rédaction parallèle de toutes les sections (/generate-document) ;
+# même préfixe statique que les sections pour profiter du même cache KV.
+OUTLINE_TEMPLATE = """{methodology}
+
+{brainstorming}
+
+THÈME DU MÉMOIRE : **{theme}**
+CONTEXTE FOURNI : {context}
+
+TÂCHE : établir le PLAN DÉTAILLÉ du mémoire, qui servira de trame commune
+à des rédacteurs travaillant en parallèle sur chacune des sections suivantes :
+{sections}
+
+CONSIGNES :
+1. Pour chaque section, donnez les titres et sous-titres hiérarchiques (1., 1.1, 1.1.1)
+2. Résumez en 2 à 3 phrases le contenu attendu de chaque sous-partie
+3. Fixez la problématique, les objectifs, les concepts clés et la méthodologie retenus,
+   pour que toutes les sections restent cohérentes entre elles
+4. Ne rédigez PAS les sections elles-mêmes
+
+PLAN DÉTAILLÉ :
+"""
+
+OUTLINE_HEADER = "PLAN GÉNÉRAL DU MÉMOIRE (commun à toutes les sections) :"
+
+# Révision d'une section existante : le modèle ne renvoie que les paragraphes modifiés (patch JSON),
+# la longueur de la réponse suit l'ampleur de la modification et non celle du chapitre.
+EDIT_TEMPLATE = """Vous révisez une section d'un mémoire académique. Le texte actuel est découpé
+en paragraphes numérotés [P1], [P2], ...
+
+CONSIGNES :
+1. Ne modifiez que les paragraphes concernés par la demande ; ne recopiez JAMAIS un paragraphe inchangé
+2. Répondez UNIQUEMENT par un objet JSON de la forme :
+{{"operations": [
+  {{"op": "replace", "paragraph": 2, "text": "nouveau texte complet du paragraphe 2"}},
+  {{"op": "insert_after", "paragraph": 3, "text": "paragraphe ajouté après le 3 (0 = au début)"}},
+  {{"op": "delete", "paragraph": 5}}
+]}}
+3. Les numéros renvoient toujours au texte actuel ci-dessous, quel que soit l'ordre des opérations
+4. Conservez le style académique, les titres et la cohérence avec le reste de la section
+5. Si aucune modification n'est nécessaire, répondez {{"operations": []}}
+
+THÈME DU MÉMOIRE : **{theme}**
+SECTION : **{section}**
+
+TEXTE ACTUEL :
+{paragraphs}
+
+DEMANDE DE RÉVISION :
+{instruction}
+
+PATCH JSON :
+"""
+
+NO_CONTEXT = "Aucun contexte spécifique fourni."
+FIRST_SECTION = "C'est la première section du mémoire."
+
+
+# -----------------------------------------------------
+#     GABARIT PRÉCOMPILÉ (CHAMPS STATIQUES DÉJÀ INSÉRÉS)
+# -----------------------------------------------------
+class CompiledTemplate:
+    def __init__(self, template: str, **static):
+        # Le gabarit est découpé une fois en morceaux littéraux et champs dynamiques ;
+        # les champs statiques sont fusionnés dans les littéraux dès la compilation.
+        self.literals = []
+        self.fields = []
+        buffer = []
+        for literal, field, _, _ in string.Formatter().parse(template):
+            buffer.append(literal)
+            if field is None:
+                continue
+            if field in static:
+                buffer.append(static[field])
+            else:
+                self.literals.append("".join(buffer))
+                self.fields.append(field)
+                buffer = []
+        self.literals.append("".join(buffer))
+
+    @property
+    def prefix(self) -> str:
+        return self.literals[0]
+
+    def render(self, **values) -> str:
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return "".join(parts)
+
+
+class PromptBuilder:
+    def __init__(self, template: str = PROMPT_TEMPLATE):
+        self.template = template
+        self._templates = {}
+        self._outline = None
+        self._edit = None
+
+    def compile(self):
+        # Tous les gabarits précompilés au démarrage du serveur ; sinon à la première construction
+        for section, instruction in SECTION_INSTRUCTIONS.items():
+            if section not in self._templates:
+                self._templates[section] = self._compile(section, instruction)
+        if self._outline is None:
+            self._outline = CompiledTemplate(OUTLINE_TEMPLATE, methodology=METHODOLOGY, brainstorming=BRAINSTORMING)
+            self._edit = CompiledTemplate(EDIT_TEMPLATE)
+        return self
+
+    def _compile(self, section: str, instruction: str) -> CompiledTemplate:
+        return CompiledTemplate(self.template, methodology=METHODOLOGY, brainstorming=BRAINSTORMING,
+                                instruction=instruction, section=section)
+
+    def template_for(self, section: str) -> CompiledTemplate:
+        compiled = self._templates.get(section)
+        if compiled is None:
+            instruction = SECTION_INSTRUCTIONS.get(section) or DEFAULT_INSTRUCTION.format(section=section)
+            compiled = self._compile(section, instruction)
+            self._templates[section] = compiled
+        return compiled
+
+    def build(self, theme: str, section: str, context: str = "", previous_text: str = "") -> str:
+        return self.template_for(section).render(
+            theme=theme,
+            context=context if context else NO_CONTEXT,
+            previous_text=previous_text if previous_text else FIRST_SECTION,
+        )
+
+    def build_outline(self, theme: str, sections: list, context: str = "") -> str:
+        if self._outline is None:
+            self.compile()
+        return self._outline.render(
+            theme=theme,
+            context=context if context else NO_CONTEXT,
+            sections="\n".join(f"- {section}" for section in sections),
+        )
+
+    def build_edit(self, theme: str, section: str, paragraphs: str, instruction: str) -> str:
+        if self._edit is None:
+            self.compile()
+        return self._edit.render(theme=theme, section=section, paragraphs=paragraphs, instruction=instruction)
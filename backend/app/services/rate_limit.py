@@ -0,0 +1,206 @@
+import asyncio
+import math
+import threading
+import time
+
+from app import config
+from app.database import ConnectionPool
+from app.services.metrics import registry
+
+REJECTED = registry.counter("memory_ai_rate_limited_total", "Requêtes refusées par le contrôle d'admission (429)",
+                            ("scope",))
+
+# Portée des seaux : par utilisateur ou pour tout le service, en requêtes et en tokens estimés
+USER = "user"
+GLOBAL = "global"
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+
+class RateLimitError(Exception):
+    def __init__(self, message: str, retry_after: int, scope: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class BucketLimit:
+    __slots__ = ("scope", "unit", "capacity", "rate")
+
+    def __init__(self, scope: str, unit: str, capacity: float, per_minute: float):
+        self.scope = scope
+        self.unit = unit
+        self.capacity = capacity   # rafale autorisée
+        self.rate = per_minute / 60.0   # remplissage par seconde
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0 and self.rate > 0
+
+
+def refill(tokens: float, updated_at: float, now: float, limit: BucketLimit) -> float:
+    return min(limit.capacity, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+def wait_time(available: float, cost: float, limit: BucketLimit) -> float:
+    # Coût plus grand que la rafale (document complet) : admis une fois le seau plein
+    cost = min(cost, limit.capacity)
+    return 0.0 if available >= cost else (cost - available) / limit.rate
+
+
+# -----------------------------------------------------
+#   ÉTAT DES SEAUX (MÉMOIRE OU SQLITE PARTAGÉ)
+# -----------------------------------------------------
+class BucketStore:
+    # take() est atomique : tous les seaux sont débités, ou aucun (renvoie alors l'attente par seau)
+    # blocking : take() peut attendre un verrou (SQLite partagé), il est alors appelé hors de la boucle d'événements
+    blocking = False
+
+    def take(self, charges: list, now: float) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = {}   # {clé: (jetons, horodatage)}
+        self._lock = threading.Lock()
+
+    def take(self, charges: list, now: float) -> dict:
+        with self._lock:
+            levels = {}
+            waits = {}
+            for key, limit, cost in charges:
+                tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+                levels[key] = refill(tokens, updated_at, now, limit)
+                wait = wait_time(levels[key], cost, limit)
+                if wait > 0:
+                    waits[key] = wait
+            if waits:
+                return waits
+            for key, limit, cost in charges:
+                self._buckets[key] = (levels[key] - min(cost, limit.capacity), now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, max(limit.capacity / limit.rate for _, limit, _ in charges))
+        return {}
+
+    def _prune(self, now: float, longest: float):
+        # Un seau resté assez longtemps sans débit est de nouveau plein : inutile de le garder
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if now - updated_at > longest:
+                del self._buckets[key]
+
+
+class SqlBucketStore(BucketStore):
+    # Plusieurs workers : les seaux (le global surtout) vivent dans SQLite, lus et débités sous BEGIN IMMEDIATE
+    blocking = True
+
+    def __init__(self, path: str, pool_size: int = 2):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+
+    def take(self, charges: list, now: float) -> dict:
+        keys = [key for key, _, _ in charges]
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = dict(
+                    (key, (tokens, updated_at)) for key, tokens, updated_at in conn.execute(
+                        f"SELECT key, tokens, updated_at FROM rate_buckets WHERE key IN ({','.join('?' * len(keys))})",
+                        keys,
+                    )
+                )
+                levels = {}
+                waits = {}
+                for key, limit, cost in charges:
+                    tokens, updated_at = rows.get(key, (limit.capacity, now))
+                    levels[key] = refill(tokens, updated_at, now, limit)
+                    wait = wait_time(levels[key], cost, limit)
+                    if wait > 0:
+                        waits[key] = wait
+                if not waits:
+                    conn.executemany(
+                        "INSERT INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                        [(key, levels[key] - min(cost, limit.capacity), now) for key, limit, cost in charges],
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return waits
+
+    def close(self):
+        self.pool.close()
+
+
+def create_bucket_store(backend: str = None) -> BucketStore:
+    backend = backend or config.RATE_LIMIT_STORE or config.STORAGE_BACKEND
+    if backend == "sqlite":
+        return SqlBucketStore(config.RATE_LIMIT_PATH or config.STORAGE_PATH)
+    return MemoryBucketStore()
+
+
+# -----------------------------------------------------
+#   CONTRÔLE D'ADMISSION (AVANT LA CONSTRUCTION DU PROMPT)
+# -----------------------------------------------------
+class AdmissionController:
+    def __init__(self, store: BucketStore = None, limits: list = None, clock=time.time):
+        self.store = store or create_bucket_store()
+        self.limits = [limit for limit in (limits if limits is not None else default_limits()) if limit.enabled]
+        self.clock = clock
+        self.admitted = 0
+        self.rejected = {USER: 0, GLOBAL: 0}
+
+    async def admit(self, user_id: str, tokens: int):
+        # Une requête coûte 1 dans les seaux « requests » et ses tokens estimés dans les seaux « tokens »
+        charges = []
+        for limit in self.limits:
+            key = f"{limit.scope}:{limit.unit}" + (f":{user_id}" if limit.scope == USER else "")
+            charges.append((key, limit, 1 if limit.unit == REQUESTS else tokens))
+        if not charges:
+            return
+        if self.store.blocking:
+            waits = await asyncio.to_thread(self.store.take, charges, self.clock())
+        else:
+            waits = self.store.take(charges, self.clock())
+        if not waits:
+            self.admitted += 1
+            return
+        key = max(waits, key=waits.get)
+        scope = key.split(":", 1)[0]
+        self.rejected[scope] += 1
+        REJECTED.inc(scope=scope)
+        retry_after = max(1, math.ceil(waits[key]))
+        if scope == USER:
+            message = f"Trop de demandes pour cet utilisateur, réessayez dans {retry_after} s"
+        else:
+            message = f"Service saturé, réessayez dans {retry_after} s"
+        raise RateLimitError(message, retry_after, scope)
+
+    def stats(self) -> dict:
+        return {
+            "admises": self.admitted,
+            "refusees": dict(self.rejected),
+            "limites": [{"portee": limit.scope, "unite": limit.unit, "rafale": limit.capacity,
+                         "par_minute": limit.rate * 60} for limit in self.limits],
+        }
+
+    def close(self):
+        self.store.close()
+
+
+def default_limits() -> list:
+    return [
+        BucketLimit(USER, REQUESTS, config.RATE_USER_REQUESTS_BURST, config.RATE_USER_REQUESTS_PER_MINUTE),
+        BucketLimit(USER, TOKENS, config.RATE_USER_TOKENS_BURST, config.RATE_USER_TOKENS_PER_MINUTE),
+        BucketLimit(GLOBAL, REQUESTS, config.RATE_GLOBAL_REQUESTS_BURST, config.RATE_GLOBAL_REQUESTS_PER_MINUTE),
+        BucketLimit(GLOBAL, TOKENS, config.RATE_GLOBAL_TOKENS_BURST, config.RATE_GLOBAL_TOKENS_PER_MINUTE),
+    ]
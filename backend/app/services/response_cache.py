@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# -----------------------------------------------------
+#     CLÉ DE CACHE : HASH DU PROMPT + MODELE + OPTIONS
+# -----------------------------------------------------
+def make_key(prompt: str, model: str, options: dict) -> str:
+    payload = json.dumps({"prompt": prompt, "model": model, "options": options},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------
+#     NIVEAU DISQUE (SQLITE) : SURVIT AUX REDÉMARRAGES
+# -----------------------------------------------------
+class SqliteResponseStore:
+    def __init__(self, path: str, max_bytes: int, prune_interval: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._last_prune = None
+        self.pruned = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires_at ON response_cache (expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, 0.0
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, time.time(), expires_at),
+            )
+            self._conn.commit()
+        # Nettoyage périodique (entrées expirées, plafond en octets) plutôt qu'à chaque écriture
+        if self._last_prune is None or time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def prune(self) -> int:
+        with self._lock:
+            self._last_prune = time.monotonic()
+            removed = self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            # Au-delà du plafond : les réponses les plus anciennes partent jusqu'à repasser dessous
+            size = "LENGTH(CAST(value AS BLOB)) + LENGTH(key)"
+            excess = self._conn.execute(f"SELECT COALESCE(SUM({size}), 0) FROM response_cache").fetchone()[0] - self.max_bytes
+            if excess > 0:
+                oldest = []
+                for key, entry_size in self._conn.execute(f"SELECT key, {size} FROM response_cache ORDER BY created_at"):
+                    oldest.append((key,))
+                    excess -= entry_size
+                    if excess <= 0:
+                        break
+                self._conn.executemany("DELETE FROM response_cache WHERE key = ?", oldest)
+                removed += len(oldest)
+            self._conn.commit()
+            self.pruned += removed
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+# -----------------------------------------------------
+#     CACHE DES RÉPONSES (LRU + TTL + PLAFOND EN OCTETS)
+# -----------------------------------------------------
+class ResponseCache:
+    # Niveau disque lu et écrit hors de la boucle d'événements (get / set sont des coroutines)
+    def __init__(self, max_bytes: int, ttl: float, disk_path: str = None, disk_max_bytes: int = None,
+                 prune_interval: float = 300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = SqliteResponseStore(disk_path, disk_max_bytes or max_bytes, prune_interval) if disk_path else None
+        self._entries = OrderedDict()   # {key: (value, expires_at, size)}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def _store(self, key: str, value: str, expires_at: float):
+        size = len(value.encode("utf-8")) + len(key)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, expires_at, size)
+        self.size_bytes += size
+        # Éviction LRU jusqu'à repasser sous le plafond
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(key)
+
+        if self.disk is not None:
+            value, expires_at = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                if expires_at >= now:
+                    with self._lock:
+                        self._store(key, value, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return value
+                await asyncio.to_thread(self.disk.delete, key)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+        if self.disk is not None:
+            stats["disk_entries"] = self.disk.count()
+            stats["disk_max_bytes"] = self.disk.max_bytes
+            stats["disk_pruned"] = self.disk.pruned
+            stats["disk_path"] = self.disk.path
+        return stats
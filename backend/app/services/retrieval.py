@@ -0,0 +1,359 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter, OrderedDict
+
+from app import config
+from app.services.ingestion import chunk_paragraphs, iter_paragraphs
+from app.services.text import HashingVectorizer, normalize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STOP_WORDS = frozenset({
+    "le", "la", "les", "un", "une", "des", "de", "du", "d", "l", "et", "ou", "a", "au", "aux", "en", "dans", "par",
+    "pour", "sur", "avec", "sans", "sous", "entre", "ce", "ces", "cet", "cette", "qui", "que", "quoi", "dont", "ne",
+    "pas", "plus", "se", "sa", "son", "ses", "leur", "leurs", "il", "elle", "ils", "elles", "on", "nous", "vous",
+    "est", "sont", "etre", "ete", "avoir", "fait", "comme", "mais", "donc", "si", "y", "the", "of", "and", "to",
+    "in", "is", "for", "on", "with", "chapitre",
+})
+
+# Paramètres BM25 usuels
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+INDEX_FILE = "index.json"
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "offsets.bin"
+VECTORS_FILE = "vectors.npy"
+
+
+def tokenize(text: str) -> list:
+    return [word for word in normalize(text).split() if len(word) > 1 and word not in STOP_WORDS]
+
+
+class Passage:
+    __slots__ = ("text", "document", "page", "score")
+
+    def __init__(self, text: str, document: str, page: int, score: float):
+        self.text = text
+        self.document = document
+        self.page = page
+        self.score = score
+
+
+# -----------------------------------------------------
+#   INDEX D'UN UTILISATEUR (BM25 + VECTEURS OPTIONNELS)
+# -----------------------------------------------------
+class UserIndex:
+    # Sur disque : index.json (documents, postings, longueurs), chunks.bin (textes concaténés, lus par mmap),
+    # offsets.bin (début de chaque passage), vectors.npy (vecteurs denses si NumPy, ouverts en mmap)
+    def __init__(self, directory: str, vectorizer):
+        self.directory = directory
+        self.vectorizer = vectorizer
+        self.documents = []
+        self.postings = {}       # {terme: [[passage, occurrences], ...]}
+        self.lengths = []        # longueur (termes) de chaque passage
+        self.pages = []          # page de début de chaque passage
+        self.owners = []         # document de chaque passage
+        self.offsets = array("Q", [0])
+        self.loaded_mtime = None
+        self._file = None
+        self._texts = None
+        self._vectors = None
+        self.load()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # ---------- lecture ----------
+    def load(self):
+        self.close()
+        index_path = self.path(INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.documents = data["documents"]
+        self.postings = data["postings"]
+        self.lengths = data["lengths"]
+        self.pages = data["pages"]
+        self.owners = data["owners"]
+        # Les octets au-delà du dernier passage validé (ingestion interrompue) sont ignorés
+        offsets = array("Q")
+        with open(self.path(OFFSETS_FILE), "rb") as f:
+            offsets.fromfile(f, len(self.lengths) + 1)
+        self.offsets = offsets
+        self.loaded_mtime = os.path.getmtime(index_path)
+
+    def stale(self) -> bool:
+        # Un autre worker a pu ingérer un document depuis le chargement
+        try:
+            return os.path.getmtime(self.path(INDEX_FILE)) != self.loaded_mtime
+        except OSError:
+            return self.loaded_mtime is not None
+
+    def _open_texts(self):
+        if self._texts is None and self.offsets[-1]:
+            self._file = open(self.path(CHUNKS_FILE), "rb")
+            self._texts = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._texts
+
+    def _open_vectors(self):
+        if self._vectors is None and np is not None and os.path.exists(self.path(VECTORS_FILE)):
+            self._vectors = np.load(self.path(VECTORS_FILE), mmap_mode="r")
+        return self._vectors
+
+    def text(self, chunk_id: int) -> str:
+        texts = self._open_texts()
+        return texts[self.offsets[chunk_id]:self.offsets[chunk_id + 1]].decode("utf-8")
+
+    def close(self):
+        # Fichiers mappés fermés avant toute réécriture (obligatoire sous Windows)
+        if self._texts is not None:
+            self._texts.close()
+            self._file.close()
+        self._texts = self._file = None
+        self._vectors = None
+
+    # ---------- recherche ----------
+    def search(self, query: str, k: int, dense_weight: float) -> list:
+        count = len(self.lengths)
+        terms = tokenize(query)
+        if not count or not terms:
+            return []
+        average = sum(self.lengths) / count
+        scores = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / average)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        vectors = self._open_vectors() if dense_weight > 0 else None
+        if vectors is not None and len(vectors) == count:
+            # Score hybride : BM25 normalisé + similarité cosinus (n-grammes hachés), sur tous les passages
+            dense = np.asarray(vectors @ self._query_vector(query))
+            best = max(scores.values()) if scores else 1.0
+            lexical = np.zeros(count, dtype=np.float32)
+            for chunk_id, score in scores.items():
+                lexical[chunk_id] = score / best
+            combined = (1 - dense_weight) * lexical + dense_weight * dense
+            ranked = [(float(combined[i]), int(i)) for i in np.argsort(-combined)[:k] if combined[i] > 0]
+        else:
+            ranked = sorted(((score, chunk_id) for chunk_id, score in scores.items()), reverse=True)[:k]
+        return [Passage(self.text(chunk_id), self.documents[self.owners[chunk_id]]["name"], self.pages[chunk_id], score)
+                for score, chunk_id in ranked]
+
+    def _query_vector(self, text: str):
+        dense = np.zeros(self.vectorizer.dimensions, dtype=np.float32)
+        vector = self.vectorizer.vectorize(normalize(text))
+        if vector:
+            dense[list(vector)] = list(vector.values())
+        return dense
+
+    # ---------- écriture ----------
+    def add_document(self, name: str, kind: str, path: str, words_per_chunk: int, overlap: int) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        self.close()
+        document_index = len(self.documents)
+        first = len(self.lengths)
+        text_size = self.offsets[-1]
+        new_vectors = []
+        pages = 0
+        try:
+            # Passages écrits au fil de la lecture : seul le passage courant est en mémoire
+            with open(self.path(CHUNKS_FILE), "ab") as chunks, open(self.path(OFFSETS_FILE), "ab") as offsets:
+                chunks.truncate(text_size)
+                offsets.truncate(len(self.offsets) * self.offsets.itemsize)
+                if not len(self.lengths):
+                    self.offsets.tofile(offsets)
+                for page, text in chunk_paragraphs(iter_paragraphs(path, kind), words_per_chunk, overlap):
+                    self._append(chunks, offsets, document_index, page, text)
+                    pages = max(pages, page)
+                    if np is not None:
+                        new_vectors.append(self._query_vector(text))
+        except Exception:
+            # Index rechargé depuis le dernier état validé (les octets écrits en trop sont ignorés)
+            self.reset()
+            self.load()
+            raise
+
+        document = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name,
+            "kind": kind,
+            "pages": pages,
+            "chunks": [first, len(self.lengths)],
+            "created_at": time.time(),
+        }
+        self.documents.append(document)
+        if np is not None:
+            self._save_vectors(first, new_vectors)
+        self._commit()
+        return document
+
+    def _append(self, chunks, offsets, document_index: int, page: int, text: str):
+        chunk_id = len(self.lengths)
+        terms = tokenize(text)
+        for term, frequency in Counter(terms).items():
+            self.postings.setdefault(term, []).append([chunk_id, frequency])
+        self.lengths.append(len(terms))
+        self.pages.append(page)
+        self.owners.append(document_index)
+        encoded = text.encode("utf-8")
+        chunks.write(encoded)
+        self.offsets.append(self.offsets[-1] + len(encoded))
+        array("Q", [self.offsets[-1]]).tofile(offsets)
+
+    def _save_vectors(self, first: int, new_vectors: list):
+        existing = None
+        if os.path.exists(self.path(VECTORS_FILE)):
+            existing = np.load(self.path(VECTORS_FILE))
+        if existing is None or len(existing) != first:
+            # Vecteurs absents ou incomplets (index créé sans NumPy) : recalculés pour tout l'index
+            existing = np.stack([self._query_vector(self.text(i)) for i in range(first)]) if first else None
+            self.close()
+        blocks = [block for block in (existing, np.stack(new_vectors) if new_vectors else None) if block is not None]
+        if blocks:
+            np.save(self.path(VECTORS_FILE), np.concatenate(blocks).astype(np.float32))
+
+    def _commit(self):
+        # index.json écrit en dernier, par remplacement atomique : c'est lui qui valide les passages ajoutés
+        data = {"documents": self.documents, "postings": self.postings, "lengths": self.lengths,
+                "pages": self.pages, "owners": self.owners}
+        temporary = self.path(INDEX_FILE + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary, self.path(INDEX_FILE))
+        self.loaded_mtime = os.path.getmtime(self.path(INDEX_FILE))
+
+    def reset(self):
+        self.close()
+        self.documents, self.postings, self.lengths, self.pages, self.owners = [], {}, [], [], []
+        self.offsets = array("Q", [0])
+        self.loaded_mtime = None
+
+    def remove_document(self, document_id: str) -> bool:
+        if not any(document["id"] == document_id for document in self.documents):
+            return False
+        # Reconstruction à partir des passages conservés (textes relus depuis chunks.bin)
+        kept = [(document, [self.text(i) for i in range(*document["chunks"])], self.pages[slice(*document["chunks"])])
+                for document in self.documents if document["id"] != document_id]
+        self.reset()
+        for name in (CHUNKS_FILE, OFFSETS_FILE, VECTORS_FILE, INDEX_FILE):
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+        for document, texts, pages in kept:
+            first = len(self.lengths)
+            with open(self.path(CHUNKS_FILE), "ab") as chunks, open(self.path(OFFSETS_FILE), "ab") as offsets:
+                if not first:
+                    self.offsets.tofile(offsets)
+                for text, page in zip(texts, pages):
+                    self._append(chunks, offsets, len(self.documents), page, text)
+            self.documents.append({**document, "chunks": [first, len(self.lengths)]})
+            if np is not None:
+                self._save_vectors(first, [self._query_vector(text) for text in texts])
+        self._commit()
+        return True
+
+
+# -----------------------------------------------------
+#   TOUS LES INDEX (UN RÉPERTOIRE PAR UTILISATEUR, LRU)
+# -----------------------------------------------------
+class RetrievalStore:
+    def __init__(self, directory: str = None, max_loaded: int = None, words_per_chunk: int = None,
+                 overlap: int = None, dense_weight: float = None):
+        self.directory = directory or config.RAG_INDEX_DIR
+        self.max_loaded = max_loaded or config.RAG_MAX_LOADED_INDEXES
+        self.words_per_chunk = words_per_chunk or config.RAG_CHUNK_WORDS
+        self.overlap = overlap if overlap is not None else config.RAG_CHUNK_OVERLAP
+        self.dense_weight = (dense_weight if dense_weight is not None else config.RAG_DENSE_WEIGHT) if np is not None else 0.0
+        self.vectorizer = HashingVectorizer()
+        self._indexes = OrderedDict()   # {user_id: UserIndex}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def user_directory(self, user_id: str) -> str:
+        # Nom haché : l'identifiant ne sert jamais de chemin
+        return os.path.join(self.directory, hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16])
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _index(self, user_id: str) -> UserIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+        if index is None:
+            index = UserIndex(self.user_directory(user_id), self.vectorizer)
+            with self._lock:
+                self._indexes[user_id] = index
+                while len(self._indexes) > self.max_loaded:
+                    _, evicted = self._indexes.popitem(last=False)
+                    evicted.close()
+        elif index.stale():
+            index.load()
+        return index
+
+    def has_documents(self, user_id: str) -> bool:
+        return os.path.exists(os.path.join(self.user_directory(user_id), INDEX_FILE))
+
+    def ingest(self, user_id: str, name: str, kind: str, path: str) -> dict:
+        with self._user_lock(user_id):
+            index = self._index(user_id)
+            document = index.add_document(name, kind, path, self.words_per_chunk, self.overlap)
+        return {**document, "chunks": document["chunks"][1] - document["chunks"][0]}
+
+    def remove(self, user_id: str, document_id: str) -> bool:
+        if not self.has_documents(user_id):
+            return False
+        with self._user_lock(user_id):
+            return self._index(user_id).remove_document(document_id)
+
+    def documents(self, user_id: str) -> list:
+        if not self.has_documents(user_id):
+            return []
+        with self._user_lock(user_id):
+            return [{**document, "chunks": document["chunks"][1] - document["chunks"][0]}
+                    for document in self._index(user_id).documents]
+
+    def search(self, user_id: str, query: str, k: int) -> list:
+        # Utilisateur sans document : aucun fichier ouvert, un simple test d'existence
+        if not self.has_documents(user_id):
+            return []
+        with self._user_lock(user_id):
+            return self._index(user_id).search(query, k, self.dense_weight)
+
+    def close(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
+
+
+def format_passages(passages: list, max_tokens: int, tokenizer) -> str:
+    # Passages les mieux classés d'abord, dans la limite du budget de tokens
+    lines = []
+    used = 0
+    for number, passage in enumerate(passages, 1):
+        line = f"[{number}] ({passage.document}, p. {passage.page}) {passage.text}"
+        cost = tokenizer.count(line)
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
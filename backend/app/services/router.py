@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+from app import config
+
+# Estimations de départ avant toute mesure : (latence avant premier token en s, tokens/s)
+DEFAULT_PRIORS = {
+    "groq": (0.5, 400.0),
+    "ollama": (2.0, 15.0),
+}
+
+
+# -----------------------------------------------------
+#     MESURES PAR BACKEND (MOYENNES GLISSANTES EWMA)
+# -----------------------------------------------------
+class BackendStats:
+    def __init__(self, ttft: float, tokens_per_second: float, alpha: float):
+        self.alpha = alpha
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_failure = None   # horloge monotone ; effacé à la réussite suivante
+
+    def _ewma(self, current, value):
+        return value if current is None else (1 - self.alpha) * current + self.alpha * value
+
+    def record_success(self, latency: float, tokens: int, ttft: float = None):
+        self.samples += 1
+        self.last_failure = None
+        self.latency = self._ewma(self.latency, latency)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+        if ttft is not None:
+            self.ttft = self._ewma(self.ttft, ttft)
+        # Sans TTFT mesuré (appel non streamé), la latence initiale est comptée dans le débit : estimation prudente
+        generation = latency - (ttft or 0.0)
+        if tokens > 0 and generation > 0:
+            self.tokens_per_second = self._ewma(self.tokens_per_second, tokens / generation)
+
+    def record_failure(self):
+        self.samples += 1
+        self.last_failure = time.monotonic()
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+
+    def cooldown_left(self, cooldown: float) -> float:
+        if self.last_failure is None:
+            return 0.0
+        return max(0.0, self.last_failure + cooldown - time.monotonic())
+
+    def snapshot(self) -> dict:
+        return {
+            "latence_ewma_s": round(self.latency, 3) if self.latency is not None else None,
+            "ttft_ewma_s": round(self.ttft, 3),
+            "tokens_par_s": round(self.tokens_per_second, 1),
+            "taux_erreur": round(self.error_rate, 3),
+            "mesures": self.samples,
+        }
+
+
+# -----------------------------------------------------
+#   ROUTEUR : BACKEND AU TEMPS DE RÉPONSE ESTIMÉ LE PLUS COURT
+# -----------------------------------------------------
+class AdaptiveRouter:
+    def __init__(self, backends: dict, health, tokenizer, fallback: str, priors: dict = None, alpha: float = None,
+                 cooldown: float = None):
+        # backends : {nom: LLMBackend} ; fallback : backend utilisé quand aucun n'est disponible
+        self.backends = backends
+        self.health = health
+        self.tokenizer = tokenizer
+        self.fallback = fallback
+        alpha = alpha if alpha is not None else config.ROUTER_EWMA_ALPHA
+        self.cooldown = cooldown if cooldown is not None else config.ROUTER_FAILURE_COOLDOWN
+        priors = {**DEFAULT_PRIORS, **(priors or {})}
+        self.stats = {name: BackendStats(*priors.get(name, (1.0, 50.0)), alpha) for name in backends}
+        self.routed = {name: 0 for name in backends}
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def count_tokens(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def expected_time(self, name: str, output_tokens: int) -> float:
+        stats = self.stats[name]
+        backend = self.backends[name]
+        service = stats.ttft + output_tokens / max(stats.tokens_per_second, 0.1)
+        # Requêtes déjà en cours ou en attente : autant de "tours" de créneaux à attendre
+        waves = (backend.in_flight + backend.waiting) // max(backend.max_concurrency, 1)
+        # Un backend qui échoue souvent coûte une nouvelle tentative ailleurs
+        return service * (1 + waves) / max(1.0 - stats.error_rate, 0.05)
+
+    def _within_quota(self, name: str, prompt_tokens: int, output_tokens: int) -> bool:
+        rate_limit = getattr(self.backends[name], "rate_limit", None)
+        if rate_limit is None:
+            return True
+        return rate_limit.allows(prompt_tokens + output_tokens, config.ROUTER_RESERVE_REQUESTS,
+                                 config.ROUTER_RESERVE_TOKENS)
+
+    def rank(self, prompt_tokens: int, output_tokens: int) -> list:
+        # Backends sains et sous quota, du plus rapide (estimé) au plus lent ; un backend qui vient
+        # d'échouer passe derrière les autres sans attendre que son disjoncteur s'ouvre
+        candidates = [name for name in self.backends
+                      if self.health.is_available(name) and self._within_quota(name, prompt_tokens, output_tokens)]
+        return sorted(candidates, key=lambda name: (self.stats[name].cooldown_left(self.cooldown) > 0,
+                                                    self.expected_time(name, output_tokens)))
+
+    def plan(self, prompt: str, output_tokens: int) -> list:
+        # Ordre d'essai : le premier reçoit la requête, les suivants prennent le relais s'il échoue.
+        # rank ne fait que lire l'état des disjoncteurs ; allow_request réserve l'unique essai d'un
+        # disjoncteur half-open, il n'est donc appelé que pour le backend réellement utilisé
+        order = self.rank(self.count_tokens(prompt), output_tokens)
+        while order and not self.acquire(order[0]):
+            order.pop(0)
+        if self.fallback not in order:
+            order.append(self.fallback)
+        self.routed[order[0]] += 1
+        return order
+
+    def acquire(self, name: str) -> bool:
+        # Appelé juste avant d'envoyer la requête (premier choix ou relais) ; le repli passe toujours
+        return name == self.fallback or self.health.allow_request(name)
+
+    def choose(self, prompt: str, output_tokens: int) -> str:
+        return self.plan(prompt, output_tokens)[0]
+
+    def record_success(self, name: str, latency: float, output: str, ttft: float = None):
+        self.stats[name].record_success(latency, self.count_tokens(output), ttft)
+
+    def record_failure(self, name: str):
+        self.stats[name].record_failure()
+
+    def record_failover(self, name: str):
+        self.failovers += 1
+        self.routed[name] += 1
+
+    async def hedge(self, prompt: str, output_tokens: int, calls: dict, delay: float, is_error):
+        # calls : {nom: fabrique de coroutine}. Le meilleur backend part seul ; s'il n'a pas
+        # répondu après `delay`, le suivant est lancé aussi et la première réponse valide gagne.
+        ranking = [name for name in self.rank(self.count_tokens(prompt), output_tokens) if name in calls]
+        primary = self.choose(prompt, output_tokens) if ranking else self.fallback
+        secondary = next((name for name in ranking if name != primary), None)
+
+        tasks = {asyncio.ensure_future(calls[primary]()): primary}
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and secondary is not None and self.acquire(secondary):
+            self.hedged += 1
+            self.routed[secondary] += 1
+            tasks[asyncio.ensure_future(calls[secondary]())] = secondary
+
+        first_result = None
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = f"[Erreur technique] {str(e)}"
+                    if not is_error(result):
+                        if tasks[task] != primary:
+                            self.hedge_wins += 1
+                        return result
+                    if first_result is None:
+                        first_result = result
+            return first_result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            "backends": {
+                name: {
+                    **self.stats[name].snapshot(),
+                    "temps_estime_section_s": round(self.expected_time(name, config.ROUTER_SECTION_TOKENS), 2),
+                    "requetes_routees": self.routed[name],
+                    "en_retrait_s": round(self.stats[name].cooldown_left(self.cooldown), 1),
+                }
+                for name in self.backends
+            },
+            "requetes_couvertes": self.hedged,
+            "gagnees_par_le_second": self.hedge_wins,
+            "replis_apres_echec": self.failovers,
+        }
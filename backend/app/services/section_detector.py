@@ -0,0 +1,144 @@
+import re
+
+# -----------------------------------------------------
+#      PATTERNS DE SECTION (ORDRE = PRIORITÉ)
+# -----------------------------------------------------
+# Patterns détaillés selon la nouvelle méthodologie
+SECTION_PATTERNS = (
+    ("introduction", (
+        r"(?:^|\s)introduction\s+générale?\b",
+        r"commence(?:r|z)?\s+(?:par\s+)?l['']?introduction",
+        r"rédige(?:r|z)?\s+(?:l['']?)?introduction",
+        r"contexte\s+d['']?étude",
+        r"problématique\s+(?:et|ou)\s+objectifs",
+        r"début(?:er)?\s+(?:le\s+)?mémoire",
+        r"1\s*\.?\s*contexte",
+        r"plan\s+du\s+document",
+    )),
+    ("chapitre 1 - cadre théorique", (
+        r"chapitre\s*1\s*[\.\-]?\s*(?:cadre\s+théorique|concepts\s+clés)",
+        r"cadre\s+théorique",
+        r"concepts\s+clés",
+        r"définitions\s+opérationnelles",
+        r"1\.1\s*concepts",
+        r"présentation\s+des\s+concepts",
+    )),
+    ("chapitre 1 - synthèse travaux", (
+        r"chapitre\s*1\s*[\.\-]?\s*(?:synthèse|travaux|état\s+de\s+l['']?art)",
+        r"synthèse\s+des\s+travaux",
+        r"travaux\s+antérieurs",
+        r"travaux\s+récents",
+        r"état\s+de\s+l['']?art",
+        r"revue\s+de\s+la\s+littérature",
+        r"1\.2\s*synthèse",
+        r"cartographie\s+de\s+la\s+recherche",
+    )),
+    ("chapitre 1 - analyse critique", (
+        r"chapitre\s*1\s*[\.\-]?\s*(?:analyse\s+critique|gap)",
+        r"analyse\s+critique",
+        r"discussion\s+critique",
+        r"identification\s+du\s+gap",
+        r"lacune\s+de\s+recherche",
+        r"1\.3\s*analyse",
+        r"critique\s+des\s+travaux",
+    )),
+    ("chapitre 2 - matériels et terrain", (
+        r"chapitre\s*2\s*[\.\-]?\s*(?:matériels|terrain|outils)",
+        r"matériels\s+(?:et|ou)\s+outils",
+        r"description\s+du\s+terrain",
+        r"population\s+(?:d['']?|de\s+)étude",
+        r"corpus\s+d['']?étude",
+        r"2\.1\s*matériels",
+        r"outils\s+de\s+collecte",
+        r"échantillon\s+(?:de\s+)?recherche",
+    )),
+    ("chapitre 2 - méthodologie", (
+        r"chapitre\s*2\s*[\.\-]?\s*(?:méthodologie|méthodes)",
+        r"méthodologie\s+de\s+recherche",
+        r"design\s+de\s+recherche",
+        r"procédure\s+de\s+collecte",
+        r"méthodes\s+d['']?analyse",
+        r"2\.2\s*méthodes",
+        r"protocole\s+de\s+recherche",
+    )),
+    ("chapitre 3 - résultats", (
+        r"chapitre\s*3\s*[\.\-]?\s*(?:résultats|présentation)",
+        r"présentation\s+des\s+résultats",
+        r"résultats\s+obtenus",
+        r"données\s+collectées",
+        r"3\.1\s*résultats",
+        r"faits\s+et\s+chiffres",
+        r"tableaux\s+(?:de\s+)?résultats",
+    )),
+    ("chapitre 3 - discussion", (
+        r"chapitre\s*3\s*[\.\-]?\s*(?:discussion|analyse)",
+        r"discussion\s+des\s+résultats",
+        r"analyse\s+(?:et\s+|des\s+)résultats",
+        r"interprétation\s+des\s+résultats",
+        r"3\.2\s*discussion",
+        r"confrontation\s+avec\s+la\s+littérature",
+    )),
+    ("conclusion", (
+        r"(?:^|\s)conclusion\s+(?:et\s+perspectives)?\b",
+        r"termine(?:r|z)?\s+(?:par\s+)?la\s+conclusion",
+        r"rédige(?:r|z)?\s+(?:la\s+)?conclusion",
+        r"synthèse\s+finale",
+        r"bilan\s+(?:final|général)",
+        r"perspectives\s+(?:de\s+recherche|d['']?avenir)",
+        r"limites\s+de\s+l['']?étude",
+    )),
+)
+
+# Fallback vers les sections génériques (mots-clés, après tous les patterns détaillés)
+FALLBACK_KEYWORDS = (
+    ("introduction", ("début", "commencer", "première", "premier", "contexte", "problématique")),
+    ("chapitre 1 - cadre théorique", ("chapitre 1", "revue littérature", "état art", "littérature")),
+    ("chapitre 2 - matériels et terrain", ("chapitre 2", "méthodologie", "méthodes", "matériel")),
+    ("chapitre 3 - résultats", ("chapitre 3", "résultats", "discussion", "analyse résultats")),
+    ("conclusion", ("fin", "terminer", "dernier", "bilan", "perspectives")),
+)
+
+DEFAULT_SECTION = "introduction"
+
+
+# -----------------------------------------------------
+#   CLASSIFIEUR COMPILÉ UNE SEULE FOIS (AU DÉMARRAGE)
+# -----------------------------------------------------
+class SectionDetector:
+    def __init__(self, patterns=SECTION_PATTERNS, fallbacks=FALLBACK_KEYWORDS, default=DEFAULT_SECTION):
+        self.patterns = patterns
+        self.fallbacks = fallbacks
+        self.default = default
+        self.rules = None
+
+    def compile(self):
+        # Une alternation compilée par règle, dans l'ordre de priorité :
+        # patterns détaillés de chaque section, puis mots-clés de repli.
+        # (Mesuré plus rapide avec le moteur re de CPython qu'une unique regex
+        # à lookahead testant toutes les règles à chaque position.)
+        # Appelé par le démarrage du serveur ; sinon au premier appel (scripts, benchmarks).
+        if self.rules is None:
+            rules = [(section, re.compile("|".join(pattern_list))) for section, pattern_list in self.patterns]
+            rules += [(section, re.compile("|".join(re.escape(word) for word in words)))
+                      for section, words in self.fallbacks]
+            self.rules = rules
+        return self
+
+    def explicit(self, message: str):
+        # Section nommée dans le message, sinon None (pas de section par défaut)
+        rules = self.rules if self.rules is not None else self.compile().rules
+        message_lower = message.lower()
+        for section, regex in rules:
+            if regex.search(message_lower):
+                return section
+        return None
+
+    def detect(self, message: str) -> str:
+        return self.explicit(message) or self.default
+
+
+section_detector = SectionDetector()
+
+
+def detect_section(message: str) -> str:
+    return section_detector.detect(message)
@@ -0,0 +1,88 @@
+import json
+import re
+
+# Demande de révision d'une section déjà rédigée (« corrige l'introduction : ... ») : verbe en tête du message
+EDIT_REQUEST = re.compile(
+    r"^\s*(?:peux-tu\s+|pourrais-tu\s+|merci de\s+|je veux\s+|j'aimerais\s+)?"
+    r"(?:corrig|modifi|révis|revis|reformul|amélior|amelior|retouch|ajust|raccourc|allège|allege)\w*",
+    re.IGNORECASE,
+)
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+JSON_BLOCK = re.compile(r"\{.*\}", re.DOTALL)
+
+OPERATIONS = ("replace", "insert_after", "delete")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def is_edit_request(prompt: str) -> bool:
+    return EDIT_REQUEST.match(prompt) is not None
+
+
+# -----------------------------------------------------
+#     PARAGRAPHES NUMÉROTÉS (RÉFÉRENCES DU PATCH)
+# -----------------------------------------------------
+def split_paragraphs(text: str) -> list:
+    return [paragraph.strip() for paragraph in PARAGRAPH_SPLIT.split(text) if paragraph.strip()]
+
+
+def number_paragraphs(paragraphs: list) -> str:
+    return "\n\n".join(f"[P{index}] {paragraph}" for index, paragraph in enumerate(paragraphs, 1))
+
+
+# -----------------------------------------------------
+#     PATCH JSON : LECTURE ET APPLICATION
+# -----------------------------------------------------
+def parse_patch(output: str) -> list:
+    # Le modèle peut entourer le JSON de texte ou d'un bloc ```json : on garde l'objet le plus large
+    match = JSON_BLOCK.search(output)
+    if match is None:
+        raise PatchError("aucun objet JSON dans la réponse du modèle")
+    try:
+        patch = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise PatchError(f"JSON invalide ({e.msg}, position {e.pos})") from e
+    operations = patch.get("operations") if isinstance(patch, dict) else None
+    if not isinstance(operations, list):
+        raise PatchError("champ 'operations' manquant ou invalide")
+    return operations
+
+
+def apply_patch(paragraphs: list, operations: list) -> list:
+    # Les numéros désignent toujours les paragraphes d'origine : l'ordre des opérations est indifférent
+    replaced = {}
+    deleted = set()
+    inserted = {}   # {numéro: [paragraphes insérés après]}, 0 = avant le premier
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise PatchError(f"opération inconnue : {operation!r}")
+        op = operation["op"]
+        index = operation.get("paragraph")
+        lowest = 0 if op == "insert_after" else 1
+        if not isinstance(index, int) or not lowest <= index <= len(paragraphs):
+            raise PatchError(f"paragraphe hors limites pour {op} : {index!r}")
+        text = operation.get("text")
+        if op != "delete" and (not isinstance(text, str) or not text.strip()):
+            raise PatchError(f"texte manquant pour {op} du paragraphe {index}")
+        if op != "insert_after" and (index in replaced or index in deleted):
+            raise PatchError(f"paragraphe {index} modifié deux fois")
+
+        if op == "replace":
+            replaced[index] = text.strip()
+        elif op == "delete":
+            deleted.add(index)
+        else:
+            inserted.setdefault(index, []).extend(split_paragraphs(text))
+
+    result = list(inserted.get(0, []))
+    for index, paragraph in enumerate(paragraphs, 1):
+        if index not in deleted:
+            result.append(replaced.get(index, paragraph))
+        result.extend(inserted.get(index, []))
+    return result
+
+
+def changed_paragraphs(operations: list) -> list:
+    return sorted({operation["paragraph"] for operation in operations})
@@ -0,0 +1,240 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.services.text import HashingVectorizer, normalize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Messages qui renvoient à la conversation en cours : leur réponse dépend de l'historique, jamais mise en cache
+CONTEXT_WORDS = frozenset({
+    "ca", "cela", "ceci", "celui", "celle", "ceux", "il", "elle", "ils", "elles", "lui", "leur",
+    "precedent", "precedente", "dernier", "derniere", "avant", "dessus", "encore", "continue", "continuer",
+    "suite", "reformule", "reformuler", "resume", "resumer", "developpe", "pourquoi", "plus", "moins",
+    "traduis", "corrige", "explique", "detaille", "exemple", "autre",
+})
+# « ça va » reste une formule de politesse, pas une référence à la conversation
+CONTEXT_FREE_PHRASES = (" ca va ",)
+
+# Seules les formules de politesse peuvent être servies sur une simple ressemblance (« merci bcp » ~ « merci beaucoup ») :
+# ailleurs, un mot changé peut inverser le sens (« je ne suis pas content », « 2+3 », « Suisse » au lieu de « France »)
+SMALL_TALK_WORDS = frozenset({
+    "bonjour", "bonsoir", "salut", "coucou", "hello", "hey", "merci", "beaucoup", "bcp", "mille", "fois",
+    "infiniment", "ca", "va", "comment", "vas", "tu", "allez", "vous", "bien", "et", "toi", "au", "revoir",
+    "bonne", "journee", "soiree", "a", "bientot", "ok", "super", "top", "cool", "genial",
+})
+# Un écart sur ces mots ou sur un nombre change la réponse attendue : jamais un hit approché
+NEGATION_WORDS = frozenset({"ne", "n", "pas", "plus", "jamais", "rien", "aucun", "aucune", "personne", "sans",
+                            "non", "ni"})
+
+DIGITS = re.compile(r"[0-9]+")
+
+
+def is_small_talk(text: str) -> bool:
+    return bool(text) and SMALL_TALK_WORDS.issuperset(text.split())
+
+
+def same_meaning_markers(first: str, second: str) -> bool:
+    # Mêmes nombres et mêmes négations (texte normalisé)
+    if DIGITS.findall(first) != DIGITS.findall(second):
+        return False
+    return NEGATION_WORDS.intersection(first.split()) == NEGATION_WORDS.intersection(second.split())
+
+
+# -----------------------------------------------------
+#   INDEX VECTORIEL (FORCE BRUTE ; NUMPY SI DISPONIBLE)
+# -----------------------------------------------------
+class BruteForceIndex:
+    # Interface add / remove / search : un index ANN peut la reprendre sans toucher au cache
+    name = "brute_force"
+
+    def __init__(self, capacity: int, dimensions: int):
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self._vectors = {}  # {slot: vecteur creux}
+
+    def add(self, slot: int, vector: dict):
+        self._vectors[slot] = vector
+
+    def remove(self, slot: int):
+        self._vectors.pop(slot, None)
+
+    def search(self, vector: dict, slots):
+        # Meilleur candidat parmi `slots` (les entrées d'un seul utilisateur)
+        best_slot, best_score = None, -1.0
+        for slot in slots:
+            candidate = self._vectors[slot]
+            if len(candidate) < len(vector):
+                score = sum(value * vector.get(index, 0.0) for index, value in candidate.items())
+            else:
+                score = sum(value * candidate.get(index, 0.0) for index, value in vector.items())
+            if score > best_score:
+                best_slot, best_score = slot, score
+        return best_slot, best_score
+
+
+class NumpyIndex(BruteForceIndex):
+    # Matrice dense préallouée (capacité x dimensions) : une recherche = un produit matrice-vecteur
+    name = "numpy"
+
+    def __init__(self, capacity: int, dimensions: int):
+        super().__init__(capacity, dimensions)
+        self._matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._used = np.zeros(capacity, dtype=bool)
+
+    def _dense(self, vector: dict):
+        dense = np.zeros(self.dimensions, dtype=np.float32)
+        if vector:
+            dense[list(vector)] = list(vector.values())
+        return dense
+
+    def add(self, slot: int, vector: dict):
+        self._matrix[slot] = self._dense(vector)
+        self._used[slot] = True
+
+    def remove(self, slot: int):
+        self._matrix[slot] = 0.0
+        self._used[slot] = False
+
+    def search(self, vector: dict, slots):
+        if not slots:
+            return None, -1.0
+        rows = np.fromiter(slots, dtype=np.intp, count=len(slots))
+        scores = self._matrix[rows] @ self._dense(vector)
+        best = int(scores.argmax())
+        return int(rows[best]), float(scores[best])
+
+
+def build_index(capacity: int, dimensions: int):
+    return NumpyIndex(capacity, dimensions) if np is not None else BruteForceIndex(capacity, dimensions)
+
+
+# -----------------------------------------------------
+#   CACHE SÉMANTIQUE DES MESSAGES DE CHAT COURTS
+# -----------------------------------------------------
+class SemanticCache:
+    # Entrées propres à chaque utilisateur (la réponse dépend de son historique) ; un message déjà vu
+    # (même texte normalisé) est servi tel quel, un message seulement proche ne l'est que pour les formules de politesse
+    def __init__(self, max_entries: int, threshold: float, ttl: float, max_chars: int, dimensions: int = 1024):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_chars = max_chars
+        self.vectorizer = HashingVectorizer(dimensions)
+        self.index = build_index(max_entries, dimensions)
+        self._entries = OrderedDict()  # {(user_id, texte normalisé): slot}, ordre LRU
+        self._slots = [None] * max_entries  # {slot: ((user_id, texte normalisé), réponse, expiration)}
+        self._small_talk = {}  # {user_id: {slot}} : formules de politesse, seules candidates d'un hit approché
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def cacheable(self, message: str) -> bool:
+        # Seuls les messages courts et autonomes (salutations, remerciements...) sont éligibles
+        text = normalize(message)
+        if not text or len(text) > self.max_chars:
+            return False
+        text = f" {text} "
+        for phrase in CONTEXT_FREE_PHRASES:
+            text = text.replace(phrase, " ")
+        return CONTEXT_WORDS.isdisjoint(text.split())
+
+    def _release(self, key: tuple):
+        slot = self._entries.pop(key)
+        self._slots[slot] = None
+        self.index.remove(slot)
+        self._free.append(slot)
+        user_slots = self._small_talk.get(key[0])
+        if user_slots is not None:
+            user_slots.discard(slot)
+            if not user_slots:
+                del self._small_talk[key[0]]
+
+    def _near(self, user_id: str, text: str):
+        if not is_small_talk(text):
+            return None
+        slots = self._small_talk.get(user_id)
+        if not slots:
+            return None
+        slot, score = self.index.search(self.vectorizer.vectorize(text), slots)
+        if slot is None or score < self.threshold:
+            return None
+        if not same_meaning_markers(text, self._slots[slot][0][1]):
+            return None
+        return slot
+
+    def get(self, user_id: str, message: str):
+        if not self.cacheable(message):
+            with self._lock:
+                self.skipped += 1
+            return None
+        text = normalize(message)
+        now = time.time()
+        with self._lock:
+            slot = self._entries.get((user_id, text))
+            exact = slot is not None
+            if not exact:
+                slot = self._near(user_id, text)
+                if slot is None:
+                    self.misses += 1
+                    return None
+            key, answer, expires_at = self._slots[slot]
+            if expires_at < now:
+                self._release(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.exact_hits += exact
+            return answer
+
+    def set(self, user_id: str, message: str, answer: str):
+        if not answer or not self.cacheable(message):
+            return
+        text = normalize(message)
+        key = (user_id, text)
+        small_talk = is_small_talk(text)
+        vector = self.vectorizer.vectorize(text) if small_talk else {}
+        with self._lock:
+            if key in self._entries:
+                self._release(key)
+            if not self._free:
+                # Éviction LRU : le slot libéré est réutilisé dans l'index
+                self._release(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._slots[slot] = (key, answer, time.time() + self.ttl)
+            self._entries[key] = slot
+            if small_talk:
+                self.index.add(slot, vector)
+                self._small_talk.setdefault(user_id, set()).add(slot)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._release(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                "index": self.index.name,
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
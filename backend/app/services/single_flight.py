@@ -0,0 +1,114 @@
+import asyncio
+
+
+# -----------------------------------------------------
+#     GÉNÉRATION EN COURS PARTAGÉE PAR TOUS SES LECTEURS
+# -----------------------------------------------------
+class Flight:
+    def __init__(self):
+        self.parts = []          # morceaux déjà produits (rejoués aux lecteurs arrivés en retard)
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, part: str):
+        async with self._changed:
+            self.parts.append(part)
+            self._changed.notify_all()
+
+    async def close(self, error: Exception = None):
+        async with self._changed:
+            self.error = error
+            self.done = True
+            self._changed.notify_all()
+
+    async def read(self):
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.parts) > index or self.done)
+                parts = self.parts[index:]
+                done, error = self.done, self.error
+            index += len(parts)
+            for part in parts:
+                yield part
+            if done and index == len(self.parts):
+                if error is not None:
+                    raise error
+                return
+
+
+# -----------------------------------------------------
+#   SINGLE-FLIGHT : UNE SEULE GÉNÉRATION PAR CLÉ EN COURS
+# -----------------------------------------------------
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}       # {clé: Flight}
+        self.started = 0         # générations réellement lancées
+        self.deduplicated = 0    # appels rattachés à une génération déjà en cours
+        self.cancelled = 0       # générations arrêtées faute de lecteur
+
+    def stream(self, key: str, factory):
+        # factory() -> générateur asynchrone de morceaux de texte.
+        # La génération tourne dans sa propre tâche : un lecteur qui se déconnecte n'interrompt pas
+        # les autres ; quand le dernier part (requête, job ou anticipation annulés), elle est arrêtée
+        # et rend son créneau au backend.
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight()
+            self._flights[key] = flight
+            self.started += 1
+            flight.task = asyncio.get_running_loop().create_task(self._pump(key, flight, factory))
+        else:
+            self.deduplicated += 1
+        # Compté dès le rattachement : un lecteur qui n'a pas encore lu garde la génération en vie
+        flight.readers += 1
+        return self._read(key, flight)
+
+    async def run(self, key: str, fn) -> str:
+        # fn() -> coroutine renvoyant le texte complet (appel non streamé)
+        async def once():
+            yield await fn()
+
+        return "".join([part async for part in self.stream(key, once)])
+
+    async def _read(self, key: str, flight: Flight):
+        try:
+            async for part in flight.read():
+                yield part
+        finally:
+            flight.readers -= 1
+            if not flight.readers and not flight.done:
+                # Retirée d'abord : un appel postérieur relance une génération au lieu de lire celle qui s'arrête
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.cancelled += 1
+
+    async def _pump(self, key: str, flight: Flight, factory):
+        error = None
+        try:
+            async for part in factory():
+                await flight.publish(part)
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            # Retiré avant la fin de lecture : un appel postérieur relance (ou lit le cache)
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            await flight.close(error)
+
+    def stats(self) -> dict:
+        total = self.started + self.deduplicated
+        return {
+            "generations_lancees": self.started,
+            "appels_dedupliques": self.deduplicated,
+            "taux_deduplication": round(self.deduplicated / total, 4) if total else 0.0,
+            "generations_annulees": self.cancelled,
+            "en_cours": len(self._flights),
+        }
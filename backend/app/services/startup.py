@@ -0,0 +1,84 @@
+import asyncio
+import inspect
+import time
+
+# États d'une étape de démarrage
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+# -----------------------------------------------------
+#   DÉMARRAGE PAR ÉTAPES (RIEN DE COÛTEUX À L'IMPORT)
+# -----------------------------------------------------
+class StartupStep:
+    __slots__ = ("name", "func", "background", "status", "duration", "error")
+
+    def __init__(self, name: str, func, background: bool):
+        self.name = name
+        self.func = func
+        self.background = background
+        self.status = PENDING
+        self.duration = None
+        self.error = None
+
+    async def run(self):
+        start = time.perf_counter()
+        try:
+            result = self.func()
+            if inspect.isawaitable(result):
+                await result
+            self.status = DONE
+        except Exception as e:
+            # Une étape en échec (Ollama absent...) n'empêche pas de servir : elle est signalée dans /ready
+            self.status = FAILED
+            self.error = f"{type(e).__name__}: {e}"
+        self.duration = time.perf_counter() - start
+
+    def snapshot(self) -> dict:
+        return {
+            "etape": self.name,
+            "status": self.status,
+            "arriere_plan": self.background,
+            "duree_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "erreur": self.error,
+        }
+
+
+class StartupPipeline:
+    def __init__(self):
+        self.steps = []
+        self.started_at = None
+        self.ready_at = None
+        self._task = None
+
+    def add(self, name: str, func, background: bool = False):
+        # background : l'étape tourne après l'ouverture du serveur, /ready attend sa fin
+        self.steps.append(StartupStep(name, func, background))
+
+    async def start(self):
+        self.started_at = time.monotonic()
+        for step in self.steps:
+            if not step.background:
+                await step.run()
+        self._task = asyncio.create_task(self._run_background())
+
+    async def _run_background(self):
+        await asyncio.gather(*(step.run() for step in self.steps if step.background))
+        self.ready_at = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "pret": self.ready,
+            "demarrage_ms": round((self.ready_at - self.started_at) * 1000, 2) if self.ready else None,
+            "etapes": [step.snapshot() for step in self.steps],
+        }
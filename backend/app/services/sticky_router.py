@@ -0,0 +1,151 @@
+import itertools
+import re
+import zlib
+from urllib.parse import parse_qs
+
+import httpx
+
+from app import config
+from app.services.wire import BodyError, decode_body
+
+# Identifiants de jobs préfixés par leur worker (voir job_queue.new_job_id)
+JOB_PATH = re.compile(r"^/(?:jobs|generate-document)/w(\d+)-")
+# Routes qui reçoivent user_id dans le corps (JSON ou MessagePack) plutôt que dans l'URL
+BODY_USER_PATHS = frozenset({"/v2/ask"})
+
+# En-têtes propres à une connexion, jamais recopiés d'un saut à l'autre
+HOP_HEADERS = frozenset({
+    b"connection", b"keep-alive", b"proxy-connection", b"transfer-encoding", b"te", b"trailer", b"upgrade", b"host",
+})
+# Corps de requête relayé octet pour octet : son Content-Length reste valable (plafonds des workers) ;
+# celui de la réponse est recalculé par le serveur du routeur
+RESPONSE_SKIPPED_HEADERS = HOP_HEADERS | {b"content-length"}
+
+
+def user_worker(user_id: str, count: int) -> int:
+    return zlib.crc32(user_id.encode("utf-8")) % count
+
+
+def worker_for(path: str, query_string: bytes, count: int):
+    # Suivi d'un job : le worker qui l'exécute ; sinon le worker de l'utilisateur ; sinon aucun (tourniquet)
+    match = JOB_PATH.match(path)
+    if match:
+        return int(match.group(1)) % count
+    user_ids = parse_qs(query_string.decode("latin-1")).get("user_id")
+    if user_ids:
+        return user_worker(user_ids[0], count)
+    return None
+
+
+def body_user_id(body: bytes, content_type: str):
+    # user_id du corps de /v2/ask ; None si le corps est illisible (le worker renverra l'erreur)
+    try:
+        data = decode_body(body, content_type)
+    except BodyError:
+        return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    return user_id if isinstance(user_id, str) and user_id else None
+
+
+# -----------------------------------------------------
+#   ROUTEUR ASGI DEVANT LES WORKERS (AFFINITÉ PAR UTILISATEUR)
+# -----------------------------------------------------
+class StickyRouter:
+    def __init__(self, upstreams: list):
+        self.upstreams = upstreams
+        self._round_robin = itertools.cycle(range(len(upstreams)))
+        self.client = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        index = worker_for(scope["path"], scope.get("query_string", b""), len(self.upstreams))
+        if index is None and scope["path"] in BODY_USER_PATHS:
+            index, receive = await self._route_by_body(scope, receive)
+        if index is None:
+            index = next(self._round_robin)
+        await self._forward(self.upstreams[index], scope, receive, send)
+
+    async def _route_by_body(self, scope, receive):
+        # Corps lu jusqu'au plafond de /v2/ask pour y trouver user_id, puis rejoué au worker :
+        # au-delà, il est relayé tel quel (le worker répond 413) et part au tourniquet
+        chunks = []
+        size = 0
+        more = True
+        while more and size <= config.ASK_MAX_BODY_BYTES:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        index = None
+        if not more:
+            content_type = dict(scope["headers"]).get(b"content-type", b"").decode("latin-1")
+            user_id = body_user_id(body, content_type)
+            if user_id is not None:
+                index = user_worker(user_id, len(self.upstreams))
+        replayed = [{"type": "http.request", "body": body, "more_body": more}]
+
+        async def replay():
+            return replayed.pop() if replayed else await receive()
+
+        return index, replay
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Pas de délai de lecture : les réponses en streaming peuvent durer plusieurs minutes
+                self.client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None),
+                                                limits=httpx.Limits(max_connections=None, max_keepalive_connections=100))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _relay_body(self, receive, first: bytes):
+        # Corps transmis au worker au fil de sa réception : un dépôt de document ne passe jamais
+        # en entier par la mémoire du routeur, et les plafonds du worker s'appliquent dès le premier bloc
+        if first:
+            yield first
+        while True:
+            message = await receive()
+            if message.get("body"):
+                yield message["body"]
+            if not message.get("more_body"):
+                return
+
+    async def _forward(self, upstream: str, scope, receive, send):
+        message = await receive()
+        first = message.get("body", b"")
+        # Corps en un seul message (GET, petit JSON) : envoyé tel quel ; sinon relayé par blocs
+        body = self._relay_body(receive, first) if message.get("more_body") else first
+        headers = [(name, value) for name, value in scope["headers"] if name not in HOP_HEADERS]
+        request = self.client.build_request(
+            scope["method"], httpx.URL(upstream + scope["path"], query=scope.get("query_string", b"")),
+            headers=headers, content=body,
+        )
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.TransportError as e:
+            detail = f'{{"detail": "[PROXY ERROR] Worker {upstream} indisponible : {type(e).__name__}"}}'.encode()
+            await send({"type": "http.response.start", "status": 502,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": detail})
+            return
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [(name, value) for name, value in response.headers.raw
+                            if name.lower() not in RESPONSE_SKIPPED_HEADERS],
+            })
+            # Octets relayés tels quels, au fil de l'eau (NDJSON des routes /stream et /events)
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
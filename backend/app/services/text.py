@@ -0,0 +1,45 @@
+import math
+import re
+import unicodedata
+import zlib
+
+# -----------------------------------------------------
+#   NORMALISATION DU TEXTE (CACHE, THÈMES, RECHERCHE)
+# -----------------------------------------------------
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    # Minuscules, sans accents ni ponctuation : « Comment ça va ? » == « comment ca va »
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(WORD_PATTERN.findall(text))
+
+
+# -----------------------------------------------------
+#   VECTORISATION : N-GRAMMES DE CARACTÈRES HACHÉS
+# -----------------------------------------------------
+class HashingVectorizer:
+    # Aucun modèle à charger : trigrammes de caractères + mots, hachés dans `dimensions` cases, norme L2
+    def __init__(self, dimensions: int = 1024, ngram: int = 3):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def features(self, text: str) -> list:
+        features = [f"w:{word}" for word in text.split()]
+        padded = f" {text} "
+        features += [padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)]
+        return features
+
+    def vectorize(self, text: str) -> dict:
+        vector = {}
+        for feature in self.features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            index = digest % self.dimensions
+            # Bit de signe indépendant de l'index : les collisions s'annulent en moyenne
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[index] = vector.get(index, 0.0) + sign
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return {}
+        return {index: value / norm for index, value in vector.items()}
@@ -0,0 +1,179 @@
+import re
+import threading
+from collections import OrderedDict
+
+from app import config
+from app.services.text import normalize
+
+# -----------------------------------------------------
+#      PATTERNS DE THÈME (ORDRE = PRIORITÉ)
+# -----------------------------------------------------
+THEME_PATTERNS = (
+    r"(?:thème|sujet|titre|sur)\s*(?:est|:|-)\s*\"?([^\"]+?)\"?\s*(?:\.|$|pour)",
+    r"rédiger\s+(?:un|une|le|la)?\s*(?:mémoire|rapport|thèse)\s+(?:sur|au sujet de|titré)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
+    r"mémoire\s+(?:sur|intitulé)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
+    r"(?:je\s+veux|je\s+dois|j['']aimerais)\s+rédiger\s+(?:un|une)\s*(?:mémoire|rapport)\s+(?:sur|au sujet de)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
+)
+
+# Repli : premiers mots hors de cette liste (comparaison en minuscules, ponctuation comprise)
+STOP_WORDS = frozenset({
+    "je", "tu", "il", "elle", "nous", "vous", "ils", "elles", "le", "la", "les",
+    "un", "une", "des", "de", "du", "à", "au", "pour", "sur", "avec", "sans", "dans",
+    "par", "est", "sont", "ai", "as", "a", "avons", "avez", "ont", "veux", "dois", "peux",
+})
+
+# Mots sans rapport avec le sujet (consignes, structure du mémoire) : ignorés pour comparer deux thèmes
+INSTRUCTION_WORDS = frozenset({
+    "le", "la", "les", "l", "un", "une", "des", "de", "du", "d", "a", "au", "aux", "et", "ou", "en", "sur", "pour",
+    "dans", "par", "avec", "je", "tu", "il", "nous", "vous", "me", "moi", "mon", "ma", "mes", "ton", "ta", "tes",
+    "son", "sa", "ses", "notre", "votre", "ce", "cet", "cette", "ces", "qui", "que", "est", "sont", "veux", "dois",
+    "peux", "peut", "pourrais", "aimerais", "voudrais", "stp", "svp", "merci", "maintenant", "ensuite", "suite",
+    "redige", "rediger", "redigez", "ecris", "ecrire", "ecrivez", "fais", "faire", "genere", "generer", "continue",
+    "continuer", "commence", "commencer", "passe", "passer", "propose", "proposer", "donne", "donner", "aide",
+    "aider", "memoire", "rapport", "these", "theme", "sujet", "titre", "section", "sections", "partie", "chapitre",
+    "1", "2", "3", "generale", "general", "plan", "premiere", "prochaine", "suivante", "intitule", "traitant",
+})
+
+# Mots qui signalent une consigne sur le document en cours plutôt qu'un nouveau sujet,
+# complétés par les mots des noms de sections
+DOCUMENT_WORDS = frozenset({
+    "redige", "rediger", "redigez", "ecris", "ecrire", "ecrivez", "continue", "continuer", "commence", "commencer",
+    "passe", "passer", "genere", "generer", "section", "partie", "chapitre", "memoire",
+})
+
+UNSPECIFIED = "Thème non spécifié"
+QUOTES = re.compile(r"^['\"]|['\"]$")
+
+
+# -----------------------------------------------------
+#   EXTRACTION COMPILÉE (MÊMES SORTIES QUE L'ORIGINAL)
+# -----------------------------------------------------
+class ThemeExtractor:
+    def __init__(self, patterns=THEME_PATTERNS, stop_words=STOP_WORDS):
+        self.patterns = patterns
+        self.stop_words = stop_words
+        self.rules = None
+
+    def compile(self):
+        # Appelé par le démarrage du serveur ; sinon au premier appel (scripts, benchmarks)
+        if self.rules is None:
+            self.rules = [re.compile(pattern, re.IGNORECASE) for pattern in self.patterns]
+        return self
+
+    def explicit(self, message: str):
+        # Thème énoncé par l'utilisateur (« mémoire sur ... », « sujet : ... »), sinon None
+        rules = self.rules if self.rules is not None else self.compile().rules
+        message_lower = message.lower()
+        for regex in rules:
+            match = regex.search(message_lower)
+            if match:
+                theme = QUOTES.sub("", match.group(1).strip())
+                if len(theme.split()) <= 15:
+                    return theme.capitalize()
+        return None
+
+    def fallback(self, message: str) -> str:
+        important_words = [word for word in message.split() if word.lower() not in self.stop_words]
+        if len(important_words) >= 2:
+            return " ".join(important_words[:5])
+        return UNSPECIFIED
+
+    def extract(self, message: str) -> str:
+        return self.explicit(message) or self.fallback(message)
+
+
+# -----------------------------------------------------
+#   IDENTITÉ DES THÈMES PAR UTILISATEUR (CORRESPONDANCE FLOUE)
+# -----------------------------------------------------
+def similarity(a: frozenset, b: frozenset) -> float:
+    # Similarité d'ensembles de mots : part commune rapportée au plus petit (un thème reformulé plus court
+    # ou plus long reste le même) pondérée par Jaccard (deux mots communs sur dix ne suffisent pas)
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return (common / min(len(a), len(b)) + common / len(a | b)) / 2
+
+
+class ThemeResolver:
+    def __init__(self, extractor: ThemeExtractor = None, sections=(), threshold: float = None,
+                 max_themes: int = None, max_users: int = None):
+        self.extractor = extractor or ThemeExtractor()
+        section_words = frozenset(word for section in sections for word in normalize(section).split() if len(word) > 2)
+        self.section_words = section_words - INSTRUCTION_WORDS - {"des", "les", "et"}
+        self.document_words = DOCUMENT_WORDS | self.section_words
+        self.threshold = threshold if threshold is not None else config.THEME_MATCH_THRESHOLD
+        self.max_themes = max_themes or config.THEME_INDEX_MAX_PER_USER
+        self.max_users = max_users or config.THEME_INDEX_MAX_USERS
+        self._users = OrderedDict()   # {user_id: OrderedDict({clé: (thème, mots)})}, ordre LRU
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self):
+        self.extractor.compile()
+        return self
+
+    def words(self, theme: str, sections: bool = False) -> frozenset:
+        # Mots du sujet, sans accents, casse, ponctuation ni consignes (ni noms de sections pour un repli)
+        ignored = INSTRUCTION_WORDS | self.section_words if sections else INSTRUCTION_WORDS
+        return frozenset(word for word in normalize(theme).split() if word not in ignored)
+
+    def remember(self, user_id: str, theme: str):
+        words = self.words(theme)
+        if not words:
+            return
+        key = " ".join(sorted(words))
+        with self._lock:
+            themes = self._users.setdefault(user_id, OrderedDict())
+            self._users.move_to_end(user_id)
+            themes[key] = (theme, words)
+            themes.move_to_end(key)
+            while len(themes) > self.max_themes:
+                themes.popitem(last=False)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def match(self, user_id: str, words: frozenset):
+        with self._lock:
+            themes = self._users.get(user_id)
+            if not themes or not words:
+                return None
+            best, best_score = None, 0.0
+            for theme, known in themes.values():
+                score = similarity(words, known)
+                if score > best_score:
+                    best, best_score = theme, score
+        return best if best_score >= self.threshold else None
+
+    def resolve(self, user_id: str, message: str, current: str = None) -> str:
+        # Thème du message ramené, si possible, à un thème déjà utilisé par cet utilisateur :
+        # « Rédige la conclusion » ou « l'introduction sur X » gardent le thème en cours (sections, caches)
+        if current:
+            self.remember(user_id, current)
+        explicit = self.extractor.explicit(message)
+        candidate = explicit or self.extractor.fallback(message)
+        words = self.words(candidate, sections=explicit is None) if candidate != UNSPECIFIED else frozenset()
+        known = self.match(user_id, words)
+        if known is None and explicit is None and current:
+            # Pas de sujet énoncé : une consigne sur le document (ou un message sans mot de sujet) continue le thème en cours
+            if not words or not self.document_words.isdisjoint(normalize(message).split()):
+                known = current
+        if known is not None:
+            self.hits += 1
+            return known
+        self.misses += 1
+        self.remember(user_id, candidate)
+        return candidate
+
+    def stats(self) -> dict:
+        with self._lock:
+            users = len(self._users)
+            themes = sum(len(themes) for themes in self._users.values())
+        return {"utilisateurs": users, "themes": themes, "rattaches": self.hits, "nouveaux": self.misses}
+
+
+theme_extractor = ThemeExtractor()
+
+
+def extract_theme(message: str) -> str:
+    return theme_extractor.extract(message)
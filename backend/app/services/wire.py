@@ -0,0 +1,118 @@
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = ("application/msgpack", "application/x-msgpack")
+
+
+class BodyError(Exception):
+    # Corps de requête refusé : status HTTP à renvoyer (413 trop gros, 415 format, 400 illisible)
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# -----------------------------------------------------
+#   LECTURE DU CORPS (PAR BLOCS, TAILLE PLAFONNÉE)
+# -----------------------------------------------------
+async def read_body(request, max_bytes: int) -> bytes:
+    # Content-Length annoncé trop grand : refus avant de lire quoi que ce soit
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise BodyError(413, f"Corps de requête trop volumineux (max {max_bytes} octets)")
+    # Transfert « chunked » sans longueur annoncée : le plafond est vérifié bloc par bloc
+    blocks = []
+    size = 0
+    async for block in request.stream():
+        size += len(block)
+        if size > max_bytes:
+            raise BodyError(413, f"Corps de requête trop volumineux (max {max_bytes} octets)")
+        blocks.append(block)
+    return b"".join(blocks)
+
+
+def decode_body(body: bytes, content_type: str):
+    media_type = (content_type or JSON).split(";")[0].strip().lower()
+    if media_type in MSGPACK:
+        if msgpack is None:
+            raise BodyError(415, "MessagePack indisponible : installez msgpack (pip install msgpack)")
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise BodyError(400, f"MessagePack invalide : {e}") from e
+    if media_type != JSON:
+        raise BodyError(415, f"Type de contenu non accepté : {media_type} (application/json ou application/msgpack)")
+    try:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError as e:
+        raise BodyError(400, f"JSON invalide : {e}") from e
+
+
+# -----------------------------------------------------
+#   SÉRIALISATION ET COMPRESSION DE LA RÉPONSE
+# -----------------------------------------------------
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def accepted_encodings(header: str) -> dict:
+    # {"gzip": 1.0, "br": 0.8, ...} d'après Accept-Encoding (q=0 : refusé)
+    encodings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(header: str):
+    encodings = accepted_encodings(header)
+    available = (["br"] if brotli is not None else []) + ["gzip"]
+    candidates = [(encodings.get(name, encodings.get("*", 0.0)), -rank, name) for rank, name in enumerate(available)]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 : même corps compressé à l'identique (ETag et caches intermédiaires stables)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def encode_response(data, accept_encoding: str, min_bytes: int, gzip_level: int, brotli_quality: int):
+    # Renvoie (corps, en-têtes) ; les petites réponses partent non compressées (gain nul, coût CPU)
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(accept_encoding) if len(body) >= min_bytes else None
+    if encoding is not None:
+        body = compress(body, encoding, gzip_level, brotli_quality)
+        headers["Content-Encoding"] = encoding
+    return body, headers
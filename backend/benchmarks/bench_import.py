@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.results import compare, percentiles, save_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans un processus neuf à chaque tour : import de l'application puis démarrage (lifespan)
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.models.fastAPI as api
+imported = time.perf_counter()
+lazy = {name: name in sys.modules for name in ("groq", "ollama", "requests")}
+
+async def boot():
+    async with api.app.router.lifespan_context(api.app):
+        started = time.perf_counter()
+        while not api.startup.ready:
+            await asyncio.sleep(0.001)
+        return started, time.perf_counter()
+
+started, ready = asyncio.run(boot())
+print(json.dumps({"import_s": imported - start, "startup_s": started - imported, "ready_s": ready - imported,
+                  "loaded_at_import": lazy}))
+"""
+
+
+# -----------------------------------------------------
+#   TEMPS D'IMPORT ET DE DÉMARRAGE (PROCESSUS NEUFS)
+# -----------------------------------------------------
+def child_env() -> dict:
+    # Pas de réseau pendant la mesure : ni préchargement Ollama ni clé Groq
+    return {**os.environ, "OLLAMA_WARMUP": "0", "STORAGE_BACKEND": "memory", "GROQ_API_KEY": "bench"}
+
+
+def run_child() -> dict:
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=child_env(),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(limit: int) -> list:
+    # Modules les plus coûteux (temps cumulé, µs) d'après python -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.models.fastAPI"],
+                            cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps d'import et de démarrage de l'API")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="modules les plus coûteux affichés")
+    parser.add_argument("--compare", help="fichier JSON d'une exécution précédente")
+    parser.add_argument("--output", help="chemin du fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    # Un premier tour non mesuré : fichiers .pyc à jour, cache disque chaud
+    run_child()
+    samples = [run_child() for _ in range(args.rounds)]
+    metrics = {}
+    for key in ("import_s", "startup_s", "ready_s"):
+        stats = percentiles([sample[key] for sample in samples])
+        metrics[key] = {name: value for name, value in stats.items() if name != "count"}
+        print(f"{key:<10} p50 {stats['p50'] * 1000:8.1f} ms | p95 {stats['p95'] * 1000:8.1f} ms | "
+              f"max {stats['max'] * 1000:8.1f} ms")
+
+    loaded = samples[-1]["loaded_at_import"]
+    eager = [name for name, present in loaded.items() if present]
+    print("Dépendances chargées dès l'import :", ", ".join(eager) if eager else "aucune (groq, ollama, requests différés)")
+
+    profile = import_profile(args.top)
+    print(f"\n{'cumulé (ms)':>12} {'propre (ms)':>12}  module")
+    for cumulative_us, self_us, name in profile:
+        print(f"{cumulative_us / 1000:12.1f} {self_us / 1000:12.1f}  {name}")
+
+    results = {"config": {"rounds": args.rounds}, "metrics": metrics, "loaded_at_import": loaded,
+               "import_profile": [{"module": name.strip(), "cumulative_us": cumulative_us, "self_us": self_us}
+                                  for cumulative_us, self_us, name in profile]}
+    path = save_results("import", results, args.output)
+    print(f"Résultats : {path}")
+    if args.compare:
+        compare(args.compare, results)
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
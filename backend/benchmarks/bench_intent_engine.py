@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import timeit
+
+from app.services.intent_engine import IntentEngine, detect_intention, intent_engine
+from benchmarks.legacy import legacy_detect_intention
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "intention_detection.json")
+
+
+# -----------------------------------------------------
+#   VÉRIFICATION : SORTIES IDENTIQUES À L'ORIGINAL
+# -----------------------------------------------------
+def check_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    mismatches = []
+    for case in cases:
+        detected = detect_intention(case["prompt"])
+        if detected != case["intention"]:
+            mismatches.append({"prompt": case["prompt"], "attendu": case["intention"], "obtenu": detected})
+    return cases, mismatches
+
+
+# -----------------------------------------------------
+#   MICRO-BENCHMARK : ORIGINAL VS AUTOMATE AHO-CORASICK
+# -----------------------------------------------------
+def time_per_call(func, prompts: list, number: int) -> float:
+    total = timeit.timeit(lambda: [func(p) for p in prompts], number=number)
+    return total / (number * len(prompts)) * 1e6
+
+
+def main(number: int = 200):
+    cases, mismatches = check_golden()
+    print(f"Golden : {len(cases) - len(mismatches)}/{len(cases)} sorties identiques")
+    for mismatch in mismatches:
+        print(f"  ÉCART {mismatch}")
+
+    intent_engine.compile()
+    prompts = [case["prompt"] for case in cases]
+    long_prompts = [p * 20 for p in prompts if p]
+    for label, sample in (("prompts courts", prompts), ("prompts longs (x20)", long_prompts)):
+        legacy = time_per_call(legacy_detect_intention, sample, number)
+        engine = time_per_call(detect_intention, sample, number)
+        print(f"{label:<22} original {legacy:8.1f} µs/appel | automate {engine:8.1f} µs/appel | x{legacy / engine:.1f}")
+
+    # Croissance du vocabulaire : l'automate reste proportionnel à la longueur du message,
+    # alors qu'une recherche de sous-chaîne par terme croît avec la taille du vocabulaire
+    sample = prompts[:40]
+    for size in (50, 500, 5000):
+        vocabulary = tuple(f"terme{i} spécialisé" for i in range(size))
+        # Automate construit hors mesure, comme au démarrage du serveur
+        engine = IntentEngine(keywords=vocabulary).compile()
+        scan = time_per_call(lambda p: sum(1 for k in vocabulary if k in p.lower()), sample, number // 4 or 1)
+        automaton = time_per_call(lambda p: engine.analyze(p).intention, sample, number // 4 or 1)
+        print(f"vocabulaire {size:>5} termes : sous-chaînes {scan:8.1f} µs/appel | automate {automaton:8.1f} µs/appel")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
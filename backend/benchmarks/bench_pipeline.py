@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from app.models.fastAPI import build_prompt, detect_intention, detect_section, extract_theme, get_exemples, store_section
+from benchmarks.results import compare, percentiles, save_results
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+THEME = "L'impact des réseaux sociaux sur les adolescents"
+SECTION_TEXT = "Paragraphe rédigé avec citations, exemples et tableaux de synthèse. " * 200
+
+
+def load_prompts() -> list:
+    # Prompts de /exemples + cas des fichiers golden : mélange court / long, chat / mémoire
+    prompts = [prompt for group in get_exemples().values() for prompt in group]
+    for name in ("section_detection.json", "intention_detection.json"):
+        with open(os.path.join(GOLDEN_DIR, name), encoding="utf-8") as f:
+            prompts += [case["prompt"] for case in json.load(f)["cases"]]
+    return [prompt for prompt in prompts if prompt]
+
+
+# -----------------------------------------------------
+#   MICRO-BENCHMARK : TEMPS PAR APPEL (µs, PERCENTILES)
+# -----------------------------------------------------
+def measure(func, inputs: list, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        for value in inputs:
+            start = time.perf_counter_ns()
+            func(value)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    return percentiles(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks du pipeline de /ask")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--compare", help="fichier JSON d'une exécution précédente")
+    parser.add_argument("--output", help="chemin du fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    prompts = load_prompts()
+    # Historique réaliste pour build_prompt : toutes les sections sauf la dernière déjà rédigées
+    sections = ["introduction", "chapitre 1 - cadre théorique", "chapitre 1 - synthèse travaux",
+                "chapitre 1 - analyse critique", "chapitre 2 - matériels et terrain"]
+    for section in sections:
+        asyncio.run(store_section(THEME, section, SECTION_TEXT))
+
+    functions = {
+        "detect_intention": (detect_intention, prompts),
+        "detect_section": (detect_section, prompts),
+        "extract_theme": (extract_theme, prompts),
+        "build_prompt": (lambda section: build_prompt(THEME, section, "Étude menée auprès de 200 lycéens."),
+                         sections + ["chapitre 2 - méthodologie", "conclusion"]),
+    }
+    metrics = {}
+    print(f"{len(prompts)} prompts, {args.rounds} tours")
+    for name, (func, inputs) in functions.items():
+        stats = measure(func, inputs, args.rounds)
+        metrics[name] = {key: value for key, value in stats.items() if key != "count"}
+        print(f"{name:<18} p50 {stats['p50']:9.1f} µs | p95 {stats['p95']:9.1f} µs | p99 {stats['p99']:9.1f} µs")
+
+    results = {"config": {"rounds": args.rounds, "prompts": len(prompts)}, "metrics": {"us_per_call": metrics}}
+    path = save_results("pipeline", results, args.output)
+    print(f"Résultats : {path}")
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
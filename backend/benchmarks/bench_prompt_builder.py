@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import tracemalloc
+
+from app.services.context_window import ContextWindow
+from app.services.prompt_templates import PromptBuilder, SECTION_INSTRUCTIONS
+from benchmarks.legacy import legacy_build_prompt
+
+SECTIONS = list(SECTION_INSTRUCTIONS)
+THEME = "L'impact des réseaux sociaux sur les adolescents"
+CONTEXT = "Étude menée auprès de 200 lycéens en 2024."
+# Taille approximative d'une section déjà rédigée (4000 tokens ≈ 16 Ko)
+SECTION_BYTES = int(os.getenv("BENCH_SECTION_BYTES", "16000"))
+
+
+def fake_section(name: str) -> str:
+    paragraph = f"Paragraphe de la section {name} avec citations et exemples. "
+    return (paragraph * (SECTION_BYTES // len(paragraph) + 1))[:SECTION_BYTES]
+
+
+# -----------------------------------------------------
+#   MESURES : TEMPS ET OCTETS ALLOUÉS PAR APPEL
+# -----------------------------------------------------
+def measure(func, number: int):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    elapsed = (time.perf_counter() - start) / number * 1e6
+
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(20):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return elapsed, allocated / 20
+
+
+def main(number: int = 300):
+    storage = {THEME: {}}
+    builder = PromptBuilder()
+    # Budget illimité : même historique que l'original, pour comparer à contenu égal
+    digest = ContextWindow(budget=0)
+    for name in SECTIONS[:-1]:
+        text = fake_section(name)
+        storage[THEME][name] = text
+        digest.update(THEME, name, text)
+    section = SECTIONS[-1]
+
+    legacy = lambda: legacy_build_prompt(storage, THEME, section, CONTEXT)
+    compiled = lambda: builder.build(THEME, section, CONTEXT, digest.get(THEME))
+
+    # Mêmes lignes de contenu, seul l'ordre des blocs change (blocs statiques en tête)
+    same_content = sorted(filter(None, legacy().splitlines())) == sorted(filter(None, compiled().splitlines()))
+    print(f"Contenu identique (lignes, ordre mis à part) : {same_content}")
+    print(f"Historique : {len(SECTIONS) - 1} sections de {SECTION_BYTES} octets")
+
+    for label, func in (("original", legacy), ("précompilé", compiled)):
+        elapsed, allocated = measure(func, number)
+        print(f"{label:<12} {elapsed:9.1f} µs/appel | {allocated / 1024:8.1f} Ko alloués/appel | prompt {len(func()) / 1024:.1f} Ko")
+
+    prompts = [builder.build(theme, name, CONTEXT, "") for theme in (THEME, "Autre thème") for name in SECTIONS]
+    prefix = os.path.commonprefix(prompts)
+    print(f"Préfixe commun à toutes les sections et thèmes : {len(prefix.encode('utf-8'))} octets")
+
+    # Taille du prompt au fil du document : linéaire sans budget, plate avec budget
+    unlimited = ContextWindow(budget=0)
+    budgeted = ContextWindow()
+    tokenizer = budgeted.tokenizer
+    print(f"Tokens de prompt par section (budget historique {budgeted.budget} tokens) :")
+    for index, name in enumerate(SECTIONS):
+        full = tokenizer.count(builder.build(THEME, name, CONTEXT, unlimited.get(THEME)))
+        fitted = tokenizer.count(builder.build(THEME, name, CONTEXT, budgeted.get(THEME)))
+        print(f"  {index + 1}. {name:<36} sans budget {full:7d} | avec budget {fitted:6d}")
+        text = fake_section(name)
+        unlimited.update(THEME, name, text)
+        budgeted.update(THEME, name, text)
+    return 0 if same_content else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+import timeit
+
+from app.services.section_detector import detect_section
+from benchmarks.legacy import legacy_detect_section
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "section_detection.json")
+
+
+# -----------------------------------------------------
+#   VÉRIFICATION : SORTIES IDENTIQUES À L'ORIGINAL
+# -----------------------------------------------------
+def check_golden() -> list:
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    mismatches = []
+    for case in cases:
+        detected = detect_section(case["prompt"])
+        if detected != case["section"]:
+            mismatches.append({"prompt": case["prompt"], "attendu": case["section"], "obtenu": detected})
+    return cases, mismatches
+
+
+# -----------------------------------------------------
+#   MICRO-BENCHMARK : ORIGINAL VS CLASSIFIEUR COMPILÉ
+# -----------------------------------------------------
+def time_per_call(func, prompts: list, number: int) -> float:
+    total = timeit.timeit(lambda: [func(p) for p in prompts], number=number)
+    return total / (number * len(prompts)) * 1e6
+
+
+def main(number: int = 200):
+    cases, mismatches = check_golden()
+    print(f"Golden : {len(cases) - len(mismatches)}/{len(cases)} sorties identiques")
+    for mismatch in mismatches:
+        print(f"  ÉCART {mismatch}")
+
+    prompts = [case["prompt"] for case in cases]
+    long_prompts = [p * 20 for p in prompts if p]
+    for label, sample in (("prompts courts", prompts), ("prompts longs (x20)", long_prompts)):
+        legacy = time_per_call(legacy_detect_section, sample, number)
+        compiled = time_per_call(detect_section, sample, number)
+        print(f"{label:<22} original {legacy:8.1f} µs/appel | compilé {compiled:8.1f} µs/appel | x{legacy / compiled:.1f}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
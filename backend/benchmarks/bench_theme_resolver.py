@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+import timeit
+
+from app.services.theme_resolver import ThemeResolver, extract_theme
+from benchmarks.legacy import legacy_extract_theme
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "theme_extraction.json")
+
+SECTIONS = ["introduction", "chapitre 1 - cadre théorique", "chapitre 1 - synthèse travaux",
+            "chapitre 1 - analyse critique", "chapitre 2 - matériels et terrain", "chapitre 2 - méthodologie",
+            "chapitre 3 - résultats", "chapitre 3 - discussion", "conclusion"]
+
+# Une session type : le thème est posé une fois, puis les sections sont demandées de façons variées
+SESSION = [
+    "Je veux rédiger un mémoire sur l'impact des réseaux sociaux sur les adolescents.",
+    "Rédige l'introduction sur l'impact des réseaux sociaux chez les adolescents",
+    "Passe au cadre théorique",
+    "Rédige la synthèse des travaux antérieurs sur les réseaux sociaux et les adolescents",
+    "Continue avec l'analyse critique",
+    "Chapitre 2 : matériels et terrain, avec un questionnaire auprès de 200 lycéens",
+    "Rédige la méthodologie de recherche",
+    "Présentation des résultats obtenus",
+    "Rédige la discussion des résultats en citant plus d'auteurs",
+    "Rédige la conclusion de mon mémoire sur l'Impact des réseaux sociaux sur les adolescents",
+]
+
+
+# -----------------------------------------------------
+#   VÉRIFICATION : SORTIES IDENTIQUES À L'ORIGINAL
+# -----------------------------------------------------
+def check_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    mismatches = []
+    for case in cases:
+        theme = extract_theme(case["prompt"])
+        if theme != case["theme"]:
+            mismatches.append({"prompt": case["prompt"], "attendu": case["theme"], "obtenu": theme})
+    return cases, mismatches
+
+
+# -----------------------------------------------------
+#   SESSION : CHANGEMENTS DE THÈME (REMISES À ZÉRO DU CONTEXTE)
+# -----------------------------------------------------
+def session_themes(resolve) -> list:
+    themes = []
+    current = None
+    for message in SESSION:
+        current = resolve(message, current)
+        themes.append(current)
+    return themes
+
+
+def resets(themes: list) -> int:
+    return sum(1 for previous, theme in zip(themes, themes[1:]) if theme != previous)
+
+
+def time_per_call(func, prompts: list, number: int) -> float:
+    total = timeit.timeit(lambda: [func(p) for p in prompts], number=number)
+    return total / (number * len(prompts)) * 1e6
+
+
+def main(number: int = 200):
+    cases, mismatches = check_golden()
+    print(f"Golden : {len(cases) - len(mismatches)}/{len(cases)} sorties identiques")
+    for mismatch in mismatches:
+        print(f"  ÉCART {mismatch}")
+
+    prompts = [case["prompt"] for case in cases]
+    long_prompts = [p * 20 for p in prompts if p]
+    for label, sample in (("prompts courts", prompts), ("prompts longs (x20)", long_prompts)):
+        legacy = time_per_call(legacy_extract_theme, sample, number)
+        compiled = time_per_call(extract_theme, sample, number)
+        print(f"{label:<22} original {legacy:8.1f} µs/appel | compilé {compiled:8.1f} µs/appel | x{legacy / compiled:.1f}")
+
+    resolver = ThemeResolver(sections=SECTIONS)
+    legacy_themes = session_themes(lambda message, current: legacy_extract_theme(message))
+    resolved_themes = session_themes(lambda message, current: resolver.resolve("bench", message, current))
+    print(f"\nSession de {len(SESSION)} messages :")
+    for message, legacy, resolved in zip(SESSION, legacy_themes, resolved_themes):
+        print(f"  {message[:55]:<57} original {legacy[:32]!r:<36} résolu {resolved[:32]!r}")
+    print(f"Thèmes distincts : original {len(set(legacy_themes))} | résolu {len(set(resolved_themes))}")
+    print(f"Changements de thème (contexte remis à zéro) : original {resets(legacy_themes)} | "
+          f"résolu {resets(resolved_themes)}")
+    resolve = lambda message: resolver.resolve("bench", message, resolved_themes[-1])
+    print(f"Résolution : {time_per_call(resolve, SESSION, number):.1f} µs/appel")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
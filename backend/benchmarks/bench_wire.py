@@ -0,0 +1,115 @@
+import argparse
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.fastAPI import AskRequest, ResponseModel
+from app.services import wire
+from benchmarks.results import compare, percentiles, save_results
+
+WORDS = ("le", "la", "les", "des", "réseaux", "sociaux", "adolescents", "étude", "résultats", "analyse", "données",
+         "méthodologie", "impact", "comportement", "usage", "quotidien", "selon", "auteurs", "cadre", "théorique",
+         "hypothèse", "échantillon", "lycéens", "enquête", "questionnaire", "significatif", "entretiens", "donc",
+         "ainsi", "cependant", "travaux", "recherche", "mémoire", "chapitre", "section", "montre", "observe")
+
+
+def section_text(tokens: int, seed: int = 42) -> str:
+    # Texte pseudo-rédigé (phrases de longueur variable) : compressibilité proche d'une vraie section
+    rng = random.Random(seed)
+    sentences = []
+    count = 0
+    while count < tokens:
+        length = rng.randint(8, 28)
+        words = [rng.choice(WORDS) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + rng.choice((".", ".", ".", " ;", " :")))
+        count += int(length * 1.3)
+        if rng.random() < 0.15:
+            sentences.append("\n\n")
+    return " ".join(sentences)
+
+
+# -----------------------------------------------------
+#   SÉRIALISATION : CHEMIN FASTAPI CONTRE wire.dumps
+# -----------------------------------------------------
+def fastapi_render(model: ResponseModel) -> bytes:
+    # Ce que fait /ask : conversion générique de la réponse puis json.dumps (JSONResponse)
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+def direct_render(model: ResponseModel) -> bytes:
+    return wire.dumps(model.model_dump())
+
+
+def time_call(func, number: int) -> dict:
+    samples = []
+    for _ in range(number):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    stats = percentiles(samples)
+    return {name: value * 1e6 for name, value in stats.items() if name != "count"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Octets transmis et coût de sérialisation de /ask et /v2/ask")
+    parser.add_argument("--tokens", type=int, default=4000, help="taille de la réponse (tokens)")
+    parser.add_argument("--context-chars", type=int, default=6000, help="taille du contexte envoyé")
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--compare", help="fichier JSON d'une exécution précédente")
+    parser.add_argument("--output", help="chemin du fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    text = section_text(args.tokens)
+    model = ResponseModel(theme="L'impact des réseaux sociaux sur les adolescents", section="Revue de littérature",
+                          response=text)
+    same = wire.decode_body(direct_render(model), wire.JSON) == wire.decode_body(fastapi_render(model), wire.JSON)
+    print(f"Réponse de {args.tokens} tokens ({len(text.encode('utf-8')) / 1024:.1f} Ko de texte), "
+          f"sérialiseur : {'orjson' if wire.orjson is not None else 'json'}, même JSON : {same}")
+
+    # Sérialisation (µs par réponse)
+    metrics = {"serialize_us": {}, "compress_us": {}, "response_bytes": {}, "request_bytes": {}}
+    for label, func in (("fastapi", lambda: fastapi_render(model)), ("direct", lambda: direct_render(model))):
+        metrics["serialize_us"][label] = time_call(func, args.number)
+        print(f"sérialisation {label:<8} p50 {metrics['serialize_us'][label]['p50']:8.1f} µs | "
+              f"p95 {metrics['serialize_us'][label]['p95']:8.1f} µs")
+
+    # Octets de la réponse selon l'encodage négocié
+    body = direct_render(model)
+    metrics["response_bytes"]["identity"] = len(body)
+    encodings = [("gzip", f"gzip-{level}", level) for level in (1, 6, 9)]
+    if wire.brotli is not None:
+        encodings += [("br", f"br-{quality}", quality) for quality in (1, 5, 11)]
+    for encoding, label, level in encodings:
+        compressed = wire.compress(body, encoding, gzip_level=level, brotli_quality=level)
+        metrics["response_bytes"][label] = len(compressed)
+        metrics["compress_us"][label] = time_call(lambda: wire.compress(body, encoding, level, level),
+                                                  max(20, args.number // 10))
+        print(f"réponse {label:<9} {len(compressed):8d} octets ({len(compressed) / len(body):6.1%}) | "
+              f"compression p50 {metrics['compress_us'][label]['p50']:8.1f} µs")
+    if wire.brotli is None:
+        print("brotli non installé : seul gzip est proposé (pip install brotli)")
+
+    # Requête : tout dans l'URL (/ask) contre corps JSON (/v2/ask)
+    context = section_text(args.context_chars // 6, seed=7)[:args.context_chars]
+    prompt = "Rédige la revue de littérature de mon mémoire sur l'impact des réseaux sociaux"
+    url = "/ask?" + urlencode({"prompt": prompt, "context": context, "user_id": "etudiant-42"})
+    payload = wire.dumps(AskRequest(prompt=prompt, context=context, user_id="etudiant-42").model_dump())
+    metrics["request_bytes"] = {"get_url": len(url.encode("ascii")), "post_body": len(payload)}
+    print(f"requête : URL GET {len(url)} caractères (limite courante des proxys : 8192) | corps POST {len(payload)} octets")
+
+    results = {"config": {"tokens": args.tokens, "context_chars": args.context_chars, "number": args.number,
+                          "orjson": wire.orjson is not None, "brotli": wire.brotli is not None},
+               "metrics": metrics}
+    path = save_results("wire", results, args.output)
+    print(f"Résultats : {path}")
+    if args.compare:
+        compare(args.compare, results)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
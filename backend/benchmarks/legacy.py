@@ -0,0 +1,501 @@
+import re
+
+# -----------------------------------------------------
+#   IMPLÉMENTATIONS D'ORIGINE (RÉFÉRENCE DES BENCHMARKS)
+# -----------------------------------------------------
+# Copies conservées telles quelles pour mesurer le gain des versions
+# compilées et vérifier qu'elles produisent exactement les mêmes sorties.
+
+def legacy_detect_section(message: str) -> str:
+    message_lower = message.lower()
+
+    # Patterns détaillés selon la nouvelle méthodologie
+    patterns = {
+        "introduction": [
+            r"(?:^|\s)introduction\s+générale?\b",
+            r"commence(?:r|z)?\s+(?:par\s+)?l['']?introduction",
+            r"rédige(?:r|z)?\s+(?:l['']?)?introduction",
+            r"contexte\s+d['']?étude",
+            r"problématique\s+(?:et|ou)\s+objectifs",
+            r"début(?:er)?\s+(?:le\s+)?mémoire",
+            r"1\s*\.?\s*contexte",
+            r"plan\s+du\s+document"
+        ],
+        "chapitre 1 - cadre théorique": [
+            r"chapitre\s*1\s*[\.\-]?\s*(?:cadre\s+théorique|concepts\s+clés)",
+            r"cadre\s+théorique",
+            r"concepts\s+clés",
+            r"définitions\s+opérationnelles",
+            r"1\.1\s*concepts",
+            r"présentation\s+des\s+concepts"
+        ],
+        "chapitre 1 - synthèse travaux": [
+            r"chapitre\s*1\s*[\.\-]?\s*(?:synthèse|travaux|état\s+de\s+l['']?art)",
+            r"synthèse\s+des\s+travaux",
+            r"travaux\s+antérieurs",
+            r"travaux\s+récents",
+            r"état\s+de\s+l['']?art",
+            r"revue\s+de\s+la\s+littérature",
+            r"1\.2\s*synthèse",
+            r"cartographie\s+de\s+la\s+recherche"
+        ],
+        "chapitre 1 - analyse critique": [
+            r"chapitre\s*1\s*[\.\-]?\s*(?:analyse\s+critique|gap)",
+            r"analyse\s+critique",
+            r"discussion\s+critique",
+            r"identification\s+du\s+gap",
+            r"lacune\s+de\s+recherche",
+            r"1\.3\s*analyse",
+            r"critique\s+des\s+travaux"
+        ],
+        "chapitre 2 - matériels et terrain": [
+            r"chapitre\s*2\s*[\.\-]?\s*(?:matériels|terrain|outils)",
+            r"matériels\s+(?:et|ou)\s+outils",
+            r"description\s+du\s+terrain",
+            r"population\s+(?:d['']?|de\s+)étude",
+            r"corpus\s+d['']?étude",
+            r"2\.1\s*matériels",
+            r"outils\s+de\s+collecte",
+            r"échantillon\s+(?:de\s+)?recherche"
+        ],
+        "chapitre 2 - méthodologie": [
+            r"chapitre\s*2\s*[\.\-]?\s*(?:méthodologie|méthodes)",
+            r"méthodologie\s+de\s+recherche",
+            r"design\s+de\s+recherche",
+            r"procédure\s+de\s+collecte",
+            r"méthodes\s+d['']?analyse",
+            r"2\.2\s*méthodes",
+            r"protocole\s+de\s+recherche"
+        ],
+        "chapitre 3 - résultats": [
+            r"chapitre\s*3\s*[\.\-]?\s*(?:résultats|présentation)",
+            r"présentation\s+des\s+résultats",
+            r"résultats\s+obtenus",
+            r"données\s+collectées",
+            r"3\.1\s*résultats",
+            r"faits\s+et\s+chiffres",
+            r"tableaux\s+(?:de\s+)?résultats"
+        ],
+        "chapitre 3 - discussion": [
+            r"chapitre\s*3\s*[\.\-]?\s*(?:discussion|analyse)",
+            r"discussion\s+des\s+résultats",
+            r"analyse\s+(?:et\s+|des\s+)résultats",
+            r"interprétation\s+des\s+résultats",
+            r"3\.2\s*discussion",
+            r"confrontation\s+avec\s+la\s+littérature"
+        ],
+        "conclusion": [
+            r"(?:^|\s)conclusion\s+(?:et\s+perspectives)?\b",
+            r"termine(?:r|z)?\s+(?:par\s+)?la\s+conclusion",
+            r"rédige(?:r|z)?\s+(?:la\s+)?conclusion",
+            r"synthèse\s+finale",
+            r"bilan\s+(?:final|général)",
+            r"perspectives\s+(?:de\s+recherche|d['']?avenir)",
+            r"limites\s+de\s+l['']?étude"
+        ]
+    }
+
+    # D'abord chercher les patterns détaillés
+    for section, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            if re.search(pattern, message_lower, flags=re.IGNORECASE):
+                return section
+
+    # Fallback vers les sections génériques
+    if any(word in message_lower for word in ["début", "commencer", "première", "premier", "contexte", "problématique"]):
+        return "introduction"
+    elif any(word in message_lower for word in ["chapitre 1", "revue littérature", "état art", "littérature"]):
+        return "chapitre 1 - cadre théorique"
+    elif any(word in message_lower for word in ["chapitre 2", "méthodologie", "méthodes", "matériel"]):
+        return "chapitre 2 - matériels et terrain"
+    elif any(word in message_lower for word in ["chapitre 3", "résultats", "discussion", "analyse résultats"]):
+        return "chapitre 3 - résultats"
+    elif any(word in message_lower for word in ["fin", "terminer", "dernier", "bilan", "perspectives"]):
+        return "conclusion"
+
+    # Par défaut
+    return "introduction"
+
+def legacy_detect_intention(message: str) -> str:
+    message_lower = message.lower().strip()
+    greetings = ["bonjour", "salut", "hello", "hi", "coucou", "hey", "bonsoir"]
+
+    for greeting in greetings:
+        if message_lower == greeting or message_lower.startswith(f"{greeting} "):
+            if len(message_lower.split()) <= 3:
+                return "chat"
+
+    memoire_keywords = [
+        "rédiger", "rédige", "rédaction", "mémoire", "memoire", "thèse", "these",
+        "rapport", "projet", "dissertation", "introduction", "chapitre", "conclusion",
+        "section", "problématique", "méthodologie", "bibliographie", "littérature",
+        "revue", "état de l'art", "méthodes", "résultats", "discussion", "analyse",
+        "partie", "paragraphe", "sujet", "thème", "titre", "universitaire", "académique",
+        "cadre théorique", "matériels et méthodes", "contexte d'étude", "problématique"
+    ]
+
+    memoire_phrases = [
+        "aide moi à rédiger", "aide-moi à rédiger", "aide pour rédiger",
+        "je dois rédiger", "je veux rédiger", "j'ai besoin de rédiger",
+        "comment rédiger", "comment faire un", "structure d'un mémoire",
+        "plan de mémoire", "aide pour mon mémoire", "aide pour ma thèse",
+        "rédiger l'introduction", "rédiger le chapitre", "rédiger la conclusion"
+    ]
+
+    for phrase in memoire_phrases:
+        if phrase in message_lower:
+            return "memoire"
+
+    keyword_count = sum(1 for keyword in memoire_keywords if keyword in message_lower)
+    if keyword_count >= 2:
+        return "memoire"
+
+    if len(message_lower.split()) > 20:
+        return "memoire"
+
+    return "chat"
+
+def legacy_build_prompt(memory_storage: dict, theme: str, section: str, context: str = "") -> str:
+    prev_context = memory_storage.get(theme, {})
+    previous_text = "\n".join([f"[{sec}] {txt}" for sec, txt in prev_context.items()])
+
+    # NOUVELLE MÉTHODOLOGIE DÉTAILLÉE
+    methodology = """
+MÉTHODOLOGIE ACADÉMIQUE DÉTAILLÉE POUR LA RÉDACTION DE MÉMOIRE
+
+========================================
+INTRODUCTION GÉNÉRALE
+========================================
+Fonction : Poser les fondations du mémoire, justifier son existence et en présenter la structure logique.
+
+1. CONTEXTE D'ÉTUDE
+   • Cadre général : Présentation du domaine scientifique, professionnel ou sociétal dans lequel s'inscrit le sujet.
+   • Cadre spécifique : Délimitation précise du terrain, de l'entreprise, de la communauté ou du corpus d'étude.
+   • Justification et intérêt : Pourquoi ce sujet est-il important maintenant ? (Enjeux actuels, lacunes observées, demandes institutionnelles).
+   • Historique succinct : Évolution de la situation ayant conduit au besoin d'étude.
+
+2. PROBLÉMATIQUE ET OBJECTIFS
+   • Question de départ : La question large qui a initié la réflexion.
+   • Problématique formulée : La question centrale, précise, argumentée et construite qui guide toute la recherche. Elle montre la "tension" ou le "problème" à résoudre.
+   • Objectif général : La finalité ultime du mémoire (ex : Concevoir, Évaluer, Comprendre, Proposer un modèle).
+   • Objectifs spécifiques (SMART) : La décomposition concrète et hiérarchisée des étapes à franchir pour atteindre l'objectif général.
+
+3. PLAN DU DOCUMENT
+   • Logique de la structure : Justification du choix des chapitres (approche dialectique, analytique, comparative, etc.).
+   • Annonce synthétique : Présentation claire et succincte du contenu de chaque partie principale.
+
+========================================
+CHAPITRE 1 : REVUE DE LA LITTÉRATURE / ÉTAT DE L'ART
+========================================
+Fonction : Démontrer la maîtrise du sujet, identifier les connaissances établies et les lacunes pour justifier sa propre recherche.
+
+1.1 PRÉSENTATION DES CONCEPTS CLÉS ET CADRE THÉORIQUE
+   • Définitions opérationnelles : Définition précise des termes centraux du sujet, en citant les auteurs de référence.
+   • Cadre théorique : Présentation et explication des théories, modèles ou paradigmes qui serviront de grille d'analyse.
+   • Historique et évolution des idées : Comment les concepts et théories ont-ils évolué jusqu'à aujourd'hui ?
+
+1.2 SYNTHÈSE DES TRAVAUX ANTÉRIEURS ET RÉCENTS
+   • Méthodologie de la revue : Critères de sélection des sources (mots-clés, bases de données, périodes, langues).
+   • Cartographie de la recherche : Classement des travaux par écoles de pensée, méthodologies, ou résultats convergents/divergents.
+   • Études fondatrices et pionnières : Les recherches qui ont marqué le domaine.
+   • Études les plus récentes : L'état actuel de la recherche, identifiant les fronts de science.
+
+1.3 ANALYSE CRITIQUE ET IDENTIFICATION DU GAP
+   • Discussion critique : Confrontation des points de vue, forces et faiblesses des méthodologies employées, limites des résultats.
+   • Synthèse des apports : Ce qui est acquis, consensuel.
+   • Identification de la niche (le "gap") : Mise en évidence claire de la lacune, de la question non résolue que votre mémoire vient combler.
+
+========================================
+CHAPITRE 2 : MATÉRIELS ET MÉTHODES
+========================================
+Fonction : Décrire avec une précision reproductible le "comment" de la recherche. C'est le protocole scientifique.
+
+2.1 MATÉRIELS, OUTILS ET TERRAIN
+   • Description du terrain / population / corpus :
+        - Sélection et critères d'inclusion/exclusion.
+        - Taille, caractéristiques principales (descriptif statistique ou qualitatif).
+        - Accès au terrain et considérations éthiques (accord, consentement, anonymat).
+   • Matériels (Hardware/Software) :
+        - Liste et spécifications techniques des équipements.
+        - Logiciels utilisés (pour l'analyse, la modélisation, les statistiques) avec version.
+   • Outils de collecte :
+        - Questionnaire (en annexe), guide d'entretien, grille d'observation.
+        - Justification de leur élaboration (adaptation d'outils validés, création originale).
+
+2.2 MÉTHODOLOGIE DE LA RECHERCHE
+   • Choix du design de recherche : Qualitative, Quantitative ou Mixte. Justification.
+   • Procédure de collecte des données : Déroulement chronologique précis (étape par étape), période, durée, conditions.
+   • Méthodes d'analyse des données :
+        - Pour données quantitatives : Tests statistiques utilisés (avec justification), logiciel.
+        - Pour données qualitatives : Méthode d'analyse (analyse de contenu, thématique, discours), processus de codage.
+   • Limites méthodologiques et biais potentiels : Anticipation et reconnaissance des limites inhérentes aux choix méthodologiques.
+
+========================================
+CHAPITRE 3 : RÉSULTATS, ANALYSE ET DISCUSSION
+========================================
+Fonction : Présenter, interpréter et confronter les résultats à la lumière du cadre théorique.
+
+STRUCTURE OPTION A : RÉSULTATS ET DISCUSSION INTÉGRÉS (par thème/objectif)
+   • Présentation des résultats : Faits bruts organisés (tableaux, graphiques, citations significatives).
+   • Analyse et Interprétation : Que signifient ces faits ? Explication immédiate.
+   • Discussion : Confrontation de ce résultat avec les travaux cités au Chapitre 1 (confirmation, infirmation, nuance).
+
+STRUCTURE OPTION B : RÉSULTATS ET DISCUSSION SÉPARÉS
+   3.1 PRÉSENTATION DES RÉSULTATS
+        - Organisation stricte selon les objectifs spécifiques ou les thèmes de recherche.
+        - Présentation neutre et factuelle des données, sans interprétation.
+        - Utilisation efficace des visuels (graphiques, tableaux clairement titrés et commentés).
+   
+   3.2 ANALYSE ET DISCUSSION GÉNÉRALE
+        - Interprétation globale : Donner du sens à l'ensemble des résultats.
+        - Discussion argumentée : Confrontation systématique avec l'état de l'art, explication des convergences/divergences.
+        - Réponse à la problématique : Montrer en quoi les résultats apportent des éléments de réponse.
+
+========================================
+CONCLUSION ET PERSPECTIVES
+========================================
+Fonction : Boucler la boucle logique du mémoire, résoudre la problématique et ouvrir sur l'avenir.
+
+1. BILAN SYNTHÉTIQUE ET RÉPONSES APPORTÉES
+   • Récapitulation synthétique : Rappel très concis des objectifs et de la démarche.
+   • Réponse à la problématique : Formulation claire et affirmative de la réponse principale.
+   • Synthèse des apports principaux : Les 3-4 contributions majeures (théoriques, méthodologiques, pratiques).
+   • Limites de l'étude : Reconnaissance honnête et argumentée des limites.
+
+2. PERSPECTIVES
+   • Perspectives de recherche : Propositions concrètes pour des recherches futures.
+   • Perspectives pratiques / Recommandations : Propositions d'actions concrètes.
+   • Ouverture : Élargissement du sujet vers un débat plus vaste.
+"""
+
+    # Instructions spécifiques par section
+    section_instructions = {
+        "introduction": """
+Pour l'INTRODUCTION GÉNÉRALE, développez chaque point suivant :
+1. Contexte d'étude (environ 25 lignes)
+   - Cadre général et spécifique
+   - Justification de l'intérêt actuel du sujet
+   - Historique succinct si pertinent
+
+2. Problématique et objectifs (environ 25 lignes)
+   - Formulation précise de la problématique avec justification
+   - Objectif général bien défini
+   - 3-5 objectifs spécifiques formulés de manière SMART
+
+3. Plan du document (environ 10 lignes)
+   - Logique de la structure choisie
+   - Annonce synthétique des chapitres
+""",
+        "chapitre 1 - cadre théorique": """
+Pour le CADRE THÉORIQUE (Chapitre 1.1), développez :
+1. Définitions opérationnelles (environ 20 lignes)
+   - Définitions précises des concepts clés avec auteurs
+   - Clarification des termes techniques
+
+2. Cadre théorique (environ 25 lignes)
+   - Présentation des théories principales
+   - Explication de leur pertinence pour votre étude
+   - Articulation entre les différentes théories
+
+3. Historique et évolution des idées (environ 15 lignes)
+   - Évolution chronologique des concepts
+   - Tournants théoriques importants
+""",
+        "chapitre 1 - synthèse travaux": """
+Pour la SYNTHÈSE DES TRAVAUX (Chapitre 1.2), développez :
+1. Méthodologie de la revue (environ 15 lignes)
+   - Critères de sélection des sources
+   - Bases de données consultées
+   - Période couverte
+
+2. Cartographie de la recherche (environ 20 lignes)
+   - Classification des travaux par approches
+   - Tableau synthétique des principales études
+   - Tendances dominantes dans la littérature
+
+3. Études clés (environ 25 lignes)
+   - Présentation des études fondatrices
+   - Analyse des travaux récents les plus pertinents
+   - Synthèse des principaux résultats existants
+""",
+        "chapitre 1 - analyse critique": """
+Pour l'ANALYSE CRITIQUE (Chapitre 1.3), développez :
+1. Discussion critique (environ 25 lignes)
+   - Forces et faiblesses des méthodologies rencontrées
+   - Limites des résultats des études existantes
+   - Controverses ou débats dans la littérature
+
+2. Synthèse des apports (environ 15 lignes)
+   - Consensus établis dans le domaine
+   - Connaissances acquises et validées
+
+3. Identification du gap (environ 20 lignes)
+   - Lacunes de recherche clairement identifiées
+   - Questions non résolues
+   - Justification de l'originalité de votre approche
+""",
+        "chapitre 2 - matériels et terrain": """
+Pour les MATÉRIELS ET TERRAIN (Chapitre 2.1), développez :
+1. Description du terrain/corpus (environ 25 lignes)
+   - Critères de sélection détaillés
+   - Caractéristiques principales (tableau descriptif si pertinent)
+   - Procédures d'accès et considérations éthiques
+
+2. Matériels et outils (environ 20 lignes)
+   - Liste complète avec spécifications techniques
+   - Justification des choix techniques
+   - Conditions d'utilisation et calibration
+
+3. Outils de collecte (environ 15 lignes)
+   - Présentation des instruments utilisés
+   - Procédure de validation/adaptation
+   - Fiabilité et validité des outils
+""",
+        "chapitre 2 - méthodologie": """
+Pour la MÉTHODOLOGIE (Chapitre 2.2), développez :
+1. Design de recherche (environ 20 lignes)
+   - Justification du choix qualitatif/quantitatif/mixte
+   - Schéma de la recherche
+   - Variables étudiées (si applicable)
+
+2. Procédure de collecte (environ 25 lignes)
+   - Déroulement chronologique étape par étape
+   - Conditions expérimentales ou d'observation
+   - Durée et planning de la collecte
+
+3. Méthodes d'analyse (environ 20 lignes)
+   - Techniques statistiques ou d'analyse qualitative
+   - Justification des choix méthodologiques
+   - Procédures de traitement des données
+
+4. Limites méthodologiques (environ 15 lignes)
+   - Biais potentiels identifiés
+   - Contraintes pratiques rencontrées
+   - Stratégies de contrôle mises en place
+""",
+        "chapitre 3 - résultats": """
+Pour les RÉSULTATS (Chapitre 3.1), développez :
+1. Organisation des résultats (environ 15 lignes)
+   - Structure selon les objectifs spécifiques
+   - Logique de présentation
+
+2. Présentation factuelle (environ 30 lignes)
+   - Données brutes organisées clairement
+   - Tableaux et graphiques pertinents avec légendes explicatives
+   - Citations significatives (pour études qualitatives)
+
+3. Neutralité scientifique (environ 10 lignes)
+   - Présentation sans interprétation
+   - Objectivité des données présentées
+""",
+        "chapitre 3 - discussion": """
+Pour la DISCUSSION (Chapitre 3.2), développez :
+1. Interprétation des résultats (environ 25 lignes)
+   - Signification des principaux résultats
+   - Explications possibles des observations
+
+2. Confrontation avec la littérature (environ 30 lignes)
+   - Comparaison avec les études du chapitre 1
+   - Explication des convergences et divergences
+   - Positionnement par rapport au cadre théorique
+
+3. Réponse à la problématique (environ 15 lignes)
+   - Articulation entre résultats et question de recherche
+   - Éléments de réponse apportés
+   - Nouvelles questions soulevées
+""",
+        "conclusion": """
+Pour la CONCLUSION, développez :
+1. Bilan synthétique (environ 20 lignes)
+   - Récapitulation concise de la démarche
+   - Synthèse des principaux résultats
+
+2. Réponse globale (environ 15 lignes)
+   - Formulation claire de la réponse à la problématique
+   - Apports principaux de la recherche
+
+3. Limites de l'étude (environ 15 lignes)
+   - Reconnaissance honnête des limites
+   - Impact potentiel sur les résultats
+
+4. Perspectives (environ 20 lignes)
+   - Pistes de recherche futures concrètes
+   - Recommandations pratiques si applicables
+   - Ouverture sur des questions plus larges
+"""
+    }
+
+    brainstorming = """
+BRAINSTORMING ACADÉMIQUE REQUIS :
+Avant de rédiger, effectuez un brainstorming interne pour organiser TOUTES les informations pertinentes.
+Pensez à :
+1. Les concepts clés et leurs interrelations
+2. Les auteurs majeurs et leurs contributions
+3. Les méthodologies alternatives possibles
+4. Les résultats attendus et inattendus
+5. Les implications théoriques et pratiques
+
+EXIGENCES DE RÉDACTION :
+• Chaque sous-point doit faire au minimum 15-20 lignes
+• Style académique rigoureux avec citations appropriées
+• Structure hiérarchique claire (1., 1.1, 1.1.1, etc.)
+• Explications didactiques accessibles à un débutant
+• Éviter les répétitions et les généralités
+• Proposer des exemples concrets et des tableaux synthétiques
+• Inclure une synthèse à la fin de chaque section
+"""
+
+    instruction = section_instructions.get(section, f"Développez la section '{section}' de manière structurée et détaillée.")
+
+    return f"""
+THÈME DU MÉMOIRE : **{theme}**
+SECTION À RÉDIGER : **{section}**
+CONTEXTE FOURNI : {context if context else "Aucun contexte spécifique fourni."}
+
+HISTORIQUE DES SECTIONS DÉJÀ RÉDIGÉES :
+{previous_text if previous_text else "C'est la première section du mémoire."}
+
+{methodology}
+
+INSTRUCTIONS SPÉCIFIQUES POUR CETTE SECTION :
+{instruction}
+
+{brainstorming}
+
+CONSIGNES FINALES :
+1. Rédigez UNIQUEMENT la section demandée : {section}
+2. Suivez scrupuleusement la méthodologie académique présentée
+3. Structurez avec des titres et sous-titres hiérarchiques
+4. Chaque paragraphe doit être développé et argumenté
+5. Inclure des exemples concrets liés au thème "{theme}"
+6. Terminer par une synthèse des points abordés
+7. Proposer naturellement la section suivante dans le flux logique
+
+COMMENCEZ LA RÉDACTION MAINTENANT :
+"""
+
+def legacy_extract_theme(message: str) -> str:
+    message_lower = message.lower()
+    theme_patterns = [
+        r"(?:thème|sujet|titre|sur)\s*(?:est|:|-)\s*\"?([^\"]+?)\"?\s*(?:\.|$|pour)",
+        r"rédiger\s+(?:un|une|le|la)?\s*(?:mémoire|rapport|thèse)\s+(?:sur|au sujet de|titré)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
+        r"mémoire\s+(?:sur|intitulé)\s*\"?([^\"]+?)\"?\s*(?:\.|$)",
+        r"(?:je\s+veux|je\s+dois|j['']aimerais)\s+rédiger\s+(?:un|une)\s*(?:mémoire|rapport)\s+(?:sur|au sujet de)\s*\"?([^\"]+?)\"?\s*(?:\.|$)"
+    ]
+
+    for pattern in theme_patterns:
+        match = re.search(pattern, message_lower, flags=re.IGNORECASE)
+        if match:
+            theme = match.group(1).strip()
+            theme = re.sub(r"^['\"]|['\"]$", "", theme)
+            if len(theme.split()) <= 15:
+                return theme.capitalize()
+
+    words = message.split()
+    stop_words = ["je","tu","il","elle","nous","vous","ils","elles","le","la","les",
+                  "un","une","des","de","du","à","au","pour","sur","avec","sans","dans",
+                  "par","est","sont","ai","as","a","avons","avez","ont","veux","dois","peux"]
+    important_words = [word for word in words if word.lower() not in stop_words]
+    if len(important_words) >= 2:
+        return " ".join(important_words[:5])
+    return "Thème non spécifié"
@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.results import compare, percentiles, save_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int):
+    # Pic de mémoire résidente d'un processus (Linux : VmHWM)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+# -----------------------------------------------------
+#   PROCESSUS : FAUX BACKENDS PUIS SERVEUR FASTAPI
+# -----------------------------------------------------
+def start_process(args: list, env: dict = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+async def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} : le processus s'est arrêté\n{process.stderr.read()}")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} : pas de réponse après {timeout:.0f}s")
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# -----------------------------------------------------
+#     MÉLANGE DE REQUÊTES (PROMPTS DE /exemples)
+# -----------------------------------------------------
+def build_workload(exemples: dict, total: int, stream_ratio: float, users: int, seed: int) -> list:
+    rng = random.Random(seed)
+    prompts = [prompt for group in exemples.values() for prompt in group]
+    workload = []
+    for _ in range(total):
+        prompt = rng.choice(prompts)
+        # Une part des requêtes passe par la détection seule (/test-intention), le reste génère
+        roll = rng.random()
+        if roll < 0.1:
+            endpoint = "/test-intention"
+        elif roll < 0.1 + 0.9 * stream_ratio:
+            endpoint = "/ask/stream"
+        else:
+            endpoint = "/ask"
+        workload.append((endpoint, {"prompt": prompt, "user_id": f"bench-{rng.randrange(users)}"}))
+    return workload
+
+
+async def run_request(client: httpx.AsyncClient, endpoint: str, params: dict) -> dict:
+    start = time.perf_counter()
+    ttft = None
+    ok = True
+    status = None
+    try:
+        if endpoint == "/ask/stream":
+            async with client.stream("GET", endpoint, params=params) as response:
+                status = response.status_code
+                if status != 200:
+                    await response.aread()
+                    return {"endpoint": endpoint, "latency": time.perf_counter() - start, "ttft": None,
+                            "ok": False, "limited": status == 429}
+                section = None
+                skip = 0
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "meta":
+                        section = event["section"]
+                        # Une section commence par un message fixe : le premier token modèle vient après
+                        skip = 0 if section == "chat" else 1
+                    elif event["type"] == "token" and ttft is None:
+                        if skip:
+                            skip -= 1
+                        else:
+                            ttft = time.perf_counter() - start
+                    elif event["type"] == "done":
+                        ok = "ERROR]" not in event["response"]
+                ok = ok and status == 200
+        else:
+            response = await client.get(endpoint, params=params)
+            status = response.status_code
+            ok = status == 200 and "ERROR]" not in response.text
+    except httpx.HTTPError:
+        ok = False
+    # 429 du contrôle d'admission : refus voulu, compté à part et exclu des latences
+    return {"endpoint": endpoint, "latency": time.perf_counter() - start, "ttft": ttft, "ok": ok,
+            "limited": status == 429}
+
+
+async def drive(base_url: str, workload: list, concurrency: int, timeout: float) -> tuple:
+    queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+    records = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            while not queue.empty():
+                endpoint, params = queue.get_nowait()
+                records.append(await run_request(client, endpoint, params))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return records, elapsed
+
+
+def summarize(records: list, elapsed: float) -> dict:
+    metrics = {"throughput_rps": len(records) / elapsed, "duration_s": elapsed, "endpoints": {}}
+    for endpoint in sorted({record["endpoint"] for record in records}):
+        subset = [record for record in records if record["endpoint"] == endpoint and not record["limited"]]
+        entry = {
+            "requests": len(subset),
+            "limited": sum(1 for record in records if record["endpoint"] == endpoint and record["limited"]),
+            "errors": sum(1 for record in subset if not record["ok"]),
+            "latency_s": percentiles([record["latency"] for record in subset]),
+        }
+        ttfts = [record["ttft"] for record in subset if record["ttft"] is not None]
+        if ttfts:
+            entry["ttft_s"] = percentiles(ttfts)
+        metrics["endpoints"][endpoint] = entry
+    return metrics
+
+
+# -----------------------------------------------------
+#                       MAIN
+# -----------------------------------------------------
+def main(argv=None):
+    from benchmarks.stub_backends import build_parser
+
+    parser = build_parser()
+    parser.description = "Test de charge de l'API contre de faux backends Groq / Ollama"
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="part de /ask/stream parmi les générations")
+    parser.add_argument("--cache", action="store_true", help="garder le cache des réponses actif")
+    parser.add_argument("--rate-limit", action="store_true", help="garder le contrôle d'admission actif (429 comptés à part)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--compare", help="fichier JSON d'une exécution précédente")
+    parser.add_argument("--output", help="chemin du fichier JSON de résultats")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+async def run(args) -> int:
+    groq_port, ollama_port, api_port = free_port(), free_port(), free_port()
+    stub_args = ["-m", "benchmarks.stub_backends", "--groq-port", str(groq_port), "--ollama-port", str(ollama_port),
+                 "--seed", str(args.seed), "--groq-rpm", str(args.groq_rpm)]
+    for name in ("groq", "ollama"):
+        for option in ("ttft", "tps", "tokens", "error_rate"):
+            stub_args += [f"--{name}-{option.replace('_', '-')}", str(getattr(args, f"{name}_{option}"))]
+    stubs = start_process(stub_args)
+    server = None
+    try:
+        await wait_until_up(f"http://127.0.0.1:{groq_port}/openai/v1/models", stubs)
+        await wait_until_up(f"http://127.0.0.1:{ollama_port}/api/tags", stubs)
+
+        # Serveur réel, configuré pour parler aux faux backends
+        server = start_process(
+            ["-m", "uvicorn", "app.models.fastAPI:app", "--host", "127.0.0.1", "--port", str(api_port),
+             "--log-level", "warning"],
+            env={
+                "GROQ_API_KEY": "bench",
+                "GROQ_BASE_URL": f"http://127.0.0.1:{groq_port}",
+                "OLLAMA_URL": f"http://127.0.0.1:{ollama_port}/api/generate",
+                "RESPONSE_CACHE_ENABLED": "1" if args.cache else "0",
+                "RATE_LIMIT_ENABLED": "1" if args.rate_limit else "0",
+                "STORAGE_BACKEND": "memory",
+            },
+        )
+        base_url = f"http://127.0.0.1:{api_port}"
+        await wait_until_up(f"{base_url}/structure", server)
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            exemples = (await client.get("/exemples")).json()
+
+        workload = build_workload(exemples, args.requests, args.stream_ratio, args.users, args.seed)
+        records, elapsed = await drive(base_url, workload, args.concurrency, args.timeout)
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            routing = (await client.get("/health/backends")).json().get("routage")
+        server_rss = peak_rss_mb(server.pid)
+    finally:
+        if server is not None:
+            stop_process(server)
+        stop_process(stubs)
+
+    metrics = summarize(records, elapsed)
+    metrics["server_peak_rss_mb"] = server_rss
+    metrics["client_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"{len(records)} requêtes, concurrence {args.concurrency} : {metrics['throughput_rps']:.1f} req/s "
+          f"en {elapsed:.1f}s | RSS serveur max {server_rss or 0:.0f} Mo")
+    for endpoint, entry in metrics["endpoints"].items():
+        latency = entry["latency_s"]
+        line = (f"{endpoint:<16} n={entry['requests']:<4} erreurs={entry['errors']:<3} 429={entry['limited']:<3} "
+                f"p50 {latency['p50'] * 1000:8.1f} ms | p95 {latency['p95'] * 1000:8.1f} ms | "
+                f"p99 {latency['p99'] * 1000:8.1f} ms")
+        if "ttft_s" in entry:
+            line += f" | TTFT p50 {entry['ttft_s']['p50'] * 1000:7.1f} ms"
+        print(line)
+
+    results = {"config": vars(args), "metrics": metrics, "routage": routing}
+    path = save_results("load", results, args.output)
+    print(f"Résultats : {path}")
+    if args.compare:
+        compare(args.compare, results)
+    return 1 if any(entry["errors"] for entry in metrics["endpoints"].values()) and not (
+        args.groq_error_rate or args.ollama_error_rate) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import json
+import os
+import platform
+import subprocess
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+# -----------------------------------------------------
+#     RÉSULTATS EN JSON (COMPARABLES D'UNE EXÉCUTION À L'AUTRE)
+# -----------------------------------------------------
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(name: str, data: dict, path: str = None) -> str:
+    document = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        **data,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def flatten(data, prefix: str = "") -> dict:
+    values = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            values.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        values[prefix] = data
+    return values
+
+
+def compare(previous_path: str, current: dict, threshold: float = 0.10):
+    # Écart relatif de chaque mesure numérique ; marque celles qui bougent de plus de `threshold`
+    with open(previous_path, encoding="utf-8") as f:
+        before = flatten(json.load(f).get("metrics", {}))
+    after = flatten(current.get("metrics", {}))
+    print(f"\nComparaison avec {previous_path} :")
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        if old == 0:
+            continue
+        delta = (new - old) / abs(old)
+        marker = " <--" if abs(delta) > threshold else ""
+        print(f"  {key:<55} {old:12.4f} -> {new:12.4f} ({delta:+.1%}){marker}")
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORD = "mémoire "
+
+
+# -----------------------------------------------------
+#     COMPORTEMENT D'UN FAUX BACKEND (LATENCE, DÉBIT, ERREURS)
+# -----------------------------------------------------
+class StubProfile:
+    def __init__(self, ttft: float, tokens_per_second: float, tokens: int, error_rate: float = 0.0,
+                 requests_per_minute: int = 0, seed: int = 0):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.error_rate = error_rate
+        # 0 = pas de quota ; sinon en-têtes x-ratelimit-* et 429 comme l'API Groq
+        self.requests_per_minute = requests_per_minute
+        self._random = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self.served = 0
+        self.failed = 0
+
+    def token_count(self, requested: int = None) -> int:
+        return min(self.tokens, requested) if requested else self.tokens
+
+    def should_fail(self) -> bool:
+        failed = self._random.random() < self.error_rate
+        self.failed += failed
+        return failed
+
+    def quota(self):
+        # (en-têtes, secondes avant réinitialisation si le quota est épuisé)
+        if not self.requests_per_minute:
+            return {}, 0.0
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start, self._window_requests = now, 0
+        reset = 60 - (now - self._window_start)
+        self._window_requests += 1
+        remaining = self.requests_per_minute - self._window_requests
+        headers = {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(max(remaining, 0)),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+        }
+        return headers, (reset if remaining < 0 else 0.0)
+
+    async def tokens_stream(self, count: int):
+        await asyncio.sleep(self.ttft)
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for _ in range(count):
+            yield WORD
+            if delay:
+                await asyncio.sleep(delay)
+        self.served += 1
+
+    async def full_text(self, count: int) -> str:
+        return "".join([token async for token in self.tokens_stream(count)])
+
+    def snapshot(self) -> dict:
+        return {"servies": self.served, "erreurs_injectees": self.failed}
+
+
+# -----------------------------------------------------
+#        FAUX GROQ (API COMPATIBLE OPENAI)
+# -----------------------------------------------------
+def create_groq_app(profile: StubProfile) -> FastAPI:
+    app = FastAPI()
+
+    def chunk(model: str, content: str = None, finish: str = None) -> str:
+        delta = {"content": content} if content is not None else {}
+        payload = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.get("/openai/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        headers, retry_after = profile.quota()
+        if retry_after:
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "tokens"}}, status_code=429,
+                                headers={**headers, "retry-after": f"{retry_after:.0f}"})
+        if profile.should_fail():
+            return JSONResponse({"error": {"message": "Erreur injectée", "type": "server_error"}}, status_code=500)
+        model = body.get("model", "stub")
+        count = profile.token_count(body.get("max_tokens"))
+
+        if body.get("stream"):
+            async def events():
+                async for token in profile.tokens_stream(count):
+                    yield chunk(model, token)
+                yield chunk(model, finish="stop")
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+        text = await profile.full_text(count)
+        return JSONResponse({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+        }, headers=headers)
+
+    @app.get("/stub/stats")
+    def stats():
+        return profile.snapshot()
+
+    return app
+
+
+# -----------------------------------------------------
+#        FAUX OLLAMA (/api/generate, /api/tags)
+# -----------------------------------------------------
+def create_ollama_app(profile: StubProfile) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "stub"}]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if profile.should_fail():
+            return JSONResponse({"error": "Erreur injectée"}, status_code=500)
+        count = profile.token_count((body.get("options") or {}).get("num_predict"))
+
+        if body.get("stream", True):
+            async def lines():
+                async for token in profile.tokens_stream(count):
+                    yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+                yield json.dumps({"model": body.get("model"), "response": "", "done": True, "eval_count": count}) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        text = await profile.full_text(count)
+        return {"model": body.get("model"), "response": text, "done": True, "eval_count": count}
+
+    @app.get("/stub/stats")
+    def stats():
+        return profile.snapshot()
+
+    return app
+
+
+# -----------------------------------------------------
+#   LANCEMENT DES DEUX FAUX BACKENDS DANS UN PROCESSUS
+# -----------------------------------------------------
+def add_profile_arguments(parser: argparse.ArgumentParser, name: str, ttft: float, tps: float, tokens: int):
+    parser.add_argument(f"--{name}-ttft", type=float, default=ttft, help="latence avant le premier token (s)")
+    parser.add_argument(f"--{name}-tps", type=float, default=tps, help="tokens par seconde")
+    parser.add_argument(f"--{name}-tokens", type=int, default=tokens, help="tokens par réponse")
+    parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help="proportion de réponses en erreur")
+
+
+def profile_from_args(args, name: str, seed: int) -> StubProfile:
+    return StubProfile(
+        ttft=getattr(args, f"{name}_ttft"),
+        tokens_per_second=getattr(args, f"{name}_tps"),
+        tokens=getattr(args, f"{name}_tokens"),
+        error_rate=getattr(args, f"{name}_error_rate"),
+        requests_per_minute=getattr(args, f"{name}_rpm", 0),
+        seed=seed,
+    )
+
+
+async def serve(groq_app: FastAPI, groq_port: int, ollama_app: FastAPI, ollama_port: int):
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        for app, port in ((groq_app, groq_port), (ollama_app, ollama_port))
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Faux backends Groq / Ollama pour les benchmarks")
+    parser.add_argument("--groq-port", type=int, default=18001)
+    parser.add_argument("--ollama-port", type=int, default=18002)
+    add_profile_arguments(parser, "groq", ttft=0.2, tps=500.0, tokens=400)
+    parser.add_argument("--groq-rpm", type=int, default=0, help="quota de requêtes par minute (0 = illimité)")
+    add_profile_arguments(parser, "ollama", ttft=0.5, tps=40.0, tokens=120)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    groq_app = create_groq_app(profile_from_args(args, "groq", args.seed))
+    ollama_app = create_ollama_app(profile_from_args(args, "ollama", args.seed + 1))
+    asyncio.run(serve(groq_app, args.groq_port, ollama_app, args.ollama_port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.router import AdaptiveRouter
+
+
+class FakeBackends:
+    # Groq et Ollama remplacés au niveau des services : tout le reste (routeur, cache, disjoncteurs) est réel
+    def __init__(self):
+        self.groq_error = None
+        self.ollama_text = "Texte rédigé par Ollama."
+        self.groq_text = "Texte rédigé par Groq."
+        self.calls = []
+
+    async def groq_complete(self, prompt, **options):
+        self.calls.append("groq")
+        if self.groq_error is not None:
+            raise self.groq_error
+        return self.groq_text
+
+    async def groq_stream(self, prompt, **options):
+        self.calls.append("groq")
+        if self.groq_error is not None:
+            raise self.groq_error
+        for word in self.groq_text.split(" "):
+            yield word + " "
+
+    async def ollama_generate(self, prompt, **options):
+        self.calls.append("ollama")
+        return self.ollama_text
+
+    async def ollama_stream(self, prompt, **options):
+        self.calls.append("ollama")
+        for word in self.ollama_text.split(" "):
+            yield word + " "
+
+    async def ping(self):
+        pass
+
+    async def preload(self):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    from app.models import fastAPI
+
+    backends = FakeBackends()
+    monkeypatch.setattr(fastAPI.groq_service, "complete", backends.groq_complete)
+    monkeypatch.setattr(fastAPI.groq_service, "stream", backends.groq_stream)
+    monkeypatch.setattr(fastAPI.ollama_service, "generate", backends.ollama_generate)
+    monkeypatch.setattr(fastAPI.ollama_service, "stream", backends.ollama_stream)
+    monkeypatch.setattr(fastAPI.ollama_service, "ping", backends.ping)
+    monkeypatch.setattr(fastAPI.ollama_service, "preload", backends.preload)
+    monkeypatch.setattr(fastAPI, "admission", None)
+    # Mesures du routeur remises aux estimations de départ (les faux backends répondent instantanément)
+    router = fastAPI.router
+    monkeypatch.setattr(fastAPI, "router", AdaptiveRouter(router.backends, router.health, router.tokenizer,
+                                                          fallback=router.fallback))
+    for breaker in fastAPI.health.backends.values():
+        breaker.record_success()
+    fastAPI.backends = backends
+    yield fastAPI
+    for breaker in fastAPI.health.backends.values():
+        breaker.record_success()
@@ -0,0 +1,56 @@
+import pytest
+
+from app.database import SqlRepository
+from app.services.chat_history import ChatHistoryStore
+
+
+class Tokenizer:
+    def count(self, text):
+        return len(text.split())
+
+
+def make_store(repository, **limits):
+    options = {"max_messages": 20, "max_tokens": 1000, "max_users": 100, "max_total_tokens": 10000, "l1_ttl": 0}
+    options.update(limits)
+    return ChatHistoryStore(repository, tokenizer=Tokenizer(), **options)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    # Dépôt SQLite : l'historique y est relu au chargement (le dépôt en mémoire ne le garde pas)
+    repository = SqlRepository(str(tmp_path / "state.db"), pool_size=2, flush_interval=60, batch_size=1000)
+    yield repository
+    repository.close()
+
+
+def test_first_message_is_not_duplicated(repository):
+    store = make_store(repository)
+    store.append("alice", "Utilisateur", "bonjour")
+    assert store.get_context("alice") == "Utilisateur: bonjour"
+    assert repository.get_chat("alice", 20) == [("Utilisateur", "bonjour")]
+
+
+def test_reload_after_eviction_is_not_duplicated(repository):
+    store = make_store(repository, max_users=1)
+    store.append("alice", "Utilisateur", "bonjour")
+    store.append("bob", "Utilisateur", "salut")
+    assert store.stats()["evicted_users"] == 1
+    store.append("alice", "AI", "Bonjour !")
+    assert store.get_context("alice") == "Utilisateur: bonjour\nAI: Bonjour !"
+
+
+def test_reload_after_l1_ttl_is_not_duplicated(repository):
+    store = make_store(repository, l1_ttl=1e-9)
+    store.append("alice", "Utilisateur", "bonjour")
+    store.append("alice", "AI", "Bonjour !")
+    # Tampon tel que laissé par append (get_context le rechargerait encore)
+    assert store._histories["alice"].transcript == "Utilisateur: bonjour\nAI: Bonjour !"
+
+
+def test_token_capacity_evicts_oldest_messages():
+    store = make_store(None, max_tokens=6)
+    store.append("alice", "Utilisateur", "un deux")
+    store.append("alice", "AI", "trois quatre")
+    store.append("alice", "Utilisateur", "cinq six")
+    assert store.get_context("alice") == "AI: trois quatre\nUtilisateur: cinq six"
+    assert store.stats()["total_tokens"] == 6
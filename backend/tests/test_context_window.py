@@ -0,0 +1,92 @@
+from app.database import InMemoryRepository
+from app.services.context_window import ContextWindow, summarize
+
+
+class Tokenizer:
+    def count(self, text):
+        return len(text.split())
+
+
+def make_window(ttl):
+    return ContextWindow(budget=0, summary_tokens=50, tokenizer=Tokenizer(), ttl=ttl)
+
+
+def hydrate(window, repository, theme):
+    if not window.has(theme):
+        window.load(theme, repository.get_sections(theme))
+    return window.get(theme)
+
+
+def test_section_written_by_another_worker_is_seen_after_ttl():
+    # Deux workers, un stockage partagé : le second écrit une section du thème après la lecture du premier
+    repository = InMemoryRepository()
+    repository.save_section("climat", "introduction", "Le climat change.")
+    window = make_window(ttl=1e-9)
+    assert hydrate(window, repository, "climat") == "[introduction] Le climat change."
+
+    repository.save_section("climat", "conclusion", "Il faut agir.")
+    assert "[conclusion] Il faut agir." in hydrate(window, repository, "climat")
+
+
+def test_without_ttl_the_theme_is_loaded_once():
+    repository = InMemoryRepository()
+    repository.save_section("climat", "introduction", "Le climat change.")
+    window = make_window(ttl=0)
+    hydrate(window, repository, "climat")
+    repository.save_section("climat", "conclusion", "Il faut agir.")
+    assert window.has("climat")
+    assert hydrate(window, repository, "climat") == "[introduction] Le climat change."
+
+
+def test_reload_keeps_unchanged_entries_and_rendering():
+    repository = InMemoryRepository()
+    repository.save_section("climat", "introduction", "Le climat change.")
+    window = make_window(ttl=1e-9)
+    rendered = hydrate(window, repository, "climat")
+    entry = window._entries["climat"]["introduction"]
+
+    window.load("climat", repository.get_sections("climat"))
+    assert window._entries["climat"]["introduction"] is entry
+    assert window.get("climat") is rendered
+
+    repository.save_section("climat", "introduction", "Le climat se réchauffe.")
+    window.load("climat", repository.get_sections("climat"))
+    assert window.get("climat") == "[introduction] Le climat se réchauffe."
+
+
+def make_budget_window(budget):
+    window = ContextWindow(budget=budget, summary_tokens=3, tokenizer=Tokenizer(), ttl=0)
+    for section in ("introduction", "cadre", "conclusion"):
+        window.update("climat", section, f"# {section}\nPremière phrase longue de {section}. Suite détaillée du texte.")
+    return window
+
+
+def test_history_fits_the_token_budget():
+    # Sans limite : tout en texte intégral
+    assert make_budget_window(0).get("climat").count("Suite détaillée") == 3
+
+    # Budget serré : la section la plus récente reste intégrale, les précédentes passent en résumé
+    window = make_budget_window(25)
+    lines = window.get("climat").split("\n")
+    assert lines[0] == "[introduction - résumé] # introduction"
+    assert lines[1] == "[cadre - résumé] # cadre"
+    assert lines[2].startswith("[conclusion] # conclusion")
+    assert window.tokens("climat") <= 25
+
+    # Même les résumés dépassent : les sections les plus anciennes sont omises
+    window = make_budget_window(8)
+    assert window.get("climat") == "[sections antérieures omises : introduction, cadre]\n[conclusion - résumé] # conclusion"
+
+
+def test_summary_keeps_headings_and_first_sentences():
+    text = "1. Contexte\nLe climat change. Les causes sont multiples.\n\nIl faut agir. Vite."
+    assert summarize(text, 100, Tokenizer()) == "1. Contexte\nLe climat change.\nIl faut agir."
+    assert summarize(text, 5, Tokenizer()) == "1. Contexte\nLe climat change."
+
+
+def test_rendering_cached_until_a_section_changes():
+    window = make_budget_window(25)
+    rendered = window.get("climat")
+    assert window.get("climat") is rendered
+    window.update("climat", "cadre", "Nouveau cadre.")
+    assert "[cadre] Nouveau cadre." in window.get("climat")
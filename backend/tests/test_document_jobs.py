@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.services.document_jobs import DONE, FAILED, DocumentGenerator, is_error_output
+
+SECTIONS = ["introduction", "cadre", "resultats", "conclusion"]
+DEPENDENCIES = {"cadre": ("introduction",), "resultats": ("cadre",), "conclusion": ("introduction", "resultats")}
+
+
+def run_document(write_section, concurrency: int = 4):
+    saved = {}
+
+    async def write_outline(job):
+        return "Plan : I. ... II. ..."
+
+    async def save(job, section, text):
+        saved[section] = text
+
+    async def scenario():
+        generator = DocumentGenerator(write_outline, write_section, save,
+                                      sections=SECTIONS, dependencies=DEPENDENCIES, concurrency=concurrency, max_jobs=5)
+        job = generator.submit("alice", "Thème", "")
+        await job.task
+        return job
+
+    return asyncio.run(scenario()), saved
+
+
+def test_sections_wait_for_their_dependencies():
+    async def write_section(job, section, dependency_texts):
+        await asyncio.sleep(0.01)
+        assert set(dependency_texts) == set(DEPENDENCIES.get(section, ()))
+        return f"texte {section}"
+
+    job, saved = run_document(write_section)
+    assert job.status == DONE
+    assert saved == {section: f"texte {section}" for section in SECTIONS}
+    order = sorted(SECTIONS, key=lambda section: job.sections[section]["started_at"])
+    assert order.index("cadre") > order.index("introduction")
+    assert order.index("conclusion") > order.index("resultats")
+
+
+def test_failed_section_is_not_saved_and_dependents_still_run():
+    async def write_section(job, section, dependency_texts):
+        if section == "cadre":
+            return "[ONLINE ERROR] Impossible d'utiliser Groq : timeout"
+        return f"texte {section}"
+
+    job, saved = run_document(write_section)
+    assert job.status == FAILED
+    assert job.sections["cadre"]["status"] == FAILED
+    assert "cadre" not in saved
+    assert job.sections["resultats"]["status"] == DONE
+
+
+def test_invalid_graph_is_rejected():
+    with pytest.raises(ValueError):
+        DocumentGenerator(None, None, sections=["conclusion", "introduction"],
+                          dependencies={"conclusion": ("introduction",)})
+
+
+@pytest.mark.parametrize("output, expected", [
+    ("", True),
+    ("[OFFLINE ERROR] Ollama saturé", True),
+    ("[Erreur technique] boom", True),
+    ("Une section rédigée.", False),
+])
+def test_is_error_output(output, expected):
+    assert is_error_output(output) is expected
@@ -0,0 +1,60 @@
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.services.health import OPEN
+
+NO_KEY = RuntimeError("The api_key client option must be set either by passing api_key to the client")
+
+
+def section_prompt() -> str:
+    # Thème unique par test : ni cache de réponses ni sections déjà rédigées partagés
+    return f"Rédige l'introduction de mon mémoire sur la gestion des déchets à {uuid.uuid4().hex[:8]}"
+
+
+def test_section_retries_on_ollama_when_groq_fails(api):
+    api.backends.groq_error = NO_KEY
+    client = TestClient(api.app)
+    user_id = uuid.uuid4().hex
+    response = client.get("/ask", params={"prompt": section_prompt(), "user_id": user_id}).json()
+    assert "Texte rédigé par Ollama." in response["response"]
+    assert "[ONLINE ERROR]" not in response["response"]
+    assert api.backends.calls == ["groq", "ollama"]
+    theme = response["theme"]
+    assert api.repository.get_sections(theme)["introduction"] == "Texte rédigé par Ollama."
+
+
+def test_stream_retries_on_ollama_before_first_token(api):
+    api.backends.groq_error = NO_KEY
+    client = TestClient(api.app)
+    response = client.get("/ask/stream", params={"prompt": section_prompt(), "user_id": uuid.uuid4().hex})
+    done = json.loads(response.text.splitlines()[-1])
+    assert done["type"] == "done"
+    assert "Texte rédigé par Ollama." in done["response"] and "[ONLINE ERROR]" not in done["response"]
+    assert api.backends.calls == ["groq", "ollama"]
+
+
+def test_error_output_is_never_saved_as_a_section(api, monkeypatch):
+    api.backends.groq_error = NO_KEY
+
+    async def ollama_down(prompt, **options):
+        raise ConnectionError("Ollama injoignable")
+
+    monkeypatch.setattr(api.ollama_service, "generate", ollama_down)
+    client = TestClient(api.app)
+    response = client.get("/ask", params={"prompt": section_prompt(), "user_id": uuid.uuid4().hex}).json()
+    assert "ERROR" in response["response"]
+    assert "introduction" not in api.repository.get_sections(response["theme"])
+
+
+def test_failed_groq_client_startup_opens_the_breaker(api, monkeypatch):
+    def no_client():
+        raise NO_KEY
+
+    monkeypatch.setattr(api.groq_service, "prepare", no_client)
+    with TestClient(api.app) as client:
+        assert api.health.backends["groq"].state == OPEN
+        client.get("/ask", params={"prompt": section_prompt(), "user_id": uuid.uuid4().hex})
+    # Groq n'est même pas essayé
+    assert api.backends.calls == ["ollama"]
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from app.services.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthMonitor
+
+
+def make_breaker(threshold: int = 3, recovery: float = 30.0) -> CircuitBreaker:
+    return CircuitBreaker("groq", probe=None, failure_threshold=threshold, recovery_timeout=recovery, ttl=30.0)
+
+
+def test_opens_after_threshold_failures():
+    breaker = make_breaker(threshold=3)
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    assert breaker.state == CLOSED and breaker.allow_request()
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+
+
+def test_success_resets_failure_count():
+    breaker = make_breaker(threshold=2)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_after_recovery_timeout():
+    breaker = make_breaker(threshold=1, recovery=30.0)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 31
+    assert breaker.is_available()
+    assert breaker.state == HALF_OPEN
+
+
+def test_half_open_failure_reopens():
+    breaker = make_breaker(threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 31
+    breaker.is_available()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_monitor_probe_opens_and_closes():
+    calls = {"fail": True}
+
+    async def probe():
+        if calls["fail"]:
+            raise ConnectionError("injoignable")
+
+    monitor = HealthMonitor(interval=1, ttl=30, failure_threshold=1, recovery_timeout=0)
+    monitor.register("ollama", probe)
+    asyncio.run(monitor.check("ollama"))
+    assert monitor.backends["ollama"].state == OPEN
+    calls["fail"] = False
+    asyncio.run(monitor.check("ollama"))
+    assert monitor.backends["ollama"].state == CLOSED
+    assert monitor.snapshot()["ollama"]["available"]
+
+
+def test_probed_breaker_keeps_half_open_trial_for_the_probe():
+    async def probe():
+        pass
+
+    monitor = HealthMonitor(interval=1, ttl=30, failure_threshold=1, recovery_timeout=0)
+    monitor.register("groq", probe)
+    monitor.record_failure("groq", "timeout")
+    assert monitor.is_available("groq")
+    # Aucune requête utilisateur ne sert d'essai : la sonde suivante referme le circuit
+    assert not monitor.allow_request("groq")
+    asyncio.run(monitor.check("groq"))
+    assert monitor.allow_request("groq")
+
+
+def test_trip_opens_immediately():
+    breaker = make_breaker(threshold=3)
+    breaker.trip("clé absente")
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["last_error"] == "clé absente"
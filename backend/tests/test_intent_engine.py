@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+from app.services.intent_engine import IntentEngine, detect_intention
+from benchmarks.legacy import legacy_detect_intention
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "golden", "intention_detection.json")
+
+with open(GOLDEN_PATH, encoding="utf-8") as f:
+    CASES = json.load(f)["cases"]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case["prompt"][:40])
+def test_golden_intention(case):
+    assert detect_intention(case["prompt"]) == case["intention"]
+
+
+def test_long_prompts_match_original():
+    for case in CASES:
+        prompt = case["prompt"] * 20
+        assert detect_intention(prompt) == legacy_detect_intention(prompt)
+
+
+def test_repeated_keyword_counts_its_weight():
+    # Un mot-clé listé deux fois pèse deux (comportement d'origine)
+    engine = IntentEngine(greetings=(), keywords=("mémoire", "mémoire"), phrases=())
+    score = engine.analyze("un mémoire")
+    assert score.keywords == {"mémoire": 1}
+    assert score.keyword_score == 2
+    assert score.intention == "memoire"
+
+
+def test_greeting_must_start_the_message_and_end_on_a_word():
+    engine = IntentEngine()
+    assert engine.analyze("Bonjour").greeting == "bonjour"
+    assert engine.analyze("Bonjourno").greeting is None
+    assert engine.analyze("Alors bonjour").greeting is None
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.services.job_queue import (CANCELLED, DONE, FAILED, PRIORITY_CHAT, PRIORITY_SECTION, InMemoryJobQueue, Job,
+                                    JobManager, QueueFullError)
+
+
+def test_priority_then_round_robin_per_user():
+    async def scenario():
+        queue = InMemoryJobQueue(max_size=10, max_per_user=5)
+        for user_id, name in (("alice", "a1"), ("alice", "a2"), ("bob", "b1")):
+            await queue.put(Job(user_id, name, PRIORITY_SECTION, {}))
+        await queue.put(Job("carol", "chat", PRIORITY_CHAT, {}))
+        return [(await queue.take()).kind for _ in range(4)], queue.size()
+
+    order, size = asyncio.run(scenario())
+    assert order == ["chat", "a1", "b1", "a2"]
+    assert size == 0
+
+
+def test_queue_limits():
+    async def scenario():
+        queue = InMemoryJobQueue(max_size=2, max_per_user=1)
+        await queue.put(Job("alice", "a", PRIORITY_SECTION, {}))
+        with pytest.raises(QueueFullError):
+            await queue.put(Job("alice", "a", PRIORITY_SECTION, {}))
+        await queue.put(Job("bob", "b", PRIORITY_SECTION, {}))
+        with pytest.raises(QueueFullError):
+            await queue.put(Job("carol", "c", PRIORITY_SECTION, {}))
+
+    asyncio.run(scenario())
+
+
+def test_manager_runs_fails_and_cancels_jobs():
+    release = None
+
+    async def handler(job):
+        if job.payload.get("fail"):
+            raise ValueError("échec")
+        if job.payload.get("block"):
+            await release.wait()
+        return {"ok": job.payload["n"]}
+
+    async def wait_status(manager, job, statuses):
+        while job.status not in statuses:
+            await manager.wait_for_change(job, job.version, 1)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        manager = JobManager(handler, InMemoryJobQueue(max_size=10, max_per_user=10), workers=1, max_jobs=10)
+        manager.start()
+        done = await manager.submit("alice", "memoire", PRIORITY_SECTION, {"n": 1})
+        failed = await manager.submit("alice", "memoire", PRIORITY_SECTION, {"n": 2, "fail": True})
+        blocked = await manager.submit("alice", "memoire", PRIORITY_SECTION, {"n": 3, "block": True})
+        queued = await manager.submit("alice", "memoire", PRIORITY_SECTION, {"n": 4})
+        await wait_status(manager, blocked, ("running",))
+        await manager.cancel(queued.id)
+        await manager.cancel(blocked.id)
+        await wait_status(manager, blocked, (CANCELLED,))
+        await manager.stop()
+        return done, failed, blocked, queued
+
+    done, failed, blocked, queued = asyncio.run(scenario())
+    assert done.status == DONE and done.result == {"ok": 1}
+    assert failed.status == FAILED and failed.error == "échec"
+    assert blocked.status == CANCELLED
+    assert queued.status == CANCELLED
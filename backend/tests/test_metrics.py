@@ -0,0 +1,63 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.metrics import MetricsMiddleware, MetricsRegistry, record_generation, span
+
+
+def make_client(enabled=False, server_timing=True):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, enabled=enabled, server_timing=server_timing)
+
+    @app.get("/ping")
+    def ping():
+        with span("classification"):
+            pass
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_server_timing_only_on_explicit_request():
+    client = make_client()
+    assert "server-timing" not in client.get("/ping").headers
+    for value in ("0", "non", ""):
+        assert "server-timing" not in client.get("/ping", headers={"X-Server-Timing": value}).headers
+    timing = client.get("/ping", headers={"X-Server-Timing": "1"}).headers["server-timing"]
+    assert timing.startswith("classification;dur=")
+    assert "total;dur=" in timing
+
+
+def test_server_timing_disabled_by_config():
+    client = make_client(server_timing=False)
+    assert "server-timing" not in client.get("/ping", headers={"X-Server-Timing": "1"}).headers
+
+
+def test_span_outside_a_request_costs_nothing():
+    with span("model") as measured:
+        pass
+    assert type(measured).__name__ == "NullSpan"
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requêtes", ("route",))
+    duration = registry.histogram("duration_seconds", "Durée", buckets=(0.1, 1.0))
+    requests.inc(route='/a"b')
+    duration.observe(0.5)
+    duration.observe(5)
+    text = registry.render()
+    assert 'requests_total{route="/a\\"b"} 1' in text
+    assert 'duration_seconds_bucket{le="0.1"} 0' in text
+    assert 'duration_seconds_bucket{le="1"} 1' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in text
+    assert "duration_seconds_count 2" in text
+    assert "# TYPE duration_seconds histogram" in text
+
+
+def test_record_generation_counts_bytes(monkeypatch):
+    from app.services import metrics
+
+    monkeypatch.setattr(metrics.config, "METRICS_ENABLED", True)
+    before = metrics.BYTES._values.get(("test", "completion"), 0.0)
+    record_generation("test", "prompt", "réponse")
+    assert metrics.BYTES._values[("test", "completion")] - before == len("réponse".encode("utf-8"))
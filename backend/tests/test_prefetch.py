@@ -0,0 +1,88 @@
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.prefetch import Prefetcher, is_acceptance
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("Oui", True),
+    ("oui, vas-y !", True),
+    ("D’accord, la suite stp", True),
+    ("Continue", True),
+    ("Ok merci beaucoup", False),
+    ("Merci", False),
+    ("Continue avec la conclusion", False),
+    ("Oui mais plus court cette fois", False),
+    ("stp", False),
+])
+def test_is_acceptance(prompt, expected):
+    assert is_acceptance(prompt) is expected
+
+
+@pytest.fixture
+def prefetching(api, monkeypatch):
+    prefetcher = Prefetcher(build=api.prefetch_prompt, generate=api.call_section_model, has_capacity=lambda: True,
+                            max_entries=10, ttl=60, delay=0)
+    monkeypatch.setattr(api, "prefetcher", prefetcher)
+    return api
+
+
+def wait_prefetch(api, user_id: str):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        entry = api.prefetcher.pending(user_id)
+        if entry is not None and entry.task.done():
+            return
+        time.sleep(0.01)
+
+
+def first_section(client, api, context: str = "") -> str:
+    user_id = uuid.uuid4().hex
+    prompt = f"Rédige l'introduction de mon mémoire sur l'agriculture urbaine à {uuid.uuid4().hex[:8]}"
+    client.get("/ask", params={"prompt": prompt, "user_id": user_id, "context": context})
+    wait_prefetch(api, user_id)
+    return user_id
+
+
+def test_acceptance_serves_prefetched_section_with_original_context(prefetching):
+    api = prefetching
+    with TestClient(api.app) as client:
+        user_id = first_section(client, api, context="Terrain : trois fermes à Lyon")
+        calls = len(api.backends.calls)
+        response = client.get("/ask", params={"prompt": "Oui", "user_id": user_id}).json()
+        wait_prefetch(api, user_id)
+    assert response["section"] == "chapitre 1 - cadre théorique"
+    assert api.prefetcher.counts["servies"] == 1
+    # Texte anticipé servi tel quel : aucune génération de plus que l'anticipation de la section suivante
+    assert len(api.backends.calls) == calls + 1
+
+
+def test_thanks_is_a_chat_message(prefetching):
+    api = prefetching
+    with TestClient(api.app) as client:
+        user_id = first_section(client, api)
+        response = client.get("/ask", params={"prompt": "Ok merci beaucoup", "user_id": user_id}).json()
+    assert response["section"] == "chat"
+    assert api.prefetcher.counts["servies"] == 0
+
+
+def test_request_naming_another_section_is_not_an_acceptance(prefetching):
+    api = prefetching
+    with TestClient(api.app) as client:
+        user_id = first_section(client, api)
+        response = client.get("/ask", params={"prompt": "Continue avec la conclusion", "user_id": user_id}).json()
+    # Traité comme sans anticipation (classification d'intention inchangée), jamais comme un « oui »
+    assert response["section"] != "chapitre 1 - cadre théorique"
+    assert response["section"] == api.detect_intention("Continue avec la conclusion") == "chat"
+    assert api.prefetcher.counts["servies"] == 0
+
+
+def test_edited_context_invalidates_prefetched_section(prefetching):
+    api = prefetching
+    with TestClient(api.app) as client:
+        user_id = first_section(client, api, context="Terrain : trois fermes à Lyon")
+        client.get("/ask", params={"prompt": "Oui", "user_id": user_id, "context": "Terrain : deux fermes à Paris"})
+    assert api.prefetcher.counts["servies"] == 0
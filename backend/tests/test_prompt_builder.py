@@ -0,0 +1,49 @@
+from app.services.context_window import ContextWindow
+from app.services.prompt_templates import (
+    BRAINSTORMING, FIRST_SECTION, METHODOLOGY, NO_CONTEXT, SECTION_INSTRUCTIONS, PromptBuilder,
+)
+from benchmarks.legacy import legacy_build_prompt
+
+THEME = "L'impact des réseaux sociaux sur les adolescents"
+CONTEXT = "Étude menée auprès de 200 lycéens en 2024."
+
+
+def lines(prompt):
+    return sorted(filter(None, prompt.splitlines()))
+
+
+def test_same_content_as_original_prompt():
+    # Mêmes lignes que le prompt d'origine, seul l'ordre des blocs change (blocs statiques en tête)
+    builder = PromptBuilder()
+    storage = {THEME: {}}
+    digest = ContextWindow(budget=0)
+    for section in SECTION_INSTRUCTIONS:
+        assert lines(builder.build(THEME, section, CONTEXT, digest.get(THEME))) == \
+            lines(legacy_build_prompt(storage, THEME, section, CONTEXT))
+        text = f"Texte de la section {section}."
+        storage[THEME][section] = text
+        digest.update(THEME, section, text)
+
+
+def test_static_prefix_shared_by_every_request():
+    builder = PromptBuilder().compile()
+    prefix = f"{METHODOLOGY}\n\n{BRAINSTORMING}"
+    for section in SECTION_INSTRUCTIONS:
+        assert builder.build(THEME, section).startswith(prefix)
+        assert builder.build("Un autre thème", section, CONTEXT).startswith(prefix)
+    assert builder.build_outline(THEME, list(SECTION_INSTRUCTIONS)).startswith(prefix)
+
+
+def test_placeholders_and_defaults():
+    builder = PromptBuilder()
+    prompt = builder.build("Thème {avec} accolades", "annexes")
+    assert "THÈME DU MÉMOIRE : **Thème {avec} accolades**" in prompt
+    assert "Développez la section 'annexes' de manière structurée et détaillée." in prompt
+    assert NO_CONTEXT in prompt and FIRST_SECTION in prompt
+    assert "annexes" in builder._templates
+
+
+def test_edit_template_keeps_literal_braces():
+    prompt = PromptBuilder().build_edit(THEME, "conclusion", "[P1] Texte.", "Raccourcir")
+    assert '{"operations": []}' in prompt
+    assert "[P1] Texte." in prompt and "Raccourcir" in prompt
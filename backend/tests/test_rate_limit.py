@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.rate_limit import (GLOBAL, REQUESTS, TOKENS, USER, AdmissionController, BucketLimit,
+                                     MemoryBucketStore, RateLimitError, SqlBucketStore)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def controller(store=None, clock=None):
+    limits = [BucketLimit(USER, REQUESTS, 2, 60), BucketLimit(USER, TOKENS, 1000, 600),
+              BucketLimit(GLOBAL, REQUESTS, 3, 60)]
+    return AdmissionController(store or MemoryBucketStore(), limits, clock or Clock())
+
+
+def admit(admission, user_id, tokens):
+    asyncio.run(admission.admit(user_id, tokens))
+
+
+def test_burst_then_reject_with_retry_after():
+    admission = controller()
+    admit(admission, "alice", 10)
+    admit(admission, "alice", 10)
+    with pytest.raises(RateLimitError) as e:
+        admit(admission, "alice", 10)
+    assert e.value.scope == USER and e.value.retry_after == 1
+    assert admission.admitted == 2 and admission.rejected[USER] == 1
+
+
+def test_refill_over_time():
+    clock = Clock()
+    admission = controller(clock=clock)
+    admit(admission, "alice", 10)
+    admit(admission, "alice", 10)
+    clock.now += 1.0
+    admit(admission, "alice", 10)
+
+
+def test_global_bucket_is_shared_between_users():
+    admission = controller()
+    admit(admission, "alice", 10)
+    admit(admission, "bob", 10)
+    admit(admission, "carol", 10)
+    with pytest.raises(RateLimitError) as e:
+        admit(admission, "dave", 10)
+    assert e.value.scope == GLOBAL
+
+
+def test_rejected_request_debits_nothing():
+    admission = controller()
+    admit(admission, "alice", 900)
+    with pytest.raises(RateLimitError) as e:
+        admit(admission, "alice", 200)
+    assert e.value.scope == USER
+    # Le refus n'a pas entamé le seau global : deux autres utilisateurs passent encore
+    admit(admission, "bob", 10)
+    admit(admission, "carol", 10)
+
+
+def test_cost_above_burst_is_admitted_on_a_full_bucket():
+    admission = controller()
+    admit(admission, "alice", 5000)
+    with pytest.raises(RateLimitError):
+        admit(admission, "alice", 1)
+
+
+def test_sqlite_store_is_shared_between_controllers(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    clock = Clock()
+    first = controller(SqlBucketStore(path), clock)
+    second = controller(SqlBucketStore(path), clock)
+    admit(first, "alice", 10)
+    admit(second, "alice", 10)
+    with pytest.raises(RateLimitError):
+        admit(first, "alice", 10)
+    first.close()
+    second.close()
+
+
+def test_sqlite_store_is_taken_off_the_event_loop(tmp_path):
+    # BEGIN IMMEDIATE peut attendre le verrou d'un autre worker : jamais dans le thread de la boucle
+    store = SqlBucketStore(str(tmp_path / "buckets.db"))
+    threads = []
+    take = store.take
+
+    def recording(charges, now):
+        threads.append(threading.current_thread())
+        return take(charges, now)
+
+    store.take = recording
+    admission = controller(store)
+    admit(admission, "alice", 10)
+    assert threads and threads[0] is not threading.current_thread()
+    admission.close()
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+from app.services.response_cache import ResponseCache, SqliteResponseStore
+
+
+def test_prune_drops_expired_then_oldest_over_the_cap(tmp_path):
+    store = SqliteResponseStore(str(tmp_path / "cache.db"), max_bytes=250, prune_interval=3600)
+    store.set("expirée", "x" * 50, expires_at=0)
+    for index in range(3):
+        store.set(f"clé {index}", "y" * 100, expires_at=float("inf"))
+    # Nettoyage au premier set seulement (intervalle d'une heure) : le plafond est dépassé jusqu'au suivant
+    assert store.count() == 3
+    assert store.prune() == 1
+    assert store.get("clé 0") == (None, 0.0)
+    assert store.get("clé 2")[0] == "y" * 100
+    assert store.pruned == 2
+
+
+def test_set_prunes_once_per_interval(tmp_path):
+    store = SqliteResponseStore(str(tmp_path / "cache.db"), max_bytes=10 ** 6, prune_interval=0)
+    store.set("expirée", "x", expires_at=0)
+    store.set("clé", "y", expires_at=float("inf"))
+    assert store.count() == 1
+
+
+def test_disk_tier_is_read_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ResponseCache(max_bytes=10 ** 6, ttl=60, disk_path=str(tmp_path / "cache.db"))
+    asyncio.run(cache.set("clé", "texte"))
+    # Nouveau processus : mémoire vide, la réponse vient du disque
+    cache = ResponseCache(max_bytes=10 ** 6, ttl=60, disk_path=str(tmp_path / "cache.db"))
+    threads = []
+    get = cache.disk.get
+
+    def recording(key):
+        threads.append(threading.current_thread())
+        return get(key)
+
+    monkeypatch.setattr(cache.disk, "get", recording)
+    assert asyncio.run(cache.get("clé")) == "texte"
+    assert threads and threads[0] is not threading.current_thread()
+    assert cache.disk_hits == 1
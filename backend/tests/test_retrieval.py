@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.ingestion import TEXT
+from app.services.retrieval import RetrievalStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RetrievalStore(directory=str(tmp_path / "index"), words_per_chunk=40, overlap=5)
+    source = tmp_path / "source.txt"
+    source.write_text("Les fermes urbaines de Lyon recyclent les eaux de pluie.\n\n"
+                      "Le compostage collectif réduit les déchets des ménages.\n", encoding="utf-8")
+    store.ingest("alice", "source.txt", TEXT, str(source))
+    yield store
+    store.close()
+
+
+def test_search_finds_the_ingested_passage(store):
+    passages = store.search("alice", "compostage des déchets", 3)
+    assert passages and "compostage" in passages[0].text
+    assert store.search("bob", "compostage", 3) == []
+
+
+def test_bibliography_is_searched_off_the_event_loop(api, store, monkeypatch):
+    # Un dépôt en cours d'indexation tient le verrou de l'utilisateur : la recherche l'attend dans un thread
+    threads = []
+    search = store.search
+
+    def recording(*args):
+        threads.append(threading.current_thread())
+        return search(*args)
+
+    monkeypatch.setattr(store, "search", recording)
+    monkeypatch.setattr(api, "retrieval", store)
+    prompt = asyncio.run(api.section_prompt("Agriculture urbaine", "introduction", "compostage", "alice"))
+    assert "compostage collectif" in prompt
+    assert threads and threads[0] is not threading.current_thread()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.services.health import HALF_OPEN, HealthMonitor
+from app.services.router import AdaptiveRouter
+from app.services.single_flight import SingleFlight
+
+
+class Backend:
+    def __init__(self):
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_concurrency = 4
+
+
+class Health:
+    def __init__(self, available=("groq", "ollama")):
+        self.available = set(available)
+
+    def is_available(self, name):
+        return name in self.available
+
+    def allow_request(self, name):
+        return name in self.available
+
+
+class Tokenizer:
+    def count(self, text):
+        return len(text.split())
+
+
+def make_router(health=None, cooldown=30.0):
+    return AdaptiveRouter({"groq": Backend(), "ollama": Backend()}, health or Health(), Tokenizer(), fallback="ollama",
+                          alpha=0.2, cooldown=cooldown)
+
+
+def test_plan_lists_every_available_backend_fastest_first():
+    router = make_router()
+    assert router.plan("prompt", 2500) == ["groq", "ollama"]
+    assert router.routed == {"groq": 1, "ollama": 0}
+
+
+def test_failure_demotes_backend_before_breaker_opens():
+    router = make_router()
+    router.record_failure("groq")
+    assert router.plan("prompt", 2500) == ["ollama", "groq"]
+    assert router.snapshot()["backends"]["groq"]["en_retrait_s"] > 0
+
+
+def test_backend_comes_back_after_cooldown_or_success():
+    router = make_router(cooldown=0)
+    router.record_failure("groq")
+    assert router.plan("prompt", 2500)[0] == "groq"
+
+    router = make_router()
+    router.record_failure("groq")
+    router.record_success("groq", 5.0, "texte " * 2000)
+    assert router.plan("prompt", 2500)[0] == "groq"
+
+
+def test_fallback_is_always_last_resort():
+    router = make_router(Health(available=()))
+    assert router.plan("prompt", 2500) == ["ollama"]
+
+
+def test_failed_call_is_retried_on_next_backend_and_reroutes_next_request(api):
+    api.backends.groq_error = RuntimeError("connexion refusée")
+    client = TestClient(api.app)
+    prompt = f"Rédige l'introduction de mon mémoire sur l'énergie solaire à {uuid.uuid4().hex[:8]}"
+    client.get("/ask", params={"prompt": prompt, "user_id": uuid.uuid4().hex})
+    assert api.backends.calls == ["groq", "ollama"]
+    assert api.router.failovers == 1
+    # Groq vient d'échouer : la requête suivante part directement sur Ollama
+    client.get("/ask", params={"prompt": prompt.replace("introduction", "conclusion"), "user_id": uuid.uuid4().hex})
+    assert api.backends.calls == ["groq", "ollama", "ollama"]
+
+
+def make_half_open_router():
+    # Trois backends sans sonde : mistral, en half-open, n'a droit qu'à une requête d'essai
+    health = HealthMonitor(interval=60, ttl=60, failure_threshold=1, recovery_timeout=30)
+    for name in ("groq", "mistral", "ollama"):
+        health.register(name, None)
+    health.record_failure("mistral")
+    health.backends["mistral"].opened_at = time.monotonic() - 31
+    backends = {name: Backend() for name in ("groq", "mistral", "ollama")}
+    return AdaptiveRouter(backends, health, Tokenizer(), fallback="ollama", alpha=0.2, cooldown=0), health
+
+
+def test_plan_reserves_half_open_trial_only_for_the_backend_used():
+    router, health = make_half_open_router()
+    breaker = health.backends["mistral"]
+    # mistral en relais : le plan le liste sans consommer son essai
+    assert router.plan("prompt", 2500) == ["groq", "mistral", "ollama"]
+    assert router.plan("prompt", 2500) == ["groq", "mistral", "ollama"]
+    assert breaker.state == HALF_OPEN and not breaker.trial_in_flight
+    # Relais effectif : l'essai est réservé une seule fois
+    assert router.acquire("mistral")
+    assert not router.acquire("mistral")
+    assert router.acquire("ollama")
+
+
+def test_plan_skips_a_first_choice_whose_trial_is_taken():
+    router, health = make_half_open_router()
+    health.record_failure("groq")
+    health.backends["groq"].opened_at = time.monotonic() - 31
+    health.allow_request("groq")
+    assert router.plan("prompt", 2500) == ["mistral", "ollama"]
+    assert health.backends["mistral"].trial_in_flight
+    assert router.routed["mistral"] == 1
+
+
+def test_hedge_loser_generation_is_stopped():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+            return "Texte de groq."
+        except asyncio.CancelledError:
+            cancelled.append("groq")
+            raise
+
+    async def fast():
+        return "Texte d'ollama."
+
+    async def scenario():
+        router = make_router()
+        flights = SingleFlight()
+        calls = {"groq": lambda: flights.run("groq:clé", slow), "ollama": lambda: flights.run("ollama:clé", fast)}
+        answer = await router.hedge("prompt", 100, calls, 0.01, lambda output: output.startswith("["))
+        # Le perdant n'a plus de lecteur : sa génération partagée est annulée et rend son créneau
+        await asyncio.sleep(0)
+        return router, flights, answer
+
+    router, flights, answer = asyncio.run(scenario())
+    assert answer == "Texte d'ollama."
+    assert router.hedged == 1 and router.hedge_wins == 1
+    assert cancelled == ["groq"]
+    assert flights.cancelled == 1 and flights.stats()["en_cours"] == 0
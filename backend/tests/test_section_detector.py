@@ -0,0 +1,33 @@
+import json
+import os
+
+import pytest
+
+from app.services.section_detector import SectionDetector, detect_section
+from benchmarks.legacy import legacy_detect_section
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "golden", "section_detection.json")
+
+with open(GOLDEN_PATH, encoding="utf-8") as f:
+    CASES = json.load(f)["cases"]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case["prompt"][:40])
+def test_golden_section(case):
+    assert detect_section(case["prompt"]) == case["section"]
+
+
+def test_long_prompts_match_original():
+    # Prompts répétés : même priorité des règles que la détection d'origine sur des textes longs
+    for case in CASES:
+        prompt = case["prompt"] * 20
+        assert detect_section(prompt) == legacy_detect_section(prompt)
+
+
+def test_rules_compiled_on_first_call():
+    detector = SectionDetector()
+    assert detector.rules is None
+    assert detector.explicit("Rédige la conclusion") == "conclusion"
+    assert detector.rules is not None
+    assert detector.explicit("Bonjour") is None
+    assert detector.detect("Bonjour") == "introduction"
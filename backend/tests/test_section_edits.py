@@ -0,0 +1,57 @@
+import pytest
+
+from app.services.section_edits import (PatchError, apply_patch, changed_paragraphs, is_edit_request, number_paragraphs,
+                                        parse_patch, split_paragraphs)
+
+TEXT = "Premier paragraphe.\n\nDeuxième paragraphe.\n \nTroisième paragraphe."
+
+
+def test_split_and_number_paragraphs():
+    paragraphs = split_paragraphs(TEXT)
+    assert paragraphs == ["Premier paragraphe.", "Deuxième paragraphe.", "Troisième paragraphe."]
+    assert number_paragraphs(paragraphs).startswith("[P1] Premier paragraphe.\n\n[P2] ")
+
+
+def test_parse_patch_inside_code_block():
+    output = 'Voici le patch :\n```json\n{"operations": [{"op": "delete", "paragraph": 2}]}\n```'
+    assert parse_patch(output) == [{"op": "delete", "paragraph": 2}]
+
+
+@pytest.mark.parametrize("output", ["pas de JSON", '{"operations": "non"}', '{"operations": [1,}'])
+def test_parse_patch_rejects_invalid_output(output):
+    with pytest.raises(PatchError):
+        parse_patch(output)
+
+
+def test_apply_patch_uses_original_numbering():
+    paragraphs = split_paragraphs(TEXT)
+    operations = [
+        {"op": "insert_after", "paragraph": 0, "text": "Chapeau."},
+        {"op": "delete", "paragraph": 1},
+        {"op": "replace", "paragraph": 3, "text": "Troisième, réécrit."},
+        {"op": "insert_after", "paragraph": 2, "text": "Ajout A.\n\nAjout B."},
+    ]
+    assert apply_patch(paragraphs, operations) == [
+        "Chapeau.", "Deuxième paragraphe.", "Ajout A.", "Ajout B.", "Troisième, réécrit.",
+    ]
+    assert changed_paragraphs(operations) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "replace", "paragraph": 4, "text": "hors limites"}],
+    [{"op": "replace", "paragraph": 1, "text": "  "}],
+    [{"op": "delete", "paragraph": 1}, {"op": "replace", "paragraph": 1, "text": "deux fois"}],
+    [{"op": "move", "paragraph": 1}],
+])
+def test_apply_patch_rejects_invalid_operations(operations):
+    with pytest.raises(PatchError):
+        apply_patch(split_paragraphs(TEXT), operations)
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("Corrige l'introduction : ajoute une statistique", True),
+    ("peux-tu reformuler la conclusion", True),
+    ("Rédige la conclusion", False),
+])
+def test_is_edit_request(prompt, expected):
+    assert is_edit_request(prompt) is expected
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+def test_version_write_runs_off_the_event_loop(api, monkeypatch):
+    # BEGIN IMMEDIATE peut attendre le verrou d'un autre worker : jamais dans le thread de la boucle
+    threads = []
+    add_section_version = api.repository.add_section_version
+
+    def recording(*args):
+        threads.append(threading.current_thread())
+        return add_section_version(*args)
+
+    monkeypatch.setattr(api.repository, "add_section_version", recording)
+    theme = f"thème {uuid.uuid4().hex[:8]}"
+    assert asyncio.run(api.store_section(theme, "introduction", "Texte.")) == 1
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_restore_creates_a_new_version(api):
+    theme = f"thème {uuid.uuid4().hex[:8]}"
+    asyncio.run(api.store_section(theme, "introduction", "Première version."))
+    asyncio.run(api.store_section(theme, "introduction", "Seconde version."))
+    client = TestClient(api.app)
+    response = client.post("/sections/restore", params={"theme": theme, "section": "introduction", "version": 1}).json()
+    assert response["version"] == 3
+    assert api.repository.get_sections(theme)["introduction"] == "Première version."
@@ -0,0 +1,43 @@
+import pytest
+
+from app.services.semantic_cache import SemanticCache
+
+
+def make_cache():
+    return SemanticCache(max_entries=4, threshold=0.8, ttl=3600, max_chars=60)
+
+
+def test_same_message_is_served_to_the_same_user_only():
+    cache = make_cache()
+    cache.set("paul", "Je m'appelle Paul", "Enchanté Paul !")
+    assert cache.get("paul", "je m’appelle paul") == "Enchanté Paul !"
+    assert cache.get("pauline", "Je m'appelle Paul") is None
+    assert cache.get("pauline", "Je m'appelle Pauline") is None
+
+
+@pytest.mark.parametrize("seen, message", [
+    ("combien font 2+2", "combien font 2+3"),
+    ("je suis content", "je ne suis pas content"),
+    ("capitale de la France", "capitale de la Suisse"),
+    ("Je m'appelle Paul", "Je m'appelle Pauline"),
+])
+def test_a_close_message_that_changes_the_meaning_is_a_miss(seen, message):
+    cache = make_cache()
+    cache.set("alice", seen, "réponse")
+    assert cache.get("alice", message) is None
+
+
+def test_close_small_talk_is_served():
+    cache = make_cache()
+    cache.set("alice", "bonjour", "Bonjour ! Que puis-je faire pour vous ?")
+    assert cache.get("alice", "Bonjour bonjour !") == "Bonjour ! Que puis-je faire pour vous ?"
+    assert cache.stats()["exact_hits"] == 0
+
+
+def test_eviction_frees_the_user_slot():
+    cache = make_cache()
+    for index in range(5):
+        cache.set("alice", f"question {index}", f"réponse {index}")
+    assert cache.get("alice", "question 0") is None
+    assert cache.get("alice", "question 4") == "réponse 4"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_generation():
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "texte"
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.run("clé", generate) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+    assert results == ["texte"] * 5
+    assert len(calls) == 1
+    assert flights.started == 1 and flights.deduplicated == 4
+    assert flights.stats()["en_cours"] == 0
+
+
+def test_late_stream_reader_replays_previous_parts():
+    async def parts():
+        for part in ("a", "b", "c"):
+            yield part
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        flights = SingleFlight()
+        first = flights.stream("clé", parts)
+        first_parts = [await first.__anext__()]
+        second = flights.stream("clé", parts)
+        first_parts += [part async for part in first]
+        return first_parts, [part async for part in second]
+
+    first_parts, second_parts = asyncio.run(scenario())
+    assert first_parts == second_parts == ["a", "b", "c"]
+
+
+def test_error_reaches_every_reader_and_key_is_released():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend tombé")
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(flights.run("clé", failing), flights.run("clé", failing),
+                                       return_exceptions=True)
+        # La clé est libérée : un nouvel appel relance une génération
+        again = await flights.run("clé", lambda: asyncio.sleep(0, result="ok"))
+        return flights, results, again
+
+    flights, results, again = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert again == "ok" and flights.started == 2
+
+
+def test_different_keys_are_not_merged():
+    async def scenario():
+        flights = SingleFlight()
+        return await asyncio.gather(flights.run("a", lambda: asyncio.sleep(0.01, result="A")),
+                                    flights.run("b", lambda: asyncio.sleep(0.01, result="B"))), flights
+
+    results, flights = asyncio.run(scenario())
+    assert results == ["A", "B"] and flights.deduplicated == 0
+
+
+def test_last_reader_cancellation_stops_generation():
+    # Job annulé ou anticipation jetée : le créneau du backend est rendu tout de suite
+    async def scenario():
+        stopped = asyncio.Event()
+
+        async def generate():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+            return "fini"
+
+        flights = SingleFlight()
+        task = asyncio.create_task(flights.run("clé", generate))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.wait_for(stopped.wait(), 1)
+        # Un nouvel appel relance une génération au lieu de lire celle qui a été arrêtée
+        again = await flights.run("clé", lambda: asyncio.sleep(0, result="relance"))
+        return flights, again
+
+    flights, again = asyncio.run(scenario())
+    assert again == "relance"
+    assert flights.stats()["generations_annulees"] == 1 and flights.started == 2
+
+
+def test_remaining_reader_keeps_generation_running():
+    async def scenario():
+        async def generate():
+            await asyncio.sleep(0.05)
+            return "fini"
+
+        flights = SingleFlight()
+        tasks = [asyncio.create_task(flights.run("clé", generate)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for task in tasks[:2]:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return flights, results[2]
+
+    flights, result = asyncio.run(scenario())
+    assert result == "fini"
+    assert flights.cancelled == 0
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.services.startup import DONE, FAILED, PENDING, StartupPipeline
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_foreground_steps_run_before_start_returns():
+    order = []
+    release = asyncio.Event()
+
+    async def warmup():
+        order.append("warmup")
+        await release.wait()
+
+    def fail():
+        raise RuntimeError("GROQ_API_KEY absente")
+
+    async def scenario():
+        pipeline = StartupPipeline()
+        pipeline.add("tables", lambda: order.append("tables"))
+        pipeline.add("client_groq", fail)
+        pipeline.add("ollama_warmup", warmup, background=True)
+        await pipeline.start()
+        # Le serveur s'ouvre : étapes de premier plan terminées, préchargement en cours
+        assert order == ["tables"]
+        assert [step.status for step in pipeline.steps] == [DONE, FAILED, PENDING]
+        assert not pipeline.ready
+
+        await asyncio.sleep(0)
+        release.set()
+        await pipeline._task
+        return pipeline
+
+    pipeline = asyncio.run(scenario())
+    snapshot = pipeline.snapshot()
+    assert snapshot["pret"] and snapshot["demarrage_ms"] is not None
+    assert snapshot["etapes"][1]["erreur"] == "RuntimeError: GROQ_API_KEY absente"
+    assert snapshot["etapes"][2]["arriere_plan"] and snapshot["etapes"][2]["status"] == DONE
+
+
+def test_stop_cancels_a_pending_warmup():
+    async def scenario():
+        pipeline = StartupPipeline()
+        pipeline.add("ollama_warmup", lambda: asyncio.sleep(60), background=True)
+        await pipeline.start()
+        await pipeline.stop()
+        return pipeline
+
+    pipeline = asyncio.run(scenario())
+    assert pipeline._task.cancelled()
+    assert not pipeline.ready
+
+
+def test_ready_reports_503_until_warmup_finishes(api, monkeypatch):
+    pipeline = StartupPipeline()
+    monkeypatch.setattr(api, "startup", pipeline)
+    client = TestClient(api.app)
+    assert client.get("/ready").status_code == 503
+    pipeline.started_at = pipeline.ready_at = 0.0
+    assert client.get("/ready").json()["pret"] is True
+
+
+def test_import_defers_clients():
+    # Processus neuf : l'import de l'application ne charge ni les clients Groq/Ollama ni les tables
+    code = ("import sys, app.models.fastAPI as api; "
+            "print(any(name in sys.modules for name in ('groq', 'ollama')), api.intent_engine.automaton is None)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=BACKEND_DIR).stdout
+    assert output.split() == ["False", "True"]
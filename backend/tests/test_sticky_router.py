@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+
+from app.services.sticky_router import StickyRouter, worker_for
+
+UPSTREAMS = ["http://w0", "http://w1", "http://w2", "http://w3"]
+
+
+def call(router, method: str, path: str, query: bytes = b"", messages=(), headers=()):
+    # Requête ASGI rejouée message par message ; renvoie (réponse, requête reçue par le worker, corps relayé)
+    received = {}
+
+    class Upstream(httpx.AsyncBaseTransport):
+        # Contrairement à MockTransport, le corps n'est pas lu d'avance : les blocs arrivent tels que relayés
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            received["request"] = request
+            received["chunks"] = [chunk async for chunk in request.stream]
+            body = f'{{"worker": "{request.url.host}"}}'.encode()
+            return httpx.Response(200, headers={"content-type": "application/json"}, stream=httpx.ByteStream(body))
+
+    async def scenario():
+        router.client = httpx.AsyncClient(transport=Upstream())
+        queue = list(messages) or [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            return queue.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers)}
+        await router(scope, receive, send)
+        await router.client.aclose()
+        return sent
+
+    sent = asyncio.run(scenario())
+    body = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return sent[0]["status"], body, received
+
+
+def test_job_follow_up_goes_to_its_worker():
+    assert worker_for("/jobs/w2-abc", b"", 4) == 2
+    assert worker_for("/ask", b"prompt=x", 4) is None
+
+
+def test_same_user_same_worker():
+    assert worker_for("/ask", b"user_id=alice", 4) == worker_for("/documents", b"user_id=alice&filename=a.pdf", 4)
+
+
+def test_body_is_streamed_to_the_worker_in_blocks():
+    router = StickyRouter(UPSTREAMS)
+    blocks = [b"a" * 1000, b"b" * 1000, b"c" * 10]
+    messages = [{"type": "http.request", "body": block, "more_body": index < len(blocks) - 1}
+                for index, block in enumerate(blocks)]
+    status, _, received = call(router, "POST", "/documents", b"user_id=alice", messages,
+                               headers=[(b"content-length", b"2010"), (b"host", b"routeur")])
+    assert status == 200
+    # Blocs relayés un à un, longueur annoncée conservée pour le plafond du worker
+    assert received["chunks"] == blocks
+    assert received["request"].headers["content-length"] == "2010"
+    assert "transfer-encoding" not in received["request"].headers
+
+
+def test_single_message_body_is_sent_as_is():
+    router = StickyRouter(UPSTREAMS)
+    status, body, received = call(router, "GET", "/ask", b"prompt=x&user_id=alice")
+    assert status == 200 and b"worker" in body
+    assert b"".join(received["chunks"]) == b""
+    assert "transfer-encoding" not in received["request"].headers
+
+
+def test_v2_ask_routes_on_body_user_id():
+    router = StickyRouter(UPSTREAMS)
+    body = '{"prompt": "Rédige l\'introduction", "user_id": "alice"}'.encode()
+    messages = [{"type": "http.request", "body": body[:10], "more_body": True},
+                {"type": "http.request", "body": body[10:], "more_body": False}]
+    status, response, received = call(router, "POST", "/v2/ask", messages=messages,
+                                      headers=[(b"content-type", b"application/json")])
+    assert status == 200
+    # Même worker que les routes qui passent user_id dans l'URL, corps relayé intact
+    assert received["request"].url.host == f"w{worker_for('/ask', b'user_id=alice', len(UPSTREAMS))}"
+    assert b"".join(received["chunks"]) == body
+
+
+def test_v2_ask_body_over_cap_is_relayed_untouched(monkeypatch):
+    from app import config
+
+    monkeypatch.setattr(config, "ASK_MAX_BODY_BYTES", 16)
+    router = StickyRouter(UPSTREAMS)
+    blocks = [b'{"user_id": "alice", ', b'"prompt": "' + b"x" * 40, b'"}']
+    messages = [{"type": "http.request", "body": block, "more_body": index < len(blocks) - 1}
+                for index, block in enumerate(blocks)]
+    status, _, received = call(router, "POST", "/v2/ask", messages=messages)
+    assert status == 200
+    assert b"".join(received["chunks"]) == b"".join(blocks)
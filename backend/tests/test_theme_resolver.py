@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from app.services.theme_resolver import UNSPECIFIED, ThemeResolver, extract_theme
+from benchmarks.bench_theme_resolver import SECTIONS
+from benchmarks.legacy import legacy_extract_theme
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "golden", "theme_extraction.json")
+
+with open(GOLDEN_PATH, encoding="utf-8") as f:
+    CASES = json.load(f)["cases"]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case["prompt"][:40])
+def test_golden_theme(case):
+    assert extract_theme(case["prompt"]) == case["theme"]
+
+
+def test_long_prompts_match_original():
+    for case in CASES:
+        prompt = case["prompt"] * 5
+        assert extract_theme(prompt) == legacy_extract_theme(prompt)
+
+
+def test_rephrased_theme_resolves_to_the_known_one():
+    resolver = ThemeResolver(sections=SECTIONS, threshold=0.6, max_themes=8, max_users=8)
+    theme = resolver.resolve("u1", "Je veux rédiger un mémoire sur l'impact des réseaux sociaux sur les adolescents.")
+    assert resolver.resolve("u1", "Rédige la conclusion de mon mémoire sur l'Impact des réseaux sociaux sur les adolescents", theme) == theme
+    # Consigne sur le document sans sujet : le thème en cours est conservé
+    assert resolver.resolve("u1", "Passe au cadre théorique", theme) == theme
+    # Formulation sans le sujet complet : rattachée au thème connu de cet utilisateur seulement
+    message = "Rédige l'introduction sur l'impact des réseaux sociaux chez les adolescents"
+    assert resolver.resolve("u1", message, theme) == theme
+    assert resolver.resolve("u2", message) == extract_theme(message) != theme
+    assert resolver.stats()["utilisateurs"] == 2
+
+
+def test_new_subject_starts_a_new_theme():
+    resolver = ThemeResolver(sections=SECTIONS, threshold=0.6, max_themes=8, max_users=8)
+    theme = resolver.resolve("u1", "Je veux rédiger un mémoire sur l'impact des réseaux sociaux sur les adolescents.")
+    other = resolver.resolve("u1", "Je veux rédiger un mémoire sur la gestion des déchets en ville.", theme)
+    assert other != theme and other != UNSPECIFIED
+
+
+def test_index_bounded_per_user_and_in_users():
+    resolver = ThemeResolver(threshold=0.6, max_themes=2, max_users=2)
+    for index in range(3):
+        resolver.remember("u1", f"sujet numéro {index} unique{index}")
+    resolver.remember("u2", "climat")
+    resolver.remember("u3", "déchets")
+    assert resolver.stats() == {"utilisateurs": 2, "themes": 2, "rattaches": 0, "nouveaux": 0}
@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.wire import BodyError, choose_encoding, decode_body, encode_response, read_body
+
+
+class StreamedRequest:
+    # Requête minimale pour read_body : en-têtes et corps découpé en blocs
+    def __init__(self, blocks, headers=None):
+        self.blocks = blocks
+        self.headers = headers or {}
+        self.read = 0
+
+    async def stream(self):
+        for block in self.blocks:
+            self.read += 1
+            yield block
+
+
+def test_declared_oversize_body_refused_before_reading():
+    request = StreamedRequest([b"x" * 10], {"content-length": "1000"})
+    with pytest.raises(BodyError) as error:
+        asyncio.run(read_body(request, max_bytes=100))
+    assert error.value.status_code == 413
+    assert request.read == 0
+
+
+def test_chunked_body_capped_block_by_block():
+    request = StreamedRequest([b"x" * 60, b"x" * 60, b"x" * 60])
+    with pytest.raises(BodyError) as error:
+        asyncio.run(read_body(request, max_bytes=100))
+    assert error.value.status_code == 413
+    assert request.read == 2
+    assert asyncio.run(read_body(StreamedRequest([b"ab", b"cd"]), max_bytes=100)) == b"abcd"
+
+
+def test_decode_body_rejects_unknown_or_invalid_payloads():
+    assert decode_body(b'{"prompt": "Bonjour"}', "application/json; charset=utf-8") == {"prompt": "Bonjour"}
+    for body, content_type, status in ((b"{", "application/json", 400), (b"prompt=x", "text/plain", 415)):
+        with pytest.raises(BodyError) as error:
+            decode_body(body, content_type)
+        assert error.value.status_code == status
+
+
+def test_encoding_negotiation():
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding(None) is None
+    assert choose_encoding("*") in ("br", "gzip")
+
+    data = {"response": "texte " * 200}
+    body, headers = encode_response(data, "gzip", min_bytes=500, gzip_level=6, brotli_quality=5)
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == data
+    body, headers = encode_response({"response": "court"}, "gzip", min_bytes=500, gzip_level=6, brotli_quality=5)
+    assert "Content-Encoding" not in headers and json.loads(body) == {"response": "court"}
+
+
+def test_ask_v2_caps_the_body_and_compresses_the_answer(api, monkeypatch):
+    monkeypatch.setattr(api.config, "ASK_MAX_BODY_BYTES", 200)
+    monkeypatch.setattr(api.config, "COMPRESSION_MIN_BYTES", 0)
+    client = TestClient(api.app)
+
+    response = client.post("/v2/ask", json={"prompt": "x" * 500})
+    assert response.status_code == 413
+    assert client.post("/v2/ask", json={"prompt": "  "}).status_code == 422
+
+    response = client.post("/v2/ask", json={"prompt": "Bonjour", "user_id": uuid.uuid4().hex},
+                           headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "Texte rédigé par" in response.json()["response"]